@@ -0,0 +1,458 @@
+# built-ins
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# internal packages
+from match import match, engine, normalize, blocking, cache, query, instrument, journal, alternatives, export, stream
+from match.records import ColumnarRecords, categorize
+from harvest import harvest
+
+# external packages
+import pandas
+import pg8000
+
+
+class CandidateSource:
+
+    """
+    Fetches candidates for the jobs of a batch over a single database connection
+
+    Candidates of a query are fetched once and shared by every job with the same
+    query. Fetches are serialized, as the connection is shared.
+    """
+
+    def __init__(self, connection, candidate_cache=None, fetch_size=10000):
+
+        """
+        Parameters
+        ----------
+        connection : pg8000.Connection
+            Connection to the database
+
+        candidate_cache : cache.CandidateCache, optional
+            Candidates are read from it when cached, and stored to it when fetched
+
+        fetch_size : int, default=10000
+            Number of rows fetched per batch
+        """
+
+        self.connection = connection
+        self.candidate_cache = candidate_cache
+        self.fetch_size = fetch_size
+
+        self.__lock = threading.Lock()
+        self.__candidates = {}
+
+    def get(self, statement, parameters=None):
+
+        """Returns the candidates of a query as ColumnarRecords"""
+
+        key = cache.CandidateCache.key(statement, parameters)
+
+        with self.__lock:
+            if key not in self.__candidates:
+                # candidates cached from other databases are not those of this one
+                cache_key = cache.CandidateCache.key(statement, parameters, query.identity(self.connection)) \
+                    if self.candidate_cache else None
+                df = self.candidate_cache.get(cache_key) if self.candidate_cache else None
+
+                if df is None:
+                    df = query.fetch_frame(self.connection, statement, parameters, fetch_size=self.fetch_size)
+                    if self.candidate_cache:
+                        self.candidate_cache.put(cache_key, df)
+
+                self.__candidates[key] = ColumnarRecords(categorize(df))
+
+            return self.__candidates[key]
+
+    def drop(self, statement, parameters=None):
+
+        """Forgets the candidates of a query, they are fetched again on the next get"""
+
+        with self.__lock:
+            self.__candidates.pop(cache.CandidateCache.key(statement, parameters), None)
+
+
+def connect(settings):
+
+    """
+    Connects to the database of a batch file
+
+    Parameters
+    ----------
+    settings : dict
+        "connection" of the batch file, see load_jobs
+    """
+
+    settings = dict(settings)
+    password_env = settings.pop('password_env', None)
+    if password_env:
+        settings['password'] = os.environ[password_env]
+
+    return pg8000.connect(**settings)
+
+
+def build_engine(settings, **kwargs):
+
+    """
+    Returns the MatchEngine of the "match" settings of a job, see load_jobs
+
+    Worksheet values are normalized with normalize.worksheet_normalizers, and rows
+    are blocked by blocking.WORKSHEET_KEYS unless "blocking" gives other keys. The
+    "keep" best candidates of every row scoring at least "min_score" are kept,
+    see alternatives.Alternatives.
+    Keyword arguments are passed on to engine.MatchEngine.
+    """
+
+    config = engine.MatchConfig(settings['columns_to_match'], settings['columns_to_get'],
+                                scorers_by_column=settings.get('scorers'),
+                                thresholds_by_column=settings.get('thresholds'),
+                                required_threshold=settings.get('required_threshold', 80))
+    normalizer, normalizers_by_column = normalize.worksheet_normalizers()
+    keys = settings.get('blocking', blocking.WORKSHEET_KEYS)
+
+    if settings.get('keep') and 'alternatives' not in kwargs:
+        kwargs['alternatives'] = alternatives.Alternatives(settings['keep'], min_score=settings.get('min_score', 50))
+
+    return engine.MatchEngine(engine.Matcher(config), weights=settings.get('weights'),
+                              normalizer=normalizer, normalizers_by_column=normalizers_by_column,
+                              blocking=blocking.Blocking(keys) if keys else None,
+                              top_k=settings.get('top_k'), **kwargs)
+
+
+def load_jobs(filepath):
+
+    """
+    Reads a batch file, a JSON document of the form
+
+    {
+        "connection": {"host": "...", "port": 5432, "database": "...", "user": "...",
+                       "password_env": "VOTESMART_DB_PASSWORD"},
+        "cache_directory": "...",
+        "jobs": [{
+            "name": "...",
+            "worksheets": ["...xlsx", "...csv"],
+            "query": {"statement": "SELECT ...", "parameters": [...], "pushdown": true},
+            "match": {"columns_to_match": {"lastname": "lastname", ...},
+                      "columns_to_get": ["candidate_id"],
+                      "scorers": {"lastname": "Weighted", ...},
+                      "thresholds": {"lastname": 60, ...},
+                      "weights": {"lastname": 2, ...},
+                      "required_threshold": 80,
+                      "top_k": 50,
+                      "blocking": {"state_id": "state_id", ...},
+                      "keep": 5,
+                      "min_score": 50},
+            "harvest": {"span": "2022", "sig_id": "...", "usesigrating": "t",
+                        "ratingsession": "...", "ratingformat_id": "..."},
+            "output": {"matched": "...parquet", "query_results": "...csv.gz", "harvest": "...xlsx",
+                       "alternatives": "...csv", "compression": "zstd"},
+            "checkpoint": "...tsv",
+            "stream": {"chunksize": 5000}
+        }]
+    }
+
+    The password of the connection is read from the environment variable named
+    by password_env. With "pushdown", only the candidates in the states of the
+    worksheets are queried, see query.restrict. "pushdown",
+    "cache_directory", "weights", "scorers", "thresholds",
+    "harvest" and every output path are optional. "harvest" can also be a list
+    of sessions, whose harvests are written one after another in the same file.
+    With a "checkpoint" file, an interrupted job resumes from the rows it had
+    matched when it is run again, see journal.MatchJournal.
+
+    With "stream", the worksheets are read and matched chunk by chunk and the
+    matched rows appended to the "matched" output, which must then be a CSV,
+    see stream.match_chunks. Only the "matched" and "query_results" outputs
+    are written, and the query is never pushed down as the worksheets are not
+    read ahead of the match. "stream" can also be true, for chunks of 5000 rows.
+
+    Every output is written as CSV, parquet or xlsx by its extension, see
+    export.write. "compression" is that of every parquet output, a CSV output
+    is compressed by its extension, e.g. ".csv.gz".
+    """
+
+    with open(filepath) as f:
+        return json.load(f)
+
+
+def run(filepath, concurrency=None, profile=False, trace_path=None):
+
+    """
+    Runs every job of a batch file, concurrently
+
+    Every job goes through import, query, match and harvest, writing the outputs
+    it specifies. A job's query runs while its worksheet is read. A failing job
+    does not stop the others.
+
+    Parameters
+    ----------
+    filepath : str
+        Path of the batch file, see load_jobs
+
+    concurrency : int, optional
+        Number of jobs run at once, defaults to the number of cores. The cores
+        are split between the jobs run at once, each scoring with its share of
+        them, see engine.MatchEngine's workers
+
+    profile : bool, default=False
+        Whether the time of the stages of every job is recorded, and added to
+        its result as "stages". As jobs share the process, stage CPU is that of
+        the job's thread; the CPU and peak RSS of the whole batch are printed last
+
+    trace_path : str, optional
+        If specified, the stages of every job are written to it, see instrument.write_trace
+
+    Returns
+    -------
+    int
+        0 if every job succeeded, 1 otherwise
+    """
+
+    batch = load_jobs(filepath)
+
+    candidate_cache = cache.CandidateCache(batch['cache_directory']) if batch.get('cache_directory') else None
+    connection = connect(batch['connection'])
+
+    try:
+        source = CandidateSource(connection, candidate_cache)
+
+        instruments = [instrument.Instrument(enabled=profile, name=job.get('name', f'job {i}'), shared=True)
+                       for i, job in enumerate(batch['jobs'], 1)]
+
+        # every job scores with its share of the cores, so that jobs run at once do not oversubscribe them
+        cores = os.cpu_count() or 1
+        concurrency = concurrency if concurrency else cores
+        workers = max(1, cores // max(1, min(concurrency, len(batch['jobs']))))
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(lambda args: run_job(*args, source, workers=workers),
+                                        zip(batch['jobs'], instruments)))
+
+    finally:
+        connection.close()
+
+    if profile:
+        for result, job_instrument in zip(results, instruments):
+            result['stages'] = dict(job_instrument.summary())
+
+    if trace_path:
+        success, message = instrument.write_trace(trace_path, instruments)
+        if not success:
+            print(message, file=sys.stderr)
+
+    for result in results:
+        print(json.dumps(result, default=str))
+
+    if profile:
+        print(json.dumps({'process': {'cpu': instrument.cpu_time(), 'peak_rss': instrument.peak_rss()}}))
+
+    return 0 if all(r['success'] for r in results) else 1
+
+
+def run_job(job, job_instrument, source, workers=-1):
+
+    """
+    Runs a single job of a batch file
+
+    Parameters
+    ----------
+    job : dict
+        A job of the batch file, see load_jobs
+
+    job_instrument : instrument.Instrument
+        Records the time and memory of the stages of the job
+
+    source : CandidateSource
+        Where the candidates of the job's query come from
+
+    workers : int, default=-1
+        Number of threads scoring the job, -1 uses all available cores, see engine.MatchEngine
+
+    Returns
+    -------
+    dict
+        Name of the job, whether it succeeded, and the worksheet and match
+        information, or the error message
+    """
+
+    result = {'name': job.get('name', ', '.join(job['worksheets'])), 'success': False}
+
+    if job.get('stream'):
+        return stream_job(job, job_instrument, source, result, workers)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    try:
+        match_engine = build_engine(job['match'], instrument=job_instrument, workers=workers,
+                                    journal=journal.MatchJournal(job['checkpoint']) if job.get('checkpoint') else None)
+
+        # the candidates are queried and prepared while the worksheet is read, unless
+        # the query is restricted to the worksheet
+        statement, parameters = job['query']['statement'], job['query'].get('parameters')
+        prepared = None if job['query'].get('pushdown') else executor.submit(prepare, match_engine, source,
+                                                                              statement, parameters)
+
+        # IMPORT
+        with job_instrument.stage('Import') as stage:
+            rating_worksheet = match.RatingWorksheet(processes=1, compact=True)
+            success, message = rating_worksheet.read(job['worksheets'])
+            if not success:
+                result['message'] = message
+                return result
+
+            stage.count(rows=len(rating_worksheet.df))
+
+        result['worksheet_info'] = rating_worksheet.worksheet_info
+
+        # QUERY, only what is left of it
+        with job_instrument.stage('Query') as stage:
+            if prepared is None:
+                statement, parameters = query.restrict(statement, parameters,
+                                                       query.worksheet_filters(rating_worksheet.df))
+                candidates = prepare(match_engine, source, statement, parameters)
+            else:
+                candidates = prepared.result()
+
+            stage.count(rows=len(candidates))
+
+        # MATCH
+        with job_instrument.stage('Prepare') as stage:
+            match_engine.x_records = ColumnarRecords(rating_worksheet.df)
+            stage.count(rows=len(match_engine.x_records))
+
+        with job_instrument.stage('Match') as stage:
+            records, match_info = match_engine.match()
+            matched_df = pandas.DataFrame.from_dict(records, orient='index')
+            stage.count(rows=len(matched_df))
+
+        result['match_info'] = match_info
+
+        # EXPORT, the outputs are written at once, each by a thread of its own
+        output = job.get('output', {})
+        compression = output.get('compression')
+
+        frames = {}
+        if output.get('matched'):
+            frames['matched'] = matched_df
+        if output.get('alternatives') and match_engine.alternatives is not None:
+            frames['alternatives'] = match_engine.alternatives_frame()
+        if output.get('query_results'):
+            frames['query_results'] = candidates.df
+
+        if frames:
+            with job_instrument.stage('Export') as stage:
+                with ThreadPoolExecutor(max_workers=len(frames)) as writers:
+                    writes = [writers.submit(export.write, df, output[k], compression=compression)
+                              for k, df in frames.items()]
+
+                outcomes = [w.result() for w in writes]
+                stage.count(rows=sum(len(df) for df in frames.values()))
+
+            for success, message in outcomes:
+                if not success:
+                    result['message'] = message
+                    return result
+
+        # HARVEST
+        if job.get('harvest') and output.get('harvest'):
+            with job_instrument.stage('Harvest') as stage:
+                rating_harvest = harvest.RatingHarvest()
+                rating_harvest.df = matched_df
+
+                if isinstance(job['harvest'], list):
+                    rating_harvest.generate_many(job['harvest'])
+                else:
+                    for attribute in ('span', 'sig_id', 'usesigrating', 'ratingsession', 'ratingformat_id'):
+                        setattr(rating_harvest, attribute, job['harvest'].get(attribute, ''))
+
+                    rating_harvest.generate()
+
+                success, message = rating_harvest.export(output['harvest'], compression=compression)
+                stage.count(rows=len(rating_harvest.df))
+
+            if not success:
+                result['message'] = message
+                return result
+
+        result['success'] = True
+
+    except Exception as e:
+        result['message'] = str(e)
+
+    finally:
+        executor.shutdown(wait=False)
+
+    return result
+
+
+def stream_job(job, job_instrument, source, result, workers=-1):
+
+    """Runs a job of a batch file with "stream", see run_job and load_jobs"""
+
+    output = job.get('output', {})
+    options = job['stream'] if isinstance(job['stream'], dict) else {}
+
+    unsupported = [k for k in ('alternatives', 'harvest') if output.get(k)]
+    if unsupported:
+        result['message'] = f"\"stream\" writes only the \"matched\" and \"query_results\" outputs, not {unsupported}"
+        return result
+
+    if not output.get('matched', '').lower().endswith(('.csv', '.csv.gz', '.csv.bz2', '.csv.xz', '.csv.zst')):
+        result['message'] = "\"stream\" needs a CSV \"matched\" output"
+        return result
+
+    try:
+        match_engine = build_engine(job['match'], instrument=job_instrument, workers=workers,
+                                    journal=journal.MatchJournal(job['checkpoint']) if job.get('checkpoint') else None)
+
+        with job_instrument.stage('Query') as stage:
+            candidates = prepare(match_engine, source, job['query']['statement'], job['query'].get('parameters'))
+            stage.count(rows=len(candidates))
+
+        with job_instrument.stage('Match') as stage:
+            match_info = stream.match_chunks(match_engine, job['worksheets'], output['matched'],
+                                             chunksize=options.get('chunksize', 5000))
+            stage.count(rows=match_info.get('Number of Rows', 0))
+
+        result['match_info'] = match_info
+
+        if output.get('query_results'):
+            with job_instrument.stage('Export') as stage:
+                success, message = export.write(candidates.df, output['query_results'],
+                                                compression=output.get('compression'))
+                stage.count(rows=len(candidates))
+
+            if not success:
+                result['message'] = message
+                return result
+
+        result['success'] = True
+
+    except Exception as e:
+        result['message'] = str(e)
+
+    return result
+
+
+def prepare(match_engine, source, statement, parameters=None):
+
+    """
+    Gets the candidates of a query and prepares a MatchEngine for them, see
+    engine.MatchEngine.warm
+
+    Returns
+    -------
+    ColumnarRecords
+        The candidates
+    """
+
+    candidates = source.get(statement, parameters)
+
+    match_engine.y_records = candidates
+    match_engine.warm()
+
+    return candidates
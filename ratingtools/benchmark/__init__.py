@@ -0,0 +1,4 @@
+from . import synthetic
+from . import stand_in
+from . import scenarios
+from . import startup
\ No newline at end of file
@@ -0,0 +1,277 @@
+# built-ins
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+# internal packages
+from . import startup, synthetic
+from .stand_in import QueryTool
+from match import match, engine, normalize, blocking, export
+from match.instrument import Instrument
+from match.records import ColumnarRecords
+from harvest import harvest
+
+# external packages
+import pandas
+
+
+SCALES = (1000, 10000, 100000)
+
+# wall time may grow by this share, and precision or recall drop by this much, before it is a regression
+WALL_TOLERANCE = 0.15
+ACCURACY_TOLERANCE = 0.005
+
+COLUMNS_TO_MATCH = {'lastname': 'lastname', 'firstname': 'firstname', 'middlename': 'middlename'}
+WEIGHTS = {'lastname': 2}
+
+
+def workload(scale, seed=0):
+
+    """
+    Returns the candidates, the worksheet and the true candidate_id of every worksheet
+    row of a scale. A worksheet has a row for every tenth candidate, at least 100.
+    """
+
+    candidates_df = synthetic.candidates(scale, seed=seed)
+    worksheet_df, truth = synthetic.worksheet(candidates_df, max(scale // 10, 100), seed=seed + 1)
+
+    return candidates_df, worksheet_df, truth
+
+
+def accuracy(matched_df, truth):
+
+    """
+    Returns the precision and recall of a match
+
+    A row counts as predicted when it was matched or ambiguous, and as correct
+    when the candidate_id it was given is the one it was generated from.
+    """
+
+    predicted = matched_df['match_status'].isin(['Matched', 'Ambiguous']).to_numpy()
+    correct = predicted & (matched_df['candidate_id'].to_numpy() == truth.to_numpy())
+    relevant = (truth != '').to_numpy()
+
+    return {'precision': round(float(correct.sum() / predicted.sum()), 4) if predicted.sum() else 0.0,
+            'recall': round(float(correct.sum() / relevant.sum()), 4) if relevant.sum() else 0.0}
+
+
+def run_scale(scale, directory, seed=0, processes=1, top_k=None):
+
+    """
+    Runs every scenario at a scale: read, query, match, harvest generate, and export as xlsx and parquet.
+    With top_k, matching with the candidate index is run as a scenario of its own, "match index".
+
+    Parameters
+    ----------
+    scale : int
+        Number of candidates
+
+    directory : str
+        Where the worksheet and the exported files are written
+
+    seed : int, default=0
+        Seed of the synthetic data
+
+    processes : int, default=1
+        Number of processes matching
+
+    top_k : int, optional
+        Candidates scored per worksheet row in the "match index" scenario, see engine.MatchEngine.
+        The "match" scenario always scores every candidate of a block.
+
+    Returns
+    -------
+    (list of dict, dict)
+        Measurements of every scenario, and the precision and recall of the match,
+        and of the match with the index as index_precision and index_recall
+    """
+
+    bench = Instrument(enabled=True, name=str(scale))
+    candidates_df, worksheet_df, truth = workload(scale, seed)
+
+    worksheet_path = os.path.join(directory, f'worksheet_{scale}.csv')
+    worksheet_df.to_csv(worksheet_path, index=False)
+
+    with bench.stage('read') as stage:
+        rating_worksheet = match.RatingWorksheet(processes=1)
+        success, message = rating_worksheet.read([worksheet_path])
+        if not success:
+            raise RuntimeError(message)
+
+        stage.count(rows=len(rating_worksheet.df))
+
+    with bench.stage('query') as stage:
+        query_tool = QueryTool(candidates_df)
+        candidates = query_tool.results(as_format='records')
+        query_tool.close()
+        stage.count(rows=len(candidates))
+
+    with bench.stage('match') as stage:
+        matched_df, match_info = _match(rating_worksheet.df, candidates, processes)
+        stage.count(rows=len(matched_df), pairs=int(match_info['Comparisons']))
+
+    scale_accuracy = dict(accuracy(matched_df, truth), scale=scale)
+
+    if top_k:
+        with bench.stage('match index') as stage:
+            index_df, match_info = _match(rating_worksheet.df, candidates, processes, top_k=top_k)
+            stage.count(rows=len(index_df), pairs=int(match_info['Comparisons']))
+
+        scale_accuracy.update({f'index_{k}': v for k, v in accuracy(index_df, truth).items()})
+
+    with bench.stage('harvest generate') as stage:
+        rating_harvest = harvest.RatingHarvest()
+        rating_harvest.span, rating_harvest.sig_id = '2022', '1'
+        rating_harvest.df = matched_df
+        rating_harvest.generate()
+        stage.count(rows=len(rating_harvest.df))
+
+    with bench.stage('export') as stage:
+        success, message = export.write(matched_df, os.path.join(directory, f'matched_{scale}.xlsx'))
+        if not success:
+            raise RuntimeError(message)
+
+        stage.count(rows=len(matched_df))
+
+    with bench.stage('export parquet') as stage:
+        success, message = export.write(matched_df, os.path.join(directory, f'matched_{scale}.parquet'))
+        if not success:
+            raise RuntimeError(message)
+
+        stage.count(rows=len(matched_df))
+
+    measurements = []
+
+    for s in bench.stages:
+        measurement = {'scale': scale, 'scenario': s.name, 'wall': round(s.wall, 4), 'cpu': round(s.cpu, 4),
+                       'peak_rss': s.peak_rss, 'rows': s.counts.get('rows', 0),
+                       'rows_per_second': round(s.counts.get('rows', 0) / s.wall, 1) if s.wall else None}
+
+        if 'pairs' in s.counts:
+            measurement['pairs'] = s.counts['pairs']
+            measurement['pairs_per_second'] = round(s.counts['pairs'] / s.wall, 1) if s.wall else None
+
+        measurements.append(measurement)
+
+    return measurements, scale_accuracy
+
+
+def run(scales=SCALES, seed=0, processes=1, top_k=None):
+
+    """
+    Runs every scenario at every scale
+
+    Returns
+    -------
+    dict
+        The commit, environment and settings of the run, the measurements of
+        every scenario and the accuracy of the match at every scale
+    """
+
+    results = {'commit': _commit(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'python': platform.python_version(), 'platform': platform.platform(),
+               'cpu_count': os.cpu_count(),
+               'settings': {'scales': list(scales), 'seed': seed, 'processes': processes, 'top_k': top_k},
+               'measurements': [], 'accuracy': []}
+
+    menus = startup.measure()
+    results['measurements'].append({'scale': 0, 'scenario': 'startup', 'wall': menus['seconds'],
+                                    'deferred_modules_loaded': menus['loaded']})
+
+    with tempfile.TemporaryDirectory(prefix='ratingtools_benchmark_') as directory:
+        for scale in scales:
+            measurements, scale_accuracy = run_scale(scale, directory, seed=seed, processes=processes, top_k=top_k)
+            results['measurements'].extend(measurements)
+            results['accuracy'].append(scale_accuracy)
+
+    return results
+
+
+def compare(results, baseline):
+
+    """
+    Compares the results of a run with those of a baseline run
+
+    Returns
+    -------
+    list of str
+        Regressions: scenarios whose wall time grew by more than WALL_TOLERANCE,
+        and scales whose precision or recall dropped by more than ACCURACY_TOLERANCE
+    """
+
+    regressions = []
+
+    baseline_walls = {(m['scale'], m['scenario']): m['wall'] for m in baseline['measurements']}
+    for m in results['measurements']:
+        before = baseline_walls.get((m['scale'], m['scenario']))
+        if before and m['wall'] > before * (1 + WALL_TOLERANCE):
+            regressions.append(f"{m['scenario']} at {m['scale']:,}: {before:.3f}s to {m['wall']:.3f}s")
+
+    baseline_accuracy = {a['scale']: a for a in baseline['accuracy']}
+    for a in results['accuracy']:
+        before = baseline_accuracy.get(a['scale'])
+        for metric in ('precision', 'recall', 'index_precision', 'index_recall'):
+            if before and metric in a and metric in before and a[metric] < before[metric] - ACCURACY_TOLERANCE:
+                regressions.append(f"{metric} at {a['scale']:,}: {before[metric]:.4f} to {a[metric]:.4f}")
+
+    return regressions
+
+
+def main(scales=SCALES, seed=0, processes=1, top_k=None, output=None, baseline=None):
+
+    """
+    Runs the benchmark, prints its results as JSON and writes them to output
+
+    Returns
+    -------
+    int
+        1 if there are regressions against the baseline results file, 0 otherwise
+    """
+
+    results = run(scales, seed=seed, processes=processes, top_k=top_k)
+    document = json.dumps(results, indent=1)
+
+    if output:
+        with open(output, 'w') as f:
+            f.write(document)
+
+    print(document)
+
+    if not baseline:
+        return 0
+
+    with open(baseline) as f:
+        regressions = compare(results, json.load(f))
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions else 0
+
+
+def _match(worksheet_df, candidates, processes, top_k=None):
+
+    config = engine.MatchConfig(COLUMNS_TO_MATCH, ['candidate_id'])
+    normalizer, normalizers_by_column = normalize.worksheet_normalizers()
+    match_engine = engine.MatchEngine(engine.Matcher(config), weights=WEIGHTS,
+                                      normalizer=normalizer, normalizers_by_column=normalizers_by_column,
+                                      blocking=blocking.Blocking(blocking.WORKSHEET_KEYS),
+                                      processes=processes, top_k=top_k)
+
+    match_engine.x_records = ColumnarRecords(worksheet_df)
+    match_engine.y_records = candidates
+    records, match_info = match_engine.match()
+
+    return pandas.DataFrame.from_dict(records, orient='index'), match_info
+
+
+def _commit():
+
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
@@ -0,0 +1,49 @@
+# built-ins
+import sqlite3
+from types import SimpleNamespace
+
+
+# statement the stand-in is queried with until another is set
+CANDIDATES_QUERY = ("SELECT candidate_id, firstname, nickname, middlename, lastname, suffix, "
+                    "party, state_id, office, district FROM candidates")
+
+
+class QueryTool:
+
+    """
+    Stands in for vs_library.database.QueryTool with an in-memory SQLite database,
+    so that matching can be benchmarked without the Vote Smart database
+
+    Has the attributes of the QueryTool that ratingtools reads: `query`, with
+    its statement and parameters, `connection_adapter.connection` and `results`.
+    """
+
+    def __init__(self, candidates_df):
+
+        """
+        Parameters
+        ----------
+        candidates_df : pandas.DataFrame
+            Rows of the candidates table
+        """
+
+        connection = sqlite3.connect(':memory:', check_same_thread=False)
+        candidates_df.to_sql('candidates', connection, index=False)
+
+        self.connection_adapter = SimpleNamespace(connection=connection)
+        self.query = SimpleNamespace(statement=CANDIDATES_QUERY, parameters=())
+
+    def results(self, as_format='records'):
+
+        """Executes the query and returns its rows as a list of dicts"""
+
+        if as_format != 'records':
+            raise ValueError(f"Unsupported format: {as_format}")
+
+        cursor = self.connection_adapter.connection.execute(self.query.statement, self.query.parameters or ())
+        columns = [d[0] for d in cursor.description]
+
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def close(self):
+        self.connection_adapter.connection.close()
@@ -0,0 +1,78 @@
+# built-ins
+import json
+import os
+import subprocess
+import sys
+
+
+# seconds the modules drawing the main menu may take to import
+IMPORT_BUDGET = 0.3
+
+# modules the main menu is drawn with, everything else is imported once a feature is chosen
+MENU_MODULES = ('ratingtools', 'ratingtools_cli')
+
+# modules that must not be imported before a feature is chosen
+DEFERRED_MODULES = ('pandas', 'numpy', 'pyarrow', 'rapidfuzz', 'tqdm', 'pg8000', 'record_matcher',
+                    'match.match', 'match.engine', 'harvest.harvest', 'vs_library.database')
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for module in {modules!r}:
+    __import__(module)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def measure(modules=MENU_MODULES, repeat=5):
+
+    """
+    Imports modules in a new interpreter, repeat times
+
+    Returns
+    -------
+    dict
+        The fastest import in seconds, and the deferred modules that were imported along
+    """
+
+    probe = _PROBE.format(modules=tuple(modules), deferred=DEFERRED_MODULES)
+    runs = []
+
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True,
+                                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    return {'seconds': round(min(r['seconds'] for r in runs), 4), 'loaded': runs[0]['loaded']}
+
+
+def main(budget=None, output=None):
+
+    """
+    Benchmarks how long the main menu takes to import, prints the result as JSON
+    and writes it to output
+
+    Returns
+    -------
+    int
+        1 if the import took longer than budget, or a deferred module was imported, 0 otherwise
+    """
+
+    budget = IMPORT_BUDGET if budget is None else budget
+    result = dict(measure(), budget=budget, modules=list(MENU_MODULES))
+    document = json.dumps(result, indent=1)
+
+    if output:
+        with open(output, 'w') as f:
+            f.write(document)
+
+    print(document)
+
+    if result['loaded']:
+        print(f"OVER BUDGET imported before a feature is chosen: {', '.join(result['loaded'])}")
+
+    if result['seconds'] > budget:
+        print(f"OVER BUDGET {result['seconds']:.3f}s to import the menus, the budget is {budget:.3f}s")
+
+    return 1 if result['loaded'] or result['seconds'] > budget else 0
@@ -0,0 +1,193 @@
+# external packages
+import numpy
+import pandas
+
+
+# first names and the nicknames they go by
+NICKNAMES = {'robert': 'bob', 'william': 'bill', 'richard': 'dick', 'james': 'jim', 'john': 'jack',
+             'michael': 'mike', 'thomas': 'tom', 'charles': 'chuck', 'joseph': 'joe', 'daniel': 'dan',
+             'christopher': 'chris', 'matthew': 'matt', 'anthony': 'tony', 'donald': 'don',
+             'steven': 'steve', 'edward': 'ed', 'kenneth': 'ken', 'timothy': 'tim', 'ronald': 'ron',
+             'gregory': 'greg', 'nicholas': 'nick', 'benjamin': 'ben', 'samuel': 'sam', 'patrick': 'pat',
+             'elizabeth': 'liz', 'margaret': 'peggy', 'katherine': 'kate', 'jennifer': 'jen',
+             'patricia': 'pat', 'susan': 'sue', 'deborah': 'deb', 'rebecca': 'becky', 'kimberly': 'kim',
+             'jessica': 'jess', 'cynthia': 'cindy', 'victoria': 'vicky', 'barbara': 'barb',
+             'alexandra': 'alex', 'theresa': 'terry', 'abigail': 'abby'}
+
+FIRSTNAMES = list(NICKNAMES) + ['mary', 'linda', 'karen', 'nancy', 'lisa', 'sandra', 'ashley', 'donna',
+                                'carol', 'michelle', 'emily', 'amanda', 'melissa', 'laura', 'maria',
+                                'jose', 'juan', 'luis', 'carlos', 'mark', 'paul', 'george', 'kevin',
+                                'brian', 'jason', 'eric', 'scott', 'jeffrey', 'frank', 'raymond', 'gary']
+
+LASTNAMES = ['smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller', 'davis', 'rodriguez',
+             'martinez', 'hernandez', 'lopez', 'gonzalez', 'wilson', 'anderson', 'thomas', 'taylor',
+             'moore', 'jackson', 'martin', 'lee', 'perez', 'thompson', 'white', 'harris', 'sanchez',
+             'clark', 'ramirez', 'lewis', 'robinson', 'walker', 'young', 'allen', 'king', 'wright',
+             'scott', 'torres', 'nguyen', 'hill', 'flores', 'green', 'adams', 'nelson', 'baker', 'hall',
+             "o'neil", 'mcdonald', 'de la cruz', 'van buren', 'st. john']
+
+# syllables surnames are made of once the common ones run out
+SYLLABLES = ['ab', 'bar', 'ber', 'bran', 'car', 'dal', 'den', 'fer', 'gal', 'ham', 'har', 'kel', 'lan',
+             'lind', 'mar', 'mont', 'nor', 'ows', 'par', 'quin', 'ros', 'sel', 'ston', 'tal', 'ton',
+             'van', 'wick', 'wood', 'ley', 'son', 'man', 'ford', 'berg', 'ski', 'ello', 'ez']
+
+SUFFIXES = ['jr', 'sr', 'ii', 'iii']
+
+STATES = ['AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA',
+          'KS', 'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
+          'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT',
+          'VA', 'WA', 'WV', 'WI', 'WY']
+
+# office and the number of districts a state has for it, 0 for statewide offices
+OFFICES = {'State House': 100, 'State Senate': 40, 'U.S. House': 10, 'U.S. Senate': 0, 'Governor': 0}
+
+PARTIES = ['Democratic', 'Republican', 'Independent', 'Libertarian', 'Green']
+
+WORKSHEET_COLUMNS = ['lastname', 'firstname', 'middlename', 'suffix', 'nickname',
+                     'party', 'state', 'state_id', 'office', 'district',
+                     'candidate_id', 'sig_rating', 'our_rating']
+
+
+def candidates(number_of_candidates, seed=0):
+
+    """
+    Generates a candidate table like the results of the candidate queries
+
+    Parameters
+    ----------
+    number_of_candidates : int
+        Number of candidates generated
+
+    seed : int, default=0
+        Seed of the generator, the same seed always generates the same table
+
+    Returns
+    -------
+    pandas.DataFrame
+        candidate_id, firstname, nickname, middlename, lastname, suffix, party,
+        state_id, office and district of every candidate, as str
+    """
+
+    rng = numpy.random.default_rng(seed)
+    n = number_of_candidates
+
+    firstnames = rng.choice(FIRSTNAMES, n)
+    offices = rng.choice(list(OFFICES), n, p=[0.55, 0.2, 0.15, 0.05, 0.05])
+    districts = [str(rng.integers(1, OFFICES[o] + 1)) if OFFICES[o] else '' for o in offices]
+
+    return pandas.DataFrame({
+        'candidate_id': [str(i) for i in rng.permutation(n) + 10000],
+        'firstname': [f.title() for f in firstnames],
+        'nickname': [NICKNAMES.get(f, '').title() if rng.random() < 0.5 else '' for f in firstnames],
+        'middlename': [rng.choice(FIRSTNAMES).title() if rng.random() < 0.6 else '' for _ in range(n)],
+        'lastname': _lastnames(rng, n),
+        'suffix': [rng.choice(SUFFIXES).title() if rng.random() < 0.03 else '' for _ in range(n)],
+        'party': rng.choice(PARTIES, n, p=[0.45, 0.45, 0.05, 0.03, 0.02]),
+        'state_id': rng.choice(STATES, n),
+        'office': offices,
+        'district': districts,
+    })
+
+
+def worksheet(candidates_df, number_of_rows, seed=0, typo_rate=0.2, nickname_rate=0.15,
+              missing_middlename_rate=0.5, unmatched_rate=0.1):
+
+    """
+    Generates a rating worksheet from a sample of candidates, with the mistakes
+    worksheets usually have
+
+    Parameters
+    ----------
+    candidates_df : pandas.DataFrame
+        Candidates generated by `candidates`
+
+    number_of_rows : int
+        Number of worksheet rows generated
+
+    seed : int, default=0
+        Seed of the generator
+
+    typo_rate : float, default=0.2
+        Share of rows with a typo in the last or first name
+
+    nickname_rate : float, default=0.15
+        Share of rows giving the nickname of a candidate as the first name
+
+    missing_middlename_rate : float, default=0.5
+        Share of rows without the middle name of the candidate
+
+    unmatched_rate : float, default=0.1
+        Share of rows of people who are not among the candidates
+
+    Returns
+    -------
+    (pandas.DataFrame, pandas.Series)
+        The worksheet, with every column of match.RatingWorksheet as str and
+        no candidate_id, and the candidate_id each row truly belongs to, '' for
+        rows that should not be matched
+    """
+
+    rng = numpy.random.default_rng(seed)
+    sample = candidates_df.iloc[rng.integers(0, len(candidates_df), number_of_rows)].reset_index(drop=True)
+
+    rows = []
+    truth = []
+
+    for candidate in sample.itertuples(index=False):
+        row = {c: '' for c in WORKSHEET_COLUMNS}
+        row.update(lastname=candidate.lastname, firstname=candidate.firstname,
+                   middlename=candidate.middlename, suffix=candidate.suffix, party=candidate.party,
+                   state=candidate.state_id, state_id=candidate.state_id,
+                   office=candidate.office, district=candidate.district)
+
+        if rng.random() < unmatched_rate:
+            row['lastname'] = _lastnames(rng, 1)[0] + rng.choice(SYLLABLES)
+            truth.append('')
+        else:
+            truth.append(candidate.candidate_id)
+
+        if candidate.nickname and rng.random() < nickname_rate:
+            row['firstname'] = candidate.nickname
+
+        if rng.random() < missing_middlename_rate:
+            row['middlename'] = ''
+
+        if rng.random() < typo_rate:
+            column = 'lastname' if rng.random() < 0.6 else 'firstname'
+            row[column] = typo(rng, row[column])
+
+        row['sig_rating'] = str(rng.integers(0, 101))
+        row['our_rating'] = row['sig_rating']
+        rows.append(row)
+
+    return pandas.DataFrame(rows, columns=WORKSHEET_COLUMNS), pandas.Series(truth, name='candidate_id')
+
+
+def typo(rng, value):
+
+    """Returns value with one character inserted, deleted, replaced or swapped with the next"""
+
+    if len(value) < 2:
+        return value
+
+    i = int(rng.integers(0, len(value) - 1))
+    letter = chr(int(rng.integers(ord('a'), ord('z') + 1)))
+    kind = rng.integers(0, 4)
+
+    if kind == 0:
+        return value[:i] + letter + value[i:]
+    elif kind == 1:
+        return value[:i] + value[i+1:]
+    elif kind == 2:
+        return value[:i] + letter + value[i+1:]
+    else:
+        return value[:i] + value[i+1] + value[i] + value[i+2:]
+
+
+def _lastnames(rng, n):
+
+    # common surnames for half the candidates, made up ones so large tables stay varied
+    common = rng.choice(LASTNAMES, n)
+    made_up = [''.join(rng.choice(SYLLABLES, rng.integers(2, 4))) for _ in range(n)]
+
+    return [(c if rng.random() < 0.5 else m).title() for c, m in zip(common, made_up)]
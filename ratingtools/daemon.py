@@ -0,0 +1,360 @@
+# built-ins
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# internal packages
+from batch import CandidateSource, build_engine, connect
+from match import cache, journal, query, remote
+from match.records import ColumnarRecords, categorize
+
+# external packages
+import pandas
+
+
+# match engines kept warm at once, one per candidate query and match settings
+MAX_ENGINES = 8
+
+# candidates of queries other than the preloaded ones kept at once
+MAX_QUERIES = 4
+
+
+def load_config(filepath):
+
+    """
+    Reads the configuration of the daemon, a JSON document of the form
+
+    {
+        "connection": {"host": "...", "port": 5432, "database": "...", "user": "...",
+                       "password_env": "VOTESMART_DB_PASSWORD"},
+        "token_env": "RATINGTOOLS_DAEMON_TOKEN",
+        "cache_directory": "...",
+        "index_directory": "...",
+        "preload": [{"statement": "SELECT ...", "parameters": [...]}]
+    }
+
+    "connection" is that of a batch file, see batch.load_jobs. The candidates of
+    every "preload" query are loaded when the daemon starts and kept, others on
+    the first request for them, see MatchService. Worksheets restricted by
+    pushdown are matched against a preloaded query they restrict.
+    "cache_directory", "index_directory" and "preload" are optional.
+
+    Every request must carry the token held by the environment variable named by
+    "token_env", remote.TOKEN_ENV unless specified, as the daemon runs the queries
+    it is sent with the credentials of the connection.
+    """
+
+    with open(filepath) as f:
+        return json.load(f)
+
+
+class MatchService:
+
+    """
+    Keeps the candidates of queries and the match engines scoring against them
+    in memory, so that a worksheet is matched without querying, normalizing or
+    indexing the candidates again
+
+    Preloaded candidates are kept for as long as the daemon runs, those of other
+    queries only up to max_queries, the least recently used being dropped first
+    along with their engines. A query restricted to a worksheet is matched
+    against the candidates of its unrestricted query whenever those are held.
+    """
+
+    def __init__(self, source, processes=1, index_directory=None, max_engines=MAX_ENGINES,
+                 max_queries=MAX_QUERIES):
+
+        """
+        Parameters
+        ----------
+        source : batch.CandidateSource
+            Where the candidates of a query come from, kept once loaded
+
+        processes : int, default=1
+            Number of processes large matches are sharded across
+
+        index_directory : str, optional
+            Where candidate indexes are saved and opened from
+
+        max_engines : int, default=MAX_ENGINES
+            Engines kept warm, the least recently used is dropped first
+
+        max_queries : int, default=MAX_QUERIES
+            Candidates kept of queries that were not preloaded
+        """
+
+        self.source = source
+        self.processes = processes
+        self.index_directory = index_directory
+        self.max_engines = max_engines
+        self.max_queries = max_queries
+
+        self.started = time.time()
+        self.matches = 0
+
+        self.__lock = threading.Lock()
+        self.__engines = OrderedDict()
+
+        # key of a query to its statement and parameters, preloaded ones are never dropped
+        self.__preloaded = {}
+        self.__queries = OrderedDict()
+
+    def preload(self, statement, parameters=None):
+
+        """Loads the candidates of a query and keeps them for as long as the daemon runs"""
+
+        candidates = self.source.get(statement, parameters)
+
+        with self.__lock:
+            self.__preloaded[cache.CandidateCache.key(statement, parameters)] = (statement, parameters)
+
+        return candidates
+
+    def candidates(self, statement, parameters=None, filters=None):
+
+        """
+        Returns the candidates of a query
+
+        Parameters
+        ----------
+        statement : str
+            SELECT statement of the candidate query
+
+        parameters : tuple or dict, optional
+            Parameters of the statement
+
+        filters : dict, optional
+            Values the query is restricted to, see query.restrict. Ignored when
+            the candidates of the unrestricted query are held
+
+        Returns
+        -------
+        (str, ColumnarRecords)
+            Key of the query the candidates are of, and the candidates
+        """
+
+        key = cache.CandidateCache.key(statement, parameters)
+
+        with self.__lock:
+            if filters and key not in self.__preloaded and key not in self.__queries:
+                statement, parameters = query.restrict(statement, parameters, filters)
+                key = cache.CandidateCache.key(statement, parameters)
+
+            if key not in self.__preloaded:
+                self.__queries[key] = (statement, parameters)
+                self.__queries.move_to_end(key)
+
+                while len(self.__queries) > self.max_queries:
+                    self._drop(*self.__queries.popitem(last=False))
+
+        return key, self.source.get(statement, parameters)
+
+    def _drop(self, key, signature):
+
+        """Drops the candidates of a query and the engines matching against them, the lock being held"""
+
+        self.source.drop(*signature)
+
+        for engine_key in [k for k in self.__engines if k[0] == key]:
+            del self.__engines[engine_key]
+
+    def match(self, statement, parameters, settings, df, filters=None):
+
+        """
+        Matches a worksheet against the candidates of a query
+
+        Parameters
+        ----------
+        statement : str
+            SELECT statement of the candidate query
+
+        parameters : tuple or dict, optional
+            Parameters of the statement
+
+        settings : dict
+            "match" settings of a batch job, see batch.load_jobs
+
+        df : pandas.DataFrame
+            Worksheet matched
+
+        filters : dict, optional
+            Values the query is restricted to, see candidates
+
+        Returns
+        -------
+        (pandas.DataFrame, dict)
+            Matched worksheet and a summary of the match
+        """
+
+        candidates_key, candidates = self.candidates(statement, parameters, filters)
+
+        # engines keeping alternatives rematch at another required threshold without scoring again
+        engine_settings = {k: v for k, v in settings.items()
+                           if not (k == 'required_threshold' and settings.get('keep'))}
+        key = (candidates_key, json.dumps(engine_settings, sort_keys=True))
+
+        with self.__lock:
+            if key in self.__engines:
+                self.__engines.move_to_end(key)
+            else:
+                match_engine = build_engine(settings, processes=self.processes, journal=journal.MatchJournal(),
+                                            index_directory=self.index_directory)
+                match_engine.y_records = candidates
+                self.__engines[key] = (threading.Lock(), match_engine)
+
+                while len(self.__engines) > self.max_engines:
+                    self.__engines.popitem(last=False)
+
+            engine_lock, match_engine = self.__engines[key]
+
+        # an engine matches one worksheet at a time, it keeps what it normalized in between
+        with engine_lock:
+            match_engine.config.required_threshold = settings.get('required_threshold', 80)
+            match_engine.x_records = ColumnarRecords(categorize(df))
+            records, match_info = match_engine.match()
+
+        self.matches += 1
+        return pandas.DataFrame.from_dict(records, orient='index'), match_info
+
+    def status(self):
+
+        return {'pid': os.getpid(), 'started': self.started, 'matches': self.matches,
+                'engines': len(self.__engines), 'queries': len(self.__preloaded) + len(self.__queries)}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+
+    """
+    Serves the requests of remote.MatchDaemon
+
+    GET /status, POST /candidates with a query, and POST /match with a query,
+    match settings and a worksheet. Every body is JSON, and every request is
+    refused unless it carries the token of the daemon.
+    """
+
+    def do_GET(self):
+
+        if not self._authorized():
+            self._respond(401, {'message': "A valid token is required"})
+        elif urlsplit(self.path).path == '/status':
+            self._respond(200, self.server.service.status())
+        else:
+            self._respond(404, {'message': f"Not found: {self.path}"})
+
+    def do_POST(self):
+
+        path = urlsplit(self.path).path
+        service = self.server.service
+
+        if not self._authorized():
+            self._respond(401, {'message': "A valid token is required"})
+            return
+
+        # a web page can send other content types to a local address without the browser asking first
+        if self.headers.get_content_type() != 'application/json':
+            self._respond(415, {'message': "Requests must be application/json"})
+            return
+
+        try:
+            document = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+            if path == '/candidates':
+                _, candidates = service.candidates(document['statement'], document.get('parameters'),
+                                                   document.get('filters'))
+                self._respond(200, {'rows': len(candidates), 'columns': candidates.columns})
+
+            elif path == '/match':
+                matched_df, match_info = service.match(document['query']['statement'],
+                                                       document['query'].get('parameters'),
+                                                       document['match'], remote.load_frame(document['worksheet']),
+                                                       filters=document['query'].get('filters'))
+                self._respond(200, {'matched': remote.dump_frame(matched_df), 'match_info': match_info})
+
+            else:
+                self._respond(404, {'message': f"Not found: {self.path}"})
+
+        except Exception as e:
+            self._respond(500, {'message': str(e)})
+
+    def _authorized(self):
+
+        authorization = self.headers.get('Authorization', '')
+        return hmac.compare_digest(authorization.encode('utf-8'), f'Bearer {self.server.token}'.encode('utf-8'))
+
+    def _respond(self, code, document):
+
+        body = remote.dumps(document)
+
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(filepath, host='127.0.0.1', port=8765, processes=None):
+
+    """
+    Runs the match daemon until it is interrupted
+
+    Parameters
+    ----------
+    filepath : str
+        Path of the configuration of the daemon, see load_config
+
+    host : str, default='127.0.0.1'
+        Address listened on, only local clients can reach the default
+
+    port : int, default=8765
+        Port listened on
+
+    processes : int, optional
+        Number of processes large matches are sharded across, defaults to the number of cores
+
+    Returns
+    -------
+    int
+        0 once interrupted, 1 if no token is set
+    """
+
+    config = load_config(filepath)
+
+    token_env = config.get('token_env', remote.TOKEN_ENV)
+    token = os.environ.get(token_env)
+    if not token:
+        print(f"Set a token in {token_env}, clients of the daemon must hold the same token")
+        return 1
+
+    candidate_cache = cache.CandidateCache(config['cache_directory']) if config.get('cache_directory') else None
+    connection = connect(config['connection'])
+
+    try:
+        source = CandidateSource(connection, candidate_cache)
+        service = MatchService(source, processes=processes if processes else os.cpu_count(),
+                               index_directory=config.get('index_directory'))
+
+        for q in config.get('preload', []):
+            candidates = service.preload(q['statement'], q.get('parameters'))
+            print(f"Loaded {len(candidates):,} candidates of {q['statement'][:60]!r}")
+
+        server = ThreadingHTTPServer((host, port), RequestHandler)
+        server.service = service
+        server.token = token
+        print(f"Match daemon listening on http://{host}:{port}")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    finally:
+        connection.close()
+
+    return 0
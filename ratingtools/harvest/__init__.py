@@ -1,2 +1,21 @@
-from .harvest import *
-from . import harvest_cli
\ No newline at end of file
+# built-ins
+import importlib
+
+
+# submodules are imported on first use, so that importing one of them does not import them all
+_SUBMODULES = ('harvest', 'harvest_cli')
+
+# names of harvest.harvest that are also names of the package
+_HARVEST_NAMES = ('RatingHarvest',)
+
+
+def __getattr__(name):
+
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+
+    # only these import harvest.harvest, anything else is missing rather than failing to import
+    if name in _HARVEST_NAMES:
+        return getattr(importlib.import_module('.harvest', __name__), name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,11 @@
 
+# internal packages
+from match.export import write
+
 # external packages
+import numpy
 import pandas
 
-from vs_library.tools import pandas_extension
-
 
 class RatingHarvest:
 
@@ -40,31 +42,59 @@ class RatingHarvest:
             If pandas.DataFrame is empty, it will generate a dataframe with a specified number of rows
         """
         
-        df = pandas.DataFrame(columns=self.columns)
+        df = self._base(number_of_rows)
+
+        # constants are broadcast to every row
+        for attribute in self.columns[3:]:
+            df[attribute] = getattr(self, attribute)
+
+        self.df = df
+
+    def generate_many(self, sessions, number_of_rows=100):
+
+        """
+        Generates the harvest of many rating sessions in one pass, one session after another
+
+        Parameters
+        ----------
+        sessions : list of dict
+            span, sig_id, usesigrating, ratingsession and ratingformat_id of every
+            session, attributes not specified are empty
 
-        # only takes the first 3 columns
-        for column in self.columns[:3]:
-            if column in self.df.columns:
-                if any(self.df[column]):
-                    df[column] = self.df[column]
+        number_of_rows : int, default=100
+            If pandas.DataFrame is empty, every session will have a specified number of rows
+        """
 
-        number_of_rows = number_of_rows if not(len(df)) else len(df)
+        base = self._base(number_of_rows)
+        n = len(base)
 
-        df['span'] = [self.span] * number_of_rows
-        df['sig_id'] = [self.sig_id] * number_of_rows
-        df['usesigrating'] = [self.usesigrating] * number_of_rows
-        df['ratingsession'] = [self.ratingsession] * number_of_rows
-        df['ratingformat_id'] = [self.ratingformat_id] * number_of_rows
+        df = base.iloc[numpy.tile(numpy.arange(n), len(sessions))].reset_index(drop=True)
+
+        # each attribute is stored once per distinct value, as a categorical column
+        for attribute in self.columns[3:]:
+            codes, categories = pandas.factorize(pandas.Series([s.get(attribute, '') for s in sessions], dtype=object))
+            df[attribute] = pandas.Categorical.from_codes(numpy.repeat(codes, n), categories=categories)
 
         self.df = df
 
-    def export(self, filepath):
-        try:
-            success, message = pandas_extension.to_spreadsheet(self.df, filepath)
-            return success, message
+    def _base(self, number_of_rows):
+
+        # only takes the first 3 columns, the rest are left empty
+        columns = [c for c in self.columns[:3] if c in self.df.columns and self.df[c].astype(bool).any()]
+
+        index = self.df.index if columns else pandas.RangeIndex(number_of_rows)
+        df = pandas.DataFrame(index=index, columns=self.columns, dtype=object)
+
+        for column in columns:
+            df[column] = self.df[column]
+
+        return df
+
+    def export(self, filepath, compression=None):
+
+        """Writes the harvest file, as CSV, parquet or xlsx by its extension, see match.export.write"""
 
-        except Exception as e:
-            return False, str(e)
+        return write(self.df, filepath, compression=compression)
 
     def __dict__(self):
         return self.df.to_dict('records')
\ No newline at end of file
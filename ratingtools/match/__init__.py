@@ -1,2 +1,23 @@
-from .match import *
-from . import match_cli
\ No newline at end of file
+# built-ins
+import importlib
+
+
+# submodules are imported on first use, so that importing one of them does not import them all
+_SUBMODULES = ('match', 'match_cli', 'engine', 'normalize', 'blocking', 'cache', 'query', 'records',
+               'stream', 'journal', 'index', 'instrument', 'scoring', 'parallel', 'remote',
+               'alternatives', 'export')
+
+# names of match.match that are also names of the package
+_MATCH_NAMES = ('RatingWorksheet', 'read_spreadsheet')
+
+
+def __getattr__(name):
+
+    if name in _SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+
+    # only these import match.match, anything else is missing rather than failing to import
+    if name in _MATCH_NAMES:
+        return getattr(importlib.import_module('.match', __name__), name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,220 @@
+# built-ins
+import os
+import time
+
+# internal packages
+from .journal import CHECKPOINT_TTL
+
+# external packages
+import numpy
+
+
+class Alternatives:
+
+    """
+    Keeps the best scored candidates of every worksheet row matched, best first,
+    so that a match can be made again at another required threshold, or with
+    another of its candidates chosen for a row, without scoring again
+
+    Entries are keyed by a hash of a row's match values, like those of
+    journal.MatchJournal. Their version leaves out the required threshold, as
+    rows are scored down to min_score regardless of it when their alternatives
+    are kept. They serve any required threshold of at least min_score.
+
+    Like the checkpoint files of journal.MatchJournal, every version has a
+    sidecar file of its own, so sessions matching with other candidates or
+    settings never replace it. A session saving merges in the entries other
+    sessions of the same version saved meanwhile.
+    """
+
+    def __init__(self, keep=5, min_score=50, path=None):
+
+        """
+        Parameters
+        ----------
+        keep : int, default=5
+            Number of candidates kept per row
+
+        min_score : int, default=50
+            Score below which candidates are not kept, pairs that cannot reach
+            it are dropped while scoring
+
+        path : str, optional
+            Sidecar file the alternatives are saved to after a match or a choice,
+            named after the version, e.g. alternatives-<version>.npz for alternatives.npz
+        """
+
+        self.keep = keep
+        self.min_score = min_score
+        self.path = path
+        self.version = None
+
+        # row key to (candidate positions, scores, ambiguous), and to the rank chosen for it
+        self.__entries = {}
+        self.__choices = {}
+
+        # rows whose choice was dropped, left out of the choices of other sessions when saving
+        self.__dropped = set()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+    def reset(self, version):
+
+        """Drops every entry if version differs from the version they were recorded for"""
+
+        if version == self.version:
+            return
+
+        self.__entries = {}
+        self.__choices = {}
+        self.__dropped = set()
+        self.version = version
+
+        if self.path:
+            self.__entries, self.__choices = self._read(version)
+            self._evict()
+
+    def sidecar_path(self, version=None):
+
+        """Returns the sidecar file of a version, of the current version unless specified"""
+
+        root, extension = os.path.splitext(self.path)
+        return f'{root}-{version if version else self.version}{extension}'
+
+    def get(self, key):
+
+        """Returns (candidate position, score, ambiguous) of a row, those of its chosen candidate if one was"""
+
+        positions, scores, ambiguous = self.__entries[key]
+        rank = self.__choices.get(key)
+
+        if rank is not None and rank < len(positions) and positions[rank] >= 0:
+            return positions[rank], scores[rank], False
+
+        return positions[0], scores[0], ambiguous
+
+    def candidates(self, key):
+
+        """Returns the positions and scores of the candidates kept for a row, best first, -1 past the last"""
+
+        positions, scores, _ = self.__entries[key]
+        return positions, scores
+
+    def record(self, key, positions, scores, ambiguous):
+
+        """Records the best candidates of a row"""
+
+        self.__entries[key] = (numpy.asarray(positions, dtype=numpy.int64),
+                               numpy.asarray(scores, dtype=numpy.float32), bool(ambiguous))
+
+    def chosen(self, key):
+
+        """Returns whether a candidate was chosen for a row"""
+
+        rank = self.__choices.get(key)
+        if rank is None or key not in self.__entries:
+            return False
+
+        positions = self.__entries[key][0]
+        return rank < len(positions) and positions[rank] >= 0
+
+    def choose(self, key, rank):
+
+        """
+        Chooses the candidate of a row at rank, 0 being the best. None drops the choice
+
+        Raises
+        ------
+        ValueError
+            If rank is not that of a candidate kept for the row
+        """
+
+        if rank is None:
+            self.__choices.pop(key, None)
+            self.__dropped.add(key)
+            return
+
+        if not 0 <= rank < self.keep:
+            raise ValueError(f"rank must be from 0 to {self.keep - 1}, not {rank}")
+
+        if key not in self.__entries or self.__entries[key][0][rank] < 0:
+            raise ValueError(f"no candidate of rank {rank} was kept for this row")
+
+        self.__choices[key] = int(rank)
+        self.__dropped.discard(key)
+
+    def save(self):
+
+        """Writes the alternatives to the sidecar file of their version, replacing it once written"""
+
+        if not self.path:
+            return
+
+        # the choices made here take precedence over those of other sessions
+        entries, choices = self._read(self.version)
+        self.__entries = {**entries, **self.__entries}
+        self.__choices = {**{k: r for k, r in choices.items() if k not in self.__dropped}, **self.__choices}
+
+        keys = list(self.__entries)
+        positions = numpy.full((len(keys), self.keep), -1, dtype=numpy.int64)
+        scores = numpy.full((len(keys), self.keep), -1, dtype=numpy.float32)
+
+        for i, key in enumerate(keys):
+            row_positions, row_scores, _ = self.__entries[key]
+            positions[i, :len(row_positions)] = row_positions[:self.keep]
+            scores[i, :len(row_scores)] = row_scores[:self.keep]
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary = f'{self.sidecar_path()}.{os.getpid()}.tmp'
+
+        with open(temporary, 'wb') as f:
+            numpy.savez(f, version=numpy.array(self.version), keys=numpy.array(keys, dtype=str),
+                        positions=positions, scores=scores,
+                        ambiguous=numpy.array([self.__entries[k][2] for k in keys], dtype=bool),
+                        choice_keys=numpy.array(list(self.__choices), dtype=str),
+                        choice_ranks=numpy.array(list(self.__choices.values()), dtype=numpy.int64))
+
+        os.replace(temporary, self.sidecar_path())
+
+    def _read(self, version):
+
+        """Returns the entries and choices of the sidecar file of a version, none if it is missing or not of it"""
+
+        try:
+            with numpy.load(self.sidecar_path(version), allow_pickle=False) as f:
+                if str(f['version']) != version:
+                    return {}, {}
+
+                entries = {k: (p, s, a) for k, p, s, a in
+                           zip(f['keys'].tolist(), f['positions'], f['scores'], f['ambiguous'].tolist())}
+                choices = dict(zip(f['choice_keys'].tolist(), f['choice_ranks'].tolist()))
+
+        except (OSError, KeyError, ValueError):
+            return {}, {}
+
+        return entries, choices
+
+    def _evict(self):
+
+        """Removes the sidecar files of other versions not written for journal.CHECKPOINT_TTL seconds"""
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        root, extension = os.path.splitext(os.path.basename(self.path))
+        now = time.time()
+
+        if not os.path.isdir(directory):
+            return
+
+        for entry in os.scandir(directory):
+            if not (entry.name.startswith(f'{root}-') and entry.name.endswith(extension)):
+                continue
+
+            if entry.path != os.path.abspath(self.sidecar_path()) and now - entry.stat().st_mtime >= CHECKPOINT_TTL:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
@@ -0,0 +1,272 @@
+# external packages
+import numpy
+import pandas
+
+
+# worksheet key columns to the candidate columns holding the same keys
+WORKSHEET_KEYS = {'state_id': 'state_id', 'office': 'office', 'district': 'district'}
+
+
+class Blocking:
+
+    """
+    Groups candidates by key columns, so that worksheet rows are only scored
+    against the candidates sharing their keys
+
+    Keys are relaxed level by level: a worksheet row whose block is empty, or
+    whose key values are missing, falls through to the next level. Key values
+    are compared as integer codes shared by the worksheet and the candidates.
+    """
+
+    def __init__(self, keys, levels=None):
+
+        """
+        Parameters
+        ----------
+        keys : dict
+            Worksheet column to the candidate column holding the same key,
+            e.g. {'state_id': 'state_id', 'office': 'office'}
+
+        levels : list of tuple, optional
+            Worksheet key columns used at each level, from the strictest to the
+            most relaxed. An empty tuple compares against every candidate.
+            Defaults to dropping the last key one level at a time, down to no key at all.
+        """
+
+        self.keys = dict(keys)
+
+        if levels is None:
+            columns = tuple(self.keys)
+            levels = [columns[:i] for i in range(len(columns), -1, -1)]
+
+        self.levels = [tuple(level) for level in levels]
+
+    def index(self, y_columns, number_of_candidates):
+
+        """
+        Returns the candidates sorted into the blocks of every level, built once
+        for a set of candidates and used to group any number of worksheets
+
+        Parameters
+        ----------
+        y_columns : dict
+            Normalized candidate key columns as numpy arrays
+
+        number_of_candidates : int
+            Number of candidates
+
+        Returns
+        -------
+        BlockIndex
+        """
+
+        return BlockIndex(self, y_columns, number_of_candidates)
+
+    def groups(self, x_columns, block_index, number_of_rows):
+
+        """
+        Assigns every worksheet row to a block of candidates
+
+        Parameters
+        ----------
+        x_columns : dict
+            Normalized worksheet key columns as numpy arrays
+
+        block_index : BlockIndex
+            The candidates sorted into blocks, see index
+
+        number_of_rows : int
+            Number of worksheet rows
+
+        Returns
+        -------
+        list of (numpy.ndarray, numpy.ndarray)
+            Positions of worksheet rows and positions of the candidates they are
+            compared to. Rows without any block are returned with no candidates.
+        """
+
+        remaining = numpy.arange(number_of_rows)
+        groups = []
+
+        for level in self.levels:
+            if not len(remaining):
+                break
+
+            if not level:
+                if block_index.number_of_candidates:
+                    groups.append((remaining, numpy.arange(block_index.number_of_candidates)))
+                    remaining = remaining[:0]
+                continue
+
+            x_keys = block_index.keys(x_columns, level)[remaining]
+            y_order, y_unique, y_starts, y_counts = block_index.blocks(level)
+
+            found = numpy.isin(x_keys, y_unique)
+            resolved = remaining[found]
+            x_order = numpy.argsort(x_keys[found], kind='stable')
+            x_unique, x_starts, x_counts = numpy.unique(x_keys[found][x_order], return_index=True, return_counts=True)
+
+            blocks = numpy.searchsorted(y_unique, x_unique)
+
+            for key_start, key_count, block in zip(x_starts, x_counts, blocks):
+                x_positions = resolved[x_order[key_start:key_start + key_count]]
+                y_positions = y_order[y_starts[block]:y_starts[block] + y_counts[block]]
+                groups.append((x_positions, y_positions))
+
+            remaining = remaining[~found]
+
+        if len(remaining):
+            groups.append((remaining, numpy.array([], dtype=numpy.int64)))
+
+        return groups
+
+
+class BlockIndex:
+
+    """
+    The candidates of every level of a Blocking, sorted by key
+
+    Key values are coded as integers from the candidate values, worksheet values
+    are looked up in those codes, a value no candidate holds is coded as empty.
+    """
+
+    def __init__(self, blocking, y_columns, number_of_candidates):
+
+        """
+        Parameters
+        ----------
+        blocking : Blocking
+            Keys and levels the candidates are sorted by
+
+        y_columns : dict
+            Normalized candidate key columns as numpy arrays
+
+        number_of_candidates : int
+            Number of candidates
+        """
+
+        self.blocking = blocking
+        self.number_of_candidates = number_of_candidates
+
+        self.__uniques = {}
+        self.__steps = {}
+        self.__blocks = {}
+
+        codes = {}
+        for c, y_column in blocking.keys.items():
+            codes[c], self.__uniques[c] = encode(y_columns[y_column])
+
+        for level in blocking.levels:
+            if not level:
+                continue
+
+            y_keys, self.__steps[level] = combine([codes[c] for c in level])
+
+            # candidates sorted by key, with the positions of each key kept in order
+            y_order = numpy.argsort(y_keys, kind='stable')
+            y_order = y_order[y_keys[y_order] >= 0]
+            y_unique, y_starts, y_counts = numpy.unique(y_keys[y_order], return_index=True, return_counts=True)
+
+            self.__blocks[level] = (y_order, y_unique, y_starts, y_counts)
+
+    def blocks(self, level):
+
+        """Returns the candidate positions sorted by key, the keys and the start and size of each block"""
+
+        return self.__blocks[level]
+
+    def keys(self, x_columns, level):
+
+        """Returns the key of every worksheet row at a level, -1 where a candidate holds no such key"""
+
+        return recombine([lookup(x_columns[c], self.__uniques[c]) for c in level], self.__steps[level])
+
+
+def encode(y_values):
+
+    """
+    Encodes a candidate column as integer codes, so keys are compared as
+    integers. Empty values are coded -1.
+
+    Returns
+    -------
+    (numpy.ndarray, pandas.Index)
+        Codes of the values and the value of each code
+    """
+
+    codes, uniques = pandas.factorize(numpy.asarray(y_values, dtype=object))
+
+    empty = numpy.flatnonzero(uniques == '')
+    if len(empty):
+        codes[codes == empty[0]] = -1
+
+    return codes.astype(numpy.int64), pandas.Index(uniques)
+
+
+def lookup(x_values, uniques):
+
+    """Returns the codes of worksheet values in the codes of a candidate column, see encode"""
+
+    x_values = numpy.asarray(x_values, dtype=object)
+
+    codes = uniques.get_indexer(x_values).astype(numpy.int64)
+    codes[x_values == ''] = -1
+
+    return codes
+
+
+def combine(codes):
+
+    """
+    Combines the codes of several candidate key columns into a single code per
+    row, -1 where any of the keys is empty
+
+    Parameters
+    ----------
+    codes : list of numpy.ndarray
+        Codes of every key column, see encode
+
+    Returns
+    -------
+    (numpy.ndarray, list of (int, numpy.ndarray))
+        Combined codes, and the steps combining them, see recombine
+    """
+
+    keys = codes[0]
+    steps = []
+
+    for column in codes[1:]:
+        cardinality = max(keys.max(initial=-1), column.max(initial=-1)) + 1
+        valid = (keys >= 0) & (column >= 0)
+
+        # renumbered so that codes stay small however many keys are combined
+        combined, inverse = numpy.unique(keys[valid] * cardinality + column[valid], return_inverse=True)
+        keys = numpy.full(len(keys), -1, dtype=numpy.int64)
+        keys[valid] = inverse.reshape(-1)
+        steps.append((cardinality, combined))
+
+    return keys, steps
+
+
+def recombine(codes, steps):
+
+    """
+    Combines the codes of worksheet key columns as combine combined the
+    candidate codes, -1 where any of the keys is empty or no candidate holds
+    the combination
+    """
+
+    keys = codes[0]
+
+    for column, (cardinality, combined) in zip(codes[1:], steps):
+        valid = numpy.flatnonzero((keys >= 0) & (column >= 0))
+        values = keys[valid] * cardinality + column[valid]
+
+        positions = numpy.searchsorted(combined, values)
+        found = positions < len(combined)
+        found[found] = combined[positions[found]] == values[found]
+
+        keys = numpy.full(len(keys), -1, dtype=numpy.int64)
+        keys[valid[found]] = positions[found]
+
+    return keys
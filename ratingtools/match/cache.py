@@ -0,0 +1,133 @@
+# built-ins
+import hashlib
+import json
+import os
+import time
+
+# external packages
+import pandas
+import pyarrow
+
+
+class CandidateCache:
+
+    """
+    Stores query results on disk as parquet files, keyed by a hash of the query
+    statement, its parameters and the database it was run on
+
+    Results are kept and read back backed by arrow arrays, so that an integer
+    column with missing values is not turned into floats.
+
+    Entries expire after `ttl` seconds from when they were written. When the cache
+    grows over `max_bytes`, the least recently read entries are removed first.
+    """
+
+    def __init__(self, directory, ttl=24*60*60, max_bytes=2*1024**3):
+
+        """
+        Parameters
+        ----------
+        directory : str
+            Where the cached results are stored, created if it does not exist
+
+        ttl : int, default=86400
+            Seconds after which a cached result is no longer used
+
+        max_bytes : int, default=2GB
+            Maximum size of all cached results together
+        """
+
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # whether the user chose to match with cached candidates
+        self.enabled = False
+
+    @staticmethod
+    def key(statement, parameters=None, source=None):
+
+        """Returns the key of a query statement and its parameters, run on source, see query.identity"""
+
+        payload = json.dumps([statement, parameters] + ([source] if source else []), sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def saved_at(self, key):
+
+        """Returns the time a key was cached, None if it is not cached or has expired"""
+
+        try:
+            saved_at = os.stat(self._path(key)).st_mtime
+        except FileNotFoundError:
+            return None
+
+        return saved_at if time.time() - saved_at < self.ttl else None
+
+    def get(self, key):
+
+        """Returns the cached pandas.DataFrame of a key, None if it is not cached or has expired"""
+
+        saved_at = self.saved_at(key)
+        if saved_at is None:
+            return None
+
+        df = pandas.read_parquet(self._path(key), dtype_backend='pyarrow')
+
+        # access time orders eviction, modified time keeps the time it was saved
+        os.utime(self._path(key), (time.time(), saved_at))
+        return df
+
+    def put(self, key, df):
+
+        """Caches a pandas.DataFrame under a key and evicts entries over the limits"""
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        # written aside and renamed so that a reader never sees a partial file
+        path = self._path(key)
+        df.to_parquet(f'{path}.tmp', index=False)
+        os.replace(f'{path}.tmp', path)
+
+        self.evict()
+
+    def evict(self):
+
+        """Removes expired entries, then the least recently read ones until under max_bytes"""
+
+        if not os.path.isdir(self.directory):
+            return
+
+        now = time.time()
+        entries = []
+
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.parquet'):
+                continue
+
+            stat = entry.stat()
+            if now - stat.st_mtime >= self.ttl:
+                os.remove(entry.path)
+            else:
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.parquet')
+
+
+def records_frame(records):
+
+    """
+    Returns query results as records, a list of dictionaries, as a pandas.DataFrame
+    backed by arrow arrays, which keeps the types of their values as they were queried
+    """
+
+    return pyarrow.Table.from_pylist(list(records)).to_pandas(types_mapper=pandas.ArrowDtype)
+
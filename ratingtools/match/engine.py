@@ -0,0 +1,679 @@
+# external packages
+import numpy
+import pandas
+from rapidfuzz import fuzz
+
+# internal packages
+from . import parallel, scoring
+from .index import CandidateIndex, NAME_KEYS
+from .instrument import Instrument
+from .journal import digest
+from .normalize import Normalizer
+from .records import ColumnarRecords
+
+
+SCORERS = {'Base': fuzz.ratio,
+           'Partial': fuzz.partial_ratio,
+           'Token Set': fuzz.token_set_ratio,
+           'Partial Token Set': fuzz.partial_token_set_ratio,
+           'Token Sort': fuzz.token_sort_ratio,
+           'Partial Token Sort': fuzz.partial_token_sort_ratio,
+           'Weighted': fuzz.WRatio}
+
+
+def dedup_ratio(number_of_rows, number_of_distinct_rows):
+
+    """Returns the number of worksheet rows per distinct row matched"""
+
+    return round(number_of_rows / number_of_distinct_rows, 2) if number_of_distinct_rows else 1.0
+
+
+class ScorersByColumn(dict):
+
+    """Scorer name by worksheet column, columns not specified use the default"""
+
+    SCORERS = SCORERS
+    default = 'Weighted'
+
+    def __missing__(self, column):
+        return self.default
+
+
+class MatchConfig:
+
+    """
+    Configuration of a match made without record_matcher, e.g. in batch mode
+
+    Has the attributes that MatchEngine reads from the record matcher configuration.
+    """
+
+    def __init__(self, columns_to_match, columns_to_get, scorers_by_column=None,
+                 thresholds_by_column=None, required_threshold=80):
+
+        """
+        Parameters
+        ----------
+        columns_to_match : dict
+            Worksheet column to the candidate column it is compared with
+
+        columns_to_get : list
+            Candidate columns copied to a worksheet row when it is matched
+
+        scorers_by_column : dict, optional
+            Name of the scorer (a key of SCORERS) by worksheet column, defaults to 'Weighted'
+
+        thresholds_by_column : dict, optional
+            Minimum score of a worksheet column for a candidate to be considered, defaults to 0
+
+        required_threshold : int, default=80
+            Minimum combined score for a worksheet row to be matched
+        """
+
+        self.columns_to_match = dict(columns_to_match)
+        self.columns_to_get = list(columns_to_get)
+        self.scorers_by_column = ScorersByColumn(scorers_by_column if scorers_by_column else {})
+        self.thresholds_by_column = {c: 0 for c in self.columns_to_match}
+        self.thresholds_by_column.update(thresholds_by_column if thresholds_by_column else {})
+        self.required_threshold = required_threshold
+
+    def populate(self):
+        pass
+
+
+class Matcher:
+
+    """Holds the records and configuration of a match made without record_matcher"""
+
+    def __init__(self, config):
+
+        """
+        Parameters
+        ----------
+        config : MatchConfig
+            Configuration of the match
+        """
+
+        self.config = config
+        self.x_records = {}
+        self.y_records = []
+
+
+class MatchEngine:
+
+    """Matches worksheet rows against query results in bulk with rapidfuzz.process.cdist
+
+    Every column to match is scored as a whole matrix (worksheet rows x candidates)
+    and the matrices are combined by weight with numpy. The engine shares the
+    configuration of a record_matcher.matcher.RecordMatcher and returns the same
+    records and match_info, so it can be used wherever the record matcher is expected.
+    """
+
+    def __init__(self, record_matcher, weights=None, workers=-1, chunk_size=2000000,
+                 normalizer=None, normalizers_by_column=None, blocking=None, processes=1,
+                 journal=None, top_k=None, index_keys=None, index_directory=None, instrument=None,
+                 checkpoint_size=20000, alternatives=None):
+
+        """
+        Parameters
+        ----------
+        record_matcher : record_matcher.matcher.RecordMatcher
+            Holds the records and the configuration (columns, scorers and thresholds)
+
+        weights : dict, optional
+            Weight of each worksheet column in the combined score, columns not
+            specified are weighted 1
+
+        workers : int, default=-1
+            Number of threads used by cdist, -1 uses all available cores
+
+        chunk_size : int, default=2000000
+            Maximum number of pairs scored at once, bounds the size of the score matrices
+
+        normalizer : normalize.Normalizer, optional
+            Applied to the values of every column before scoring, defaults to
+            stripping and lowercasing
+
+        normalizers_by_column : dict, optional
+            Normalizers for specific columns, takes precedence over normalizer
+
+        blocking : blocking.Blocking, optional
+            Restricts the candidates each worksheet row is scored against,
+            every row is scored against every candidate if not specified
+
+        processes : int, default=1
+            Number of processes the worksheet rows are sharded across, the
+            candidates are shared with them through shared memory. Only done
+            when at least parallel.MIN_ROWS rows are scored at once
+
+        journal : journal.MatchJournal, optional
+            Remembers the best candidates of rows matched before, only rows whose
+            match values changed, or all rows if the candidates or settings changed,
+            are scored again
+
+        top_k : int, optional
+            If specified, every worksheet row is only scored against the top_k
+            candidates sharing the most name trigrams and phonetic keys with it
+
+        index_keys : dict, optional
+            Worksheet columns to the candidate columns looked up in the candidate
+            index, defaults to index.NAME_KEYS
+
+        index_directory : str, optional
+            Where candidate indexes are saved and opened from, so that an index is
+            only built once for the same candidates
+
+        instrument : instrument.Instrument, optional
+            Records the time and memory of the stages of every match
+
+        checkpoint_size : int, default=20000
+            Number of worksheet rows scored between flushes of a journal kept in
+            a checkpoint file, see journal.MatchJournal
+
+        alternatives : alternatives.Alternatives, optional
+            Keeps the best candidates of every row scored. Rows are then scored
+            regardless of the required threshold, and a row whose candidates are
+            kept is not scored again when only the threshold or the candidate
+            chosen for it changed
+        """
+
+        self.record_matcher = record_matcher
+        self.weights = weights if weights else {}
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.normalizer = normalizer if normalizer else Normalizer()
+        self.normalizers_by_column = normalizers_by_column if normalizers_by_column else {}
+        self.blocking = blocking
+        self.processes = processes
+        self.journal = journal
+        self.top_k = top_k
+        self.index_keys = index_keys if index_keys else NAME_KEYS
+        self.index_directory = index_directory
+        self.instrument = instrument if instrument else Instrument()
+        self.checkpoint_size = checkpoint_size
+        self.alternatives = alternatives
+
+        # normalized columns, kept until the records they came from are replaced
+        self.__x_normalized = {}
+        self.__y_normalized = {}
+        self.__index = None
+        self.__blocks = None
+
+        # key of every worksheet row of the last match, by index
+        self.__keys = {}
+
+    @property
+    def config(self):
+        return self.record_matcher.config
+
+    @property
+    def x_records(self):
+        return self.record_matcher.x_records
+
+    @x_records.setter
+    def x_records(self, records):
+        self.record_matcher.x_records = records
+        self.__x_normalized = {}
+
+    @property
+    def y_records(self):
+        return self.record_matcher.y_records
+
+    @y_records.setter
+    def y_records(self, records):
+        self.record_matcher.y_records = records
+        self.__y_normalized = {}
+        self.__blocks = None
+
+    def match(self, update_func=None):
+
+        """
+        Matches every x_record with the highest scoring y_record
+
+        Parameters
+        ----------
+        update_func : function, optional
+            Called once for every x_record that has been matched
+
+        Returns
+        -------
+        (dict, dict)
+            Matched records by the index of x_records and a summary of the match
+        """
+
+        # columnar records are read column by column, never as a dictionary per row
+        x_index = list(self.x_records.keys())
+        x_records = self.x_records.values()
+        if not isinstance(x_records, ColumnarRecords):
+            x_records = list(x_records)
+        y_records = self.y_records
+        columns = self._columns()
+
+        with self.instrument.stage('Normalize') as stage:
+            x_columns = {x_column: self._normalized(self.__x_normalized, x_records, x_column)
+                         for x_column, *_ in columns}
+            y_columns = {y_column: self._normalized(self.__y_normalized, y_records, y_column)
+                         for _, y_column, *_ in columns}
+
+            # identical rows are matched once, through the first row holding their key
+            keys = self._row_keys(x_records, columns)
+            distinct_keys, first, inverse = numpy.unique(numpy.array(keys, dtype=object),
+                                                         return_index=True, return_inverse=True)
+            scored = numpy.zeros(len(x_records), dtype=bool)
+            scored[first] = True
+            retained = numpy.zeros(len(x_records), dtype=bool)
+
+            # kept candidates only serve required thresholds down to the score they were kept from
+            if self.alternatives is not None:
+                self.alternatives.reset(digest([self._version(y_records, columns, with_threshold=False),
+                                                self.alternatives.keep, self.alternatives.min_score]))
+
+                if self.config.required_threshold >= self.alternatives.min_score:
+                    retained = numpy.fromiter((k in self.alternatives for k in keys), dtype=bool, count=len(keys))
+                    scored &= ~retained
+
+            if self.journal is not None:
+                self.journal.reset(self._version(y_records, columns))
+
+                journaled = numpy.fromiter((k in self.journal for k in keys), dtype=bool, count=len(keys))
+                scored &= ~journaled
+
+            stage.count(rows=len(x_records))
+
+        with self.instrument.stage('Group') as stage:
+            groups = self._groups(x_records, y_records, scored)
+            stage.count(rows=int(scored.sum()))
+
+        if update_func:
+            for _ in range(len(x_records) - scored.sum()):
+                update_func()
+
+        # kept candidates are scored down to their min_score, regardless of a higher required threshold
+        keep = self.alternatives.keep if self.alternatives is not None else 0
+        cutoff = min(self.config.required_threshold, self.alternatives.min_score) if keep \
+            else self.config.required_threshold
+
+        with self.instrument.stage('Score') as stage:
+            best = numpy.full(len(x_index), -1, dtype=numpy.int64)
+            best_scores = numpy.zeros(len(x_index), dtype=numpy.float32)
+            ambiguous = numpy.zeros(len(x_index), dtype=bool)
+            comparisons = 0
+
+            for batch in self._batches(groups):
+                positions = numpy.concatenate([x_positions for x_positions, _ in batch])
+
+                if self.processes > 1 and len(positions) >= parallel.MIN_ROWS:
+                    results = parallel.best_candidates(
+                        batch, columns, x_columns, y_columns, len(x_index),
+                        processes=self.processes, chunk_size=self.chunk_size,
+                        cutoff=cutoff, update_func=update_func, keep=keep)
+                else:
+                    results = scoring.best_candidates(
+                        batch, columns, x_columns, y_columns, len(x_index),
+                        chunk_size=self.chunk_size, workers=self.workers,
+                        cutoff=cutoff, update_func=update_func, keep=keep)
+
+                best[positions], best_scores[positions], ambiguous[positions] = (r[positions] for r in results[:3])
+                comparisons += results[3]
+
+                if self.journal is not None:
+                    for position in positions:
+                        self.journal.record(keys[position], best[position], best_scores[position], ambiguous[position])
+
+                    self.journal.flush()
+
+                if keep:
+                    for position in positions:
+                        self.alternatives.record(keys[position], results[4][position], results[5][position],
+                                                 results[2][position])
+
+            if keep and scored.any():
+                self.alternatives.save()
+
+            stage.count(rows=int(scored.sum()), pairs=int(comparisons))
+
+        if self.journal is not None:
+            for position in numpy.flatnonzero(journaled & ~scored & ~retained):
+                best[position], best_scores[position], ambiguous[position] = self.journal.get(keys[position])
+
+        # a candidate chosen for a row is matched with it whatever its score
+        chosen = numpy.zeros(len(x_index), dtype=bool)
+
+        if self.alternatives is not None:
+            for position in numpy.flatnonzero(retained):
+                best[position], best_scores[position], ambiguous[position] = self.alternatives.get(keys[position])
+
+            for position in first:
+                if self.alternatives.chosen(keys[position]):
+                    best[position], best_scores[position], ambiguous[position] = self.alternatives.get(keys[position])
+                    chosen[position] = True
+
+        # fan the results of every distinct row back out to its duplicates
+        source = first[inverse.reshape(-1)]
+        best, best_scores, ambiguous, chosen = best[source], best_scores[source], ambiguous[source], chosen[source]
+
+        with self.instrument.stage('Records') as stage:
+            records, match_info = self._records(x_index, x_records, y_records, best, best_scores, ambiguous, chosen)
+            stage.count(rows=len(records))
+
+        match_info['Comparisons'] = comparisons
+        match_info['Distinct Rows'] = len(distinct_keys)
+        match_info['Dedup Ratio'] = dedup_ratio(len(x_records), len(distinct_keys))
+
+        if self.journal is not None or self.alternatives is not None:
+            match_info['Rows Rescored'] = int(scored.sum())
+
+        self.__keys = dict(zip(x_index, keys))
+        return records, match_info
+
+    def warm(self):
+
+        """
+        Normalizes the candidate columns, sorts them into blocks and opens or
+        builds the candidate index ahead of a match, e.g. in the background while
+        the worksheet is read
+        """
+
+        if not len(self.y_records):
+            return
+
+        for _, y_column, *_ in self._columns():
+            self._normalized(self.__y_normalized, self.y_records, y_column)
+
+        if self.blocking:
+            self._blocks(self.y_records)
+
+        if self.top_k:
+            self._index(self.y_records)
+
+    def choose(self, index, rank):
+
+        """
+        Chooses another of the candidates kept for a worksheet row of the last
+        match, it is matched with it from the next match on without scoring again
+
+        Parameters
+        ----------
+        index : object
+            Index of the row in x_records
+
+        rank : int
+            Rank of the candidate among those kept for the row, 0 being the best.
+            None matches the row with its best candidate again
+
+        Raises
+        ------
+        ValueError
+            If rank is not that of a candidate kept for the row, see alternatives.Alternatives.choose
+        """
+
+        self.alternatives.choose(self.__keys[index], rank)
+
+        # saved right away, the next match may score nothing and so save nothing
+        self.alternatives.save()
+
+    def alternatives_frame(self):
+
+        """
+        Returns the candidates kept for every worksheet row of the last match
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per candidate kept: the index of the worksheet row, the rank
+            of the candidate, its columns_to_get and its score
+        """
+
+        columns_to_get = self.config.columns_to_get
+        y_records = self.y_records
+        rows = []
+
+        if isinstance(y_records, ColumnarRecords):
+            values_to_get = {c: y_records.column(c) for c in columns_to_get}
+        else:
+            values_to_get = {c: [r.get(c, '') for r in y_records] for c in columns_to_get}
+
+        for index, key in self.__keys.items():
+            if self.alternatives is None or key not in self.alternatives:
+                continue
+
+            positions, scores = self.alternatives.candidates(key)
+
+            for rank, (position, score) in enumerate(zip(positions, scores)):
+                if position < 0:
+                    break
+
+                row = {'index': index, 'rank': rank}
+                row.update({c: values[position] for c, values in values_to_get.items()})
+                row['match_score'] = round(float(score), 2)
+                rows.append(row)
+
+        return pandas.DataFrame(rows, columns=['index', 'rank'] + list(columns_to_get) + ['match_score'])
+
+    def _row_keys(self, x_records, columns):
+
+        """Returns a hash of the normalized match values of every worksheet row"""
+
+        key_columns = [x_column for x_column, *_ in columns]
+        if self.blocking:
+            key_columns.extend(self.blocking.keys)
+        if self.top_k:
+            key_columns.extend(self.index_keys)
+
+        key_columns = list(dict.fromkeys(key_columns))
+
+        values = [self._normalized(self.__x_normalized, x_records, c) for c in key_columns]
+        return [digest(row) for row in zip(*values)] if values else [''] * len(x_records)
+
+    def _version(self, y_records, columns, with_threshold=True):
+
+        """Returns a hash of the candidates and the settings they are scored with"""
+
+        y_columns = [y_column for _, y_column, *_ in columns]
+        settings = [(x, y, scorer.__name__, threshold, weight) for x, y, scorer, threshold, weight in columns]
+        if with_threshold:
+            settings.append(self.config.required_threshold)
+        settings.append((self.top_k, self.index_keys))
+
+        if self.blocking:
+            y_columns.extend(self.blocking.keys.values())
+            settings.append((self.blocking.keys, self.blocking.levels))
+
+        return digest([len(y_records), repr(settings)] +
+                      [digest(self._normalized(self.__y_normalized, y_records, c)) for c in y_columns])
+
+    def _groups(self, x_records, y_records, rows):
+
+        """
+        Returns positions of worksheet rows and the positions of candidates they
+        are scored against, for the rows set in the boolean array rows
+        """
+
+        if not self.blocking:
+            groups = [(numpy.arange(len(x_records)), numpy.arange(len(y_records)))]
+        else:
+            x_columns = {x_column: self._normalized(self.__x_normalized, x_records, x_column)
+                         for x_column in self.blocking.keys}
+
+            groups = self.blocking.groups(x_columns, self._blocks(y_records), len(x_records))
+
+        groups = [(x_positions[rows[x_positions]], y_positions) for x_positions, y_positions in groups]
+
+        if not self.top_k:
+            return groups
+
+        candidate_index = self._index(y_records)
+        x_columns = {x_column: self._normalized(self.__x_normalized, x_records, x_column)
+                     for x_column in self.index_keys}
+
+        narrowed = []
+
+        for x_positions, y_positions in groups:
+            # a group of no more than top_k candidates is scored whole, as a matrix
+            if len(y_positions) <= self.top_k:
+                narrowed.append((x_positions, y_positions))
+                continue
+
+            mask = None
+            if len(y_positions) < len(y_records):
+                mask = numpy.zeros(len(y_records), dtype=bool)
+                mask[y_positions] = True
+
+            # rows looking up the same candidates are scored together
+            shared = {}
+
+            for position in x_positions:
+                values = {y_column: x_columns[x_column][position] for x_column, y_column in self.index_keys.items()}
+                candidates = candidate_index.lookup(values, self.top_k, mask)
+
+                # rows sharing no token with any candidate are scored against the whole group
+                if not len(candidates):
+                    candidates = y_positions
+
+                candidates = numpy.asarray(candidates, dtype=numpy.int64)
+                shared.setdefault(candidates.tobytes(), (candidates, []))[1].append(position)
+
+            narrowed.extend((numpy.array(positions, dtype=numpy.int64), candidates)
+                            for candidates, positions in shared.values())
+
+        return narrowed
+
+    def _batches(self, groups):
+
+        """
+        Splits groups into batches of at most checkpoint_size worksheet rows, whose
+        results are flushed to the journal one batch at a time. Groups are a single
+        batch unless the journal is kept in a checkpoint file.
+        """
+
+        size = self.checkpoint_size
+        groups = [(x_positions, y_positions) for x_positions, y_positions in groups if len(x_positions)]
+
+        if not groups:
+            return []
+
+        if self.journal is None or not self.journal.path or not size:
+            return [groups]
+
+        batches = [[]]
+        rows = 0
+
+        for x_positions, y_positions in groups:
+            for start in range(0, len(x_positions), size):
+                piece = x_positions[start:start+size]
+
+                if rows + len(piece) > size and batches[-1]:
+                    batches.append([])
+                    rows = 0
+
+                batches[-1].append((piece, y_positions))
+                rows += len(piece)
+
+        return batches
+
+    def _blocks(self, y_records):
+
+        """Returns the candidates sorted into blocks, built once until the candidates or the blocking change"""
+
+        if self.__blocks is None or self.__blocks.blocking is not self.blocking:
+            y_columns = {y_column: self._normalized(self.__y_normalized, y_records, y_column)
+                         for y_column in self.blocking.keys.values()}
+            self.__blocks = self.blocking.index(y_columns, len(y_records))
+
+        return self.__blocks
+
+    def _index(self, y_records):
+
+        """Returns the index of the candidates, opened or built and saved if it does not exist"""
+
+        y_columns = {y_column: self._normalized(self.__y_normalized, y_records, y_column)
+                     for y_column in self.index_keys.values()}
+        version = digest([len(y_records)] + [f'{c}:{digest(v)}' for c, v in y_columns.items()])
+
+        if self.__index is None or self.__index.version != version:
+            self.__index = CandidateIndex.open(self.index_directory, version) if self.index_directory else None
+
+            if self.__index is None:
+                self.__index = CandidateIndex.build(version, y_columns)
+                if self.index_directory:
+                    self.__index.save(self.index_directory)
+                    CandidateIndex.evict(self.index_directory)
+
+        return self.__index
+
+    def _columns(self):
+
+        """Returns (x_column, y_column, scorer, threshold, weight) for every column to match"""
+
+        config = self.config
+        columns = []
+
+        for x_column, y_column in config.columns_to_match.items():
+            name = config.scorers_by_column[x_column]
+            scorer = SCORERS.get(name, SCORERS[config.scorers_by_column.default])
+            threshold = config.thresholds_by_column[x_column]
+            weight = self.weights.get(x_column, 1)
+            columns.append((x_column, y_column, scorer, threshold, weight))
+
+        return columns
+
+    def _normalized(self, cache, records, column):
+
+        """Returns the normalized values of a column, normalizing them on first use only"""
+
+        if column not in cache:
+            normalizer = self.normalizers_by_column.get(column, self.normalizer)
+            categories = records.categories(column) if isinstance(records, ColumnarRecords) else None
+
+            if categories is not None:
+                # only the categories are normalized, missing values (code -1) are empty
+                codes, values = categories
+                values = numpy.array(normalizer.column(['' if v is None else v for v in values]) + [''], dtype=object)
+                cache[column] = values[codes]
+            elif isinstance(records, ColumnarRecords):
+                cache[column] = numpy.array(normalizer.column(records.column(column)), dtype=object)
+            else:
+                cache[column] = numpy.array(normalizer.column([r.get(column, '') for r in records]), dtype=object)
+
+        return cache[column]
+
+    def _records(self, x_index, x_records, y_records, best, best_scores, ambiguous, chosen=None):
+
+        """Builds the matched records and match_info from the best candidate of each row, or the one chosen"""
+
+        required_threshold = self.config.required_threshold
+        columns_to_get = self.config.columns_to_get
+
+        records = {}
+        match_info = {'Number of Rows': len(x_index),
+                      'Number of Candidates': len(y_records),
+                      'Matched': 0,
+                      'Ambiguous': 0,
+                      'Unmatched': 0}
+
+        if isinstance(y_records, ColumnarRecords):
+            values_to_get = {c: y_records.column(c) for c in columns_to_get}
+        else:
+            values_to_get = None
+
+        for i, (index, x_record) in enumerate(zip(x_index, x_records)):
+            record = dict(x_record)
+            score = float(best_scores[i])
+
+            if best[i] >= 0 and score >= 0 and (score >= required_threshold or (chosen is not None and chosen[i])):
+                if values_to_get is not None:
+                    record.update({c: values[best[i]] for c, values in values_to_get.items()})
+                else:
+                    y_record = y_records[best[i]]
+                    record.update({c: y_record.get(c, '') for c in columns_to_get})
+
+                status = 'Ambiguous' if ambiguous[i] else 'Matched'
+            else:
+                score = max(score, 0)
+                status = 'Unmatched'
+
+            record['match_score'] = round(score, 2)
+            record['match_status'] = status
+            match_info[status] += 1
+            records[index] = record
+
+        return records, match_info
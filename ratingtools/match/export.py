@@ -0,0 +1,172 @@
+# built-ins
+import os
+
+# external packages
+import pandas
+import pyarrow
+import pyarrow.csv
+import pyarrow.parquet
+
+from vs_library.tools import pandas_extension
+
+
+# rows converted and written at once, bounds the memory an export takes on top of the DataFrame
+CHUNK_ROWS = 50000
+
+# file extension to format, and to the compression of a CSV file
+FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.xlsx': 'xlsx'}
+COMPRESSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.zst': 'zstd', '.lz4': 'lz4'}
+
+# compression of parquet files unless another is chosen
+PARQUET_COMPRESSION = 'zstd'
+
+
+def format_of(filepath):
+
+    """
+    Returns the format and compression of a file by its extension, e.g. ('csv', 'gzip')
+    for 'matched.csv.gz'. The format is None for extensions not in FORMATS.
+    """
+
+    root, extension = os.path.splitext(filepath.lower())
+    compression = COMPRESSIONS.get(extension)
+
+    if compression:
+        root, extension = os.path.splitext(root)
+
+    return FORMATS.get(extension), compression
+
+
+def write(df, filepath, file_format=None, compression=None, chunk_rows=CHUNK_ROWS):
+
+    """
+    Writes a DataFrame to a file chunk by chunk
+
+    CSV and parquet files are written through arrow, xlsx files in openpyxl's
+    write-only mode, so no more than chunk_rows rows are converted at once.
+    Other files are written by pandas_extension.to_spreadsheet.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Written without its index
+
+    filepath : str
+        Path of the file
+
+    file_format : {'csv', 'parquet', 'xlsx'}, optional
+        Defaults to the format of the file's extension, see format_of
+
+    compression : str, optional
+        Compression of a parquet file, e.g. 'gzip' or 'snappy', defaults to
+        PARQUET_COMPRESSION. A CSV file is compressed by its extension only,
+        e.g. '.csv.gz', so that its name says how it is read
+
+    chunk_rows : int, default=CHUNK_ROWS
+        Rows written at once
+
+    Returns
+    -------
+    (bool, str)
+        Whether the file was written, and a message saying so or what went wrong
+    """
+
+    extension_format, extension_compression = format_of(filepath)
+    file_format = file_format if file_format else extension_format
+
+    try:
+        if file_format == 'csv':
+            _write_csv(df, filepath, extension_compression, chunk_rows)
+        elif file_format == 'parquet':
+            _write_parquet(df, filepath, compression if compression else PARQUET_COMPRESSION, chunk_rows)
+        elif file_format == 'xlsx':
+            _write_xlsx(df, filepath, chunk_rows)
+        else:
+            return pandas_extension.to_spreadsheet(df, filepath)
+
+    except Exception as e:
+        return False, str(e)
+
+    return True, f"{len(df):,} rows written to {filepath}"
+
+
+def schema(df):
+
+    """
+    Returns the arrow schema every chunk of a DataFrame is written with: object
+    columns as strings, categoricals as dictionaries, other columns as arrow
+    converts their dtype
+    """
+
+    fields = []
+
+    for column, field in zip(df.columns, pyarrow.Schema.from_pandas(df.iloc[:0], preserve_index=False)):
+        if df[column].dtype == object or pyarrow.types.is_null(field.type):
+            field = pyarrow.field(str(column), pyarrow.string())
+
+        fields.append(field.with_name(str(column)))
+
+    return pyarrow.schema(fields)
+
+
+def chunks(df, arrow_schema, chunk_rows=CHUNK_ROWS):
+
+    """Yields a DataFrame as arrow tables of chunk_rows rows, all of arrow_schema"""
+
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start+chunk_rows]
+        arrays = [_array(chunk[column], field.type) for column, field in zip(df.columns, arrow_schema)]
+
+        yield pyarrow.Table.from_arrays(arrays, schema=arrow_schema)
+
+
+def _array(series, arrow_type):
+
+    if pyarrow.types.is_string(arrow_type) and series.dtype == object:
+        values = [None if v is None or (isinstance(v, float) and v != v) else str(v) for v in series.tolist()]
+        return pyarrow.array(values, type=arrow_type)
+
+    return pyarrow.Array.from_pandas(series, type=arrow_type)
+
+
+def _write_csv(df, filepath, compression, chunk_rows):
+
+    # CSV holds no dictionaries, categoricals are written as their values
+    arrow_schema = schema(df)
+    csv_schema = pyarrow.schema([f.with_type(f.type.value_type) if pyarrow.types.is_dictionary(f.type) else f
+                                 for f in arrow_schema])
+
+    sink = pyarrow.CompressedOutputStream(filepath, compression) if compression else pyarrow.OSFile(filepath, 'wb')
+
+    with sink, pyarrow.csv.CSVWriter(sink, csv_schema) as writer:
+        for table in chunks(df, arrow_schema, chunk_rows):
+            writer.write_table(table.cast(csv_schema))
+
+
+def _write_parquet(df, filepath, compression, chunk_rows):
+
+    arrow_schema = schema(df)
+
+    with pyarrow.parquet.ParquetWriter(filepath, arrow_schema, compression=compression) as writer:
+        for table in chunks(df, arrow_schema, chunk_rows):
+            writer.write_table(table)
+
+
+def _write_xlsx(df, filepath, chunk_rows):
+
+    # imported here, it is only needed for xlsx files
+    from openpyxl import Workbook
+
+    # a write-only workbook streams its rows to the file instead of keeping them
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append([str(c) for c in df.columns])
+
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start+chunk_rows]
+
+        for row in zip(*(chunk[c].tolist() for c in df.columns)):
+            worksheet.append([None if v is None or v is pandas.NA or (isinstance(v, float) and v != v) else v
+                              for v in row])
+
+    workbook.save(filepath)
@@ -0,0 +1,222 @@
+# built-ins
+import hashlib
+import json
+import os
+import shutil
+import time
+
+# external packages
+import numpy
+from metaphone import doublemetaphone
+
+
+# worksheet name columns to the candidate columns they are looked up in
+NAME_KEYS = {'lastname': 'lastname', 'firstname': 'firstname', 'nickname': 'nickname'}
+
+# a shared phonetic key counts as much as this many shared trigrams
+PHONETIC_WEIGHT = 3
+
+# seconds an index is kept once it was last opened, candidate snapshots are replaced by new ones
+INDEX_TTL = 7*24*60*60
+
+
+def tokens(column, value):
+
+    """
+    Returns the tokens of a normalized value: hashed trigrams, and hashed Double
+    Metaphone keys with their weight
+
+    Returns
+    -------
+    list of (int, int)
+        Token and its weight
+    """
+
+    if not value:
+        return []
+
+    padded = f'  {value} '
+    grams = {padded[i:i+3] for i in range(len(padded) - 2)}
+    phonetic_keys = {k for k in doublemetaphone(value) if k}
+
+    return [(_hash(f'{column}:{g}'), 1) for g in grams] + \
+           [(_hash(f'{column}#{k}'), PHONETIC_WEIGHT) for k in phonetic_keys]
+
+
+def _hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class CandidateIndex:
+
+    """
+    Inverted index of candidates by the trigrams and phonetic keys of their names
+
+    The index is three arrays: sorted token hashes, offsets into the postings,
+    and the candidate positions holding each token. Saved indexes are memory
+    mapped when opened, so an index is only built once per candidate snapshot.
+    They are removed once not opened for INDEX_TTL seconds, see evict.
+    """
+
+    def __init__(self, version, keys, offsets, postings):
+
+        """
+        Parameters
+        ----------
+        version : str
+            Hash of the candidate columns the index was built from
+
+        keys : numpy.ndarray
+            Sorted token hashes
+
+        offsets : numpy.ndarray
+            Postings of keys[i] are postings[offsets[i]:offsets[i+1]]
+
+        postings : numpy.ndarray
+            Candidate positions
+        """
+
+        self.version = version
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+
+    @classmethod
+    def build(cls, version, y_columns):
+
+        """
+        Builds the index of candidates
+
+        Parameters
+        ----------
+        version : str
+            Hash of the candidate columns
+
+        y_columns : dict
+            Normalized candidate columns to index, by column name
+        """
+
+        all_tokens = []
+        all_positions = []
+
+        for column, values in y_columns.items():
+            # candidates often share names, tokenize each distinct value once
+            tokenized = {}
+
+            for position, value in enumerate(values):
+                if value not in tokenized:
+                    tokenized[value] = [t for t, _ in tokens(column, value)]
+
+                all_tokens.extend(tokenized[value])
+                all_positions.extend([position] * len(tokenized[value]))
+
+        all_tokens = numpy.array(all_tokens, dtype=numpy.uint64)
+        all_positions = numpy.array(all_positions, dtype=numpy.int64)
+
+        order = numpy.lexsort((all_positions, all_tokens))
+        keys, starts = numpy.unique(all_tokens[order], return_index=True)
+
+        return cls(version, keys, numpy.append(starts, len(order)).astype(numpy.int64), all_positions[order])
+
+    @classmethod
+    def open(cls, directory, version):
+
+        """Returns the index saved under directory for a version, memory mapped, None if there is none"""
+
+        path = os.path.join(directory, version)
+
+        if not os.path.exists(os.path.join(path, 'index.json')):
+            return None
+
+        arrays = [numpy.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                  for name in ('keys', 'offsets', 'postings')]
+
+        # modified time orders eviction, it is when the index was last opened
+        os.utime(os.path.join(path, 'index.json'))
+        return cls(version, *arrays)
+
+    @staticmethod
+    def evict(directory, ttl=INDEX_TTL):
+
+        """Removes the indexes under directory not opened for ttl seconds, and incomplete ones as old"""
+
+        if not os.path.isdir(directory):
+            return
+
+        now = time.time()
+
+        for entry in os.scandir(directory):
+            if not entry.is_dir():
+                continue
+
+            marker = os.path.join(entry.path, 'index.json')
+            used_at = os.stat(marker).st_mtime if os.path.exists(marker) else entry.stat().st_mtime
+
+            if now - used_at >= ttl:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def save(self, directory):
+
+        """Saves the index under directory, by its version"""
+
+        path = os.path.join(directory, self.version)
+        os.makedirs(path, exist_ok=True)
+
+        for name, array in (('keys', self.keys), ('offsets', self.offsets), ('postings', self.postings)):
+            numpy.save(os.path.join(path, f'{name}.npy'), array)
+
+        # written last, an index without it is incomplete
+        with open(os.path.join(path, 'index.json'), 'w') as f:
+            json.dump({'version': self.version, 'number_of_keys': len(self.keys)}, f)
+
+    def lookup(self, values, k, mask=None):
+
+        """
+        Returns the positions of the candidates sharing the most tokens with a row
+
+        Parameters
+        ----------
+        values : dict
+            Normalized values of the row, by the candidate column they are looked up in
+
+        k : int
+            Maximum number of candidates returned
+
+        mask : numpy.ndarray, optional
+            Boolean array by candidate position, only candidates set are returned
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted positions of up to k candidates
+        """
+
+        postings = []
+        weights = []
+
+        for column, value in values.items():
+            for token, weight in tokens(column, value):
+                i = numpy.searchsorted(self.keys, numpy.uint64(token))
+
+                if i < len(self.keys) and self.keys[i] == token:
+                    posting = self.postings[self.offsets[i]:self.offsets[i+1]]
+                    postings.append(posting)
+                    weights.append(numpy.full(len(posting), weight, dtype=numpy.float32))
+
+        if not postings:
+            return numpy.array([], dtype=numpy.int64)
+
+        postings = numpy.concatenate(postings)
+        weights = numpy.concatenate(weights)
+
+        if mask is not None:
+            kept = mask[postings]
+            postings, weights = postings[kept], weights[kept]
+
+        candidates, inverse = numpy.unique(postings, return_inverse=True)
+
+        if len(candidates) > k:
+            counts = numpy.bincount(inverse, weights=weights)
+            candidates = numpy.sort(candidates[numpy.argpartition(-counts, k)[:k]])
+
+        return candidates
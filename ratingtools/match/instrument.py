@@ -0,0 +1,279 @@
+# built-ins
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss():
+
+    """Returns the peak resident memory of the process so far in bytes, 0 where it cannot be read"""
+
+    if resource is None:
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def cpu_time():
+
+    """Returns the CPU time of the process and of its finished child processes"""
+
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def thread_cpu_time():
+
+    """Returns the CPU time of the calling thread, the process-wide time where it cannot be read"""
+
+    try:
+        return time.thread_time()
+    except (AttributeError, OSError):
+        return cpu_time()
+
+
+class Stage:
+
+    """
+    A timed stage of a session, used as a context manager
+
+    Counts are added with `count`, 'rows' and 'pairs' are shown in the summary,
+    'pairs' also as comparisons per second.
+
+    When the instrument is shared, CPU is that of the stage's thread only and
+    peak RSS is left as None, as process-wide figures would include the work of
+    the other sessions.
+    """
+
+    def __init__(self, instrument, name):
+
+        self.instrument = instrument
+        self.name = name
+        self.counts = {}
+        self.children = []
+
+        self.start = self.wall = self.cpu = None
+        self.peak_rss = None
+        self.thread = threading.get_ident()
+
+    def __enter__(self):
+
+        self.instrument._push(self)
+        self.__clock = thread_cpu_time if self.instrument.shared else cpu_time
+        self.__cpu = self.__clock()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+
+        self.wall = time.perf_counter() - self.start
+        self.cpu = self.__clock() - self.__cpu
+        if not self.instrument.shared:
+            self.peak_rss = peak_rss()
+        self.instrument._pop(self)
+        return False
+
+    def count(self, **counts):
+
+        """Adds to the counts of the stage"""
+
+        for k, v in counts.items():
+            self.counts[k] = self.counts.get(k, 0) + v
+
+    def describe(self):
+
+        """Returns a one line summary of the stage"""
+
+        text = f"{self.wall:.2f}s wall, {self.cpu:.2f}s CPU"
+
+        if self.peak_rss is not None:
+            text += f", {self.peak_rss / 2**20:,.0f} MB peak RSS"
+
+        if 'rows' in self.counts:
+            text += f", {self.counts['rows']:,} rows"
+
+        if 'pairs' in self.counts:
+            text += f", {self.counts['pairs']:,} pairs"
+            if self.wall:
+                text += f" ({self.counts['pairs'] / self.wall:,.0f}/s)"
+
+        return text
+
+    def to_dict(self):
+
+        return {'name': self.name, 'wall': self.wall, 'cpu': self.cpu, 'peak_rss': self.peak_rss,
+                'counts': self.counts, 'children': [c.to_dict() for c in self.children]}
+
+
+class _NullStage:
+
+    """Stands in for a Stage when instrumentation is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, **counts):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Instrument:
+
+    """
+    Records the wall time, CPU time, peak memory and row and pair counts of the
+    stages of a session
+
+    When disabled, `stage` returns the same inert context manager every time
+    and nothing is recorded.
+    """
+
+    def __init__(self, enabled=False, trace_path=None, name='ratingtools', shared=False):
+
+        """
+        Parameters
+        ----------
+        enabled : bool, default=False
+            Whether stages are recorded
+
+        trace_path : str, optional
+            If specified, `write` saves the stages to it after every match
+
+        name : str, default='ratingtools'
+            Name of the process in the trace
+
+        shared : bool, default=False
+            Whether other sessions run in the same process at once, as the jobs
+            of a batch do. Stages then record the CPU time of their own thread
+            and no peak RSS, see write_trace for the figures of the whole process
+        """
+
+        self.enabled = enabled
+        self.trace_path = trace_path
+        self.name = name
+        self.shared = shared
+
+        self.stages = []
+        self.__stack = []
+        self.__origin = time.perf_counter()
+
+    def stage(self, name):
+
+        """Returns the context manager timing a stage, stages entered within it are its children"""
+
+        return Stage(self, name) if self.enabled else _NULL_STAGE
+
+    def _push(self, stage):
+
+        (self.__stack[-1].children if self.__stack else self.stages).append(stage)
+        self.__stack.append(stage)
+
+    def _pop(self, stage):
+
+        if self.__stack and self.__stack[-1] is stage:
+            self.__stack.pop()
+
+    def summary(self):
+
+        """
+        Returns the latest run of every stage with its children
+
+        Returns
+        -------
+        list of (str, str)
+            Stage name, indented by depth, and its description
+        """
+
+        latest = {}
+        for stage in self.stages:
+            if stage.wall is not None:
+                latest.pop(stage.name, None)
+                latest[stage.name] = stage
+
+        rows = []
+
+        def add(stage, depth):
+            rows.append(('  ' * depth + stage.name, stage.describe()))
+            for child in stage.children:
+                if child.wall is not None:
+                    add(child, depth + 1)
+
+        for stage in latest.values():
+            add(stage, 0)
+
+        return rows
+
+    def trace_events(self, pid=0):
+
+        """Returns every recorded stage as Chrome trace events, in microseconds"""
+
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': self.name}}]
+
+        def add(stage):
+            events.append({'name': stage.name, 'ph': 'X', 'pid': pid, 'tid': stage.thread,
+                           'ts': (stage.start - self.__origin) * 1e6, 'dur': stage.wall * 1e6,
+                           'args': dict(stage.counts, cpu=stage.cpu, peak_rss=stage.peak_rss)})
+            for child in stage.children:
+                if child.wall is not None:
+                    add(child)
+
+        for stage in self.stages:
+            if stage.wall is not None:
+                add(stage)
+
+        return events
+
+    def write(self, filepath=None):
+
+        """Writes the stages to filepath, or to trace_path, see write_trace"""
+
+        return write_trace(filepath or self.trace_path, [self])
+
+
+def write_trace(filepath, instruments):
+
+    """
+    Writes the stages of instruments as JSON, which also opens as a trace in
+    chrome://tracing or Perfetto
+
+    The CPU time and peak RSS of the whole process so far are added as "process".
+
+    Parameters
+    ----------
+    filepath : str
+        Path of the file written
+
+    instruments : list of Instrument
+        Every instrument is shown as its own process in the trace
+
+    Returns
+    -------
+    (bool, str)
+        Whether the file was written and a message
+    """
+
+    try:
+        document = {'stages': {i.name: [s.to_dict() for s in i.stages if s.wall is not None] for i in instruments},
+                    'traceEvents': [e for pid, i in enumerate(instruments) for e in i.trace_events(pid)],
+                    'process': {'cpu': cpu_time(), 'peak_rss': peak_rss()}}
+
+        with open(filepath, 'w') as f:
+            json.dump(document, f, indent=1, default=str)
+
+        return True, f"Trace written to \"{filepath}\""
+
+    except Exception as e:
+        return False, str(e)
@@ -0,0 +1,182 @@
+# built-ins
+import hashlib
+import os
+import time
+
+
+# seconds a checkpoint file of another version is kept once it was last written
+CHECKPOINT_TTL = 7*24*60*60
+
+
+def digest(values):
+
+    """Returns a short hash of a sequence of strings"""
+
+    return hashlib.blake2b('\x1f'.join(map(str, values)).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class MatchJournal:
+
+    """
+    Remembers the best candidate of every worksheet row matched in a session
+
+    Entries are keyed by a hash of a row's match values. They are only valid for
+    one version of the candidates and match settings, and are dropped when it changes.
+
+    With a path, entries are also appended to a checkpoint file as they are
+    flushed, one tab separated line per row under a line holding the version.
+    A match that was interrupted then resumes from the rows it had finished, as
+    long as the candidates and settings are the same.
+
+    Every version has a checkpoint file of its own, so sessions matching with
+    other candidates or settings never write to it. Sessions of the same version
+    append the same entries, each flush in a single write.
+    """
+
+    def __init__(self, path=None):
+
+        """
+        Parameters
+        ----------
+        path : str, optional
+            Checkpoint file the entries are appended to and read back from, named
+            after the version, e.g. journal-<version>.tsv for journal.tsv
+        """
+
+        self.path = path
+        self.version = None
+        self.__entries = {}
+        self.__pending = []
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+    def reset(self, version):
+
+        """Drops every entry if version differs from the version they were recorded for"""
+
+        if version == self.version:
+            return
+
+        self.__entries = {}
+        self.__pending = []
+        self.version = version
+
+        if self.path:
+            entries = self._read(version)
+
+            if entries is None:
+                self._create(version)
+            else:
+                self.__entries = entries
+
+            self._evict()
+
+    def checkpoint_path(self, version=None):
+
+        """Returns the checkpoint file of a version, of the current version unless specified"""
+
+        root, extension = os.path.splitext(self.path)
+        return f'{root}-{version if version else self.version}{extension}'
+
+    def get(self, key):
+
+        """Returns (candidate position, score, ambiguous) recorded for a row"""
+
+        return self.__entries[key]
+
+    def record(self, key, best, score, ambiguous):
+
+        """Records the best candidate of a row"""
+
+        entry = (int(best), float(score), bool(ambiguous))
+        self.__entries[key] = entry
+
+        if self.path:
+            self.__pending.append(f'{key}\t{entry[0]}\t{entry[1]!r}\t{int(entry[2])}\n')
+
+    def flush(self):
+
+        """Appends the entries recorded since the last flush to the checkpoint file"""
+
+        if self.path and self.__pending:
+            # a single write to a file opened for appending is never interleaved with another session's
+            fd = os.open(self.checkpoint_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+            try:
+                os.write(fd, ''.join(self.__pending).encode('utf-8'))
+            finally:
+                os.close(fd)
+
+            self.__pending = []
+
+    def _create(self, version):
+
+        """Creates the checkpoint file of a version, unless another session just did"""
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        try:
+            with open(self.checkpoint_path(version), 'x') as f:
+                f.write(f'version\t{version}\n')
+
+        except FileExistsError:
+            if self._read(version) is None:
+                with open(self.checkpoint_path(version), 'w') as f:
+                    f.write(f'version\t{version}\n')
+
+    def _read(self, version):
+
+        """Returns the entries of the checkpoint file of a version, None if it is missing or not of that version"""
+
+        path = self.checkpoint_path(version)
+
+        try:
+            with open(path) as f:
+                if f.readline() != f'version\t{version}\n':
+                    return None
+
+                entries = {}
+                complete = True
+
+                for line in f:
+                    complete = line.endswith('\n')
+                    fields = line.rstrip('\n').split('\t')
+
+                    # the last line is cut short if the match was interrupted while it was written
+                    if not complete or len(fields) != 4:
+                        continue
+
+                    try:
+                        entries[fields[0]] = (int(fields[1]), float(fields[2]), fields[3] == '1')
+                    except ValueError:
+                        continue
+
+        except OSError:
+            return None
+
+        if not complete:
+            with open(path, 'a') as f:
+                f.write('\n')
+
+        return entries
+
+    def _evict(self):
+
+        """Removes the checkpoint files of other versions not written for CHECKPOINT_TTL seconds"""
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        root, extension = os.path.splitext(os.path.basename(self.path))
+        now = time.time()
+
+        for entry in os.scandir(directory):
+            if not (entry.name.startswith(f'{root}-') and entry.name.endswith(extension)):
+                continue
+
+            if entry.path != os.path.abspath(self.checkpoint_path()) and now - entry.stat().st_mtime >= CHECKPOINT_TTL:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
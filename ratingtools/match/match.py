@@ -1,15 +1,43 @@
 
+# built-ins
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+# internal packages
+from .records import categorize
+
 # external packages
 import pandas
-from tqdm import tqdm
-from vs_library.tools import recordmatch, pandas_extension
+from vs_library.tools import pandas_extension
 
 
 class RatingWorksheet:
 
     """An object to represent a rating worksheet"""
 
-    def __init__(self):
+    def __init__(self, cache_directory=None, processes=None, compact=False):
+
+        """
+        Parameters
+        ----------
+        cache_directory : str, optional
+            Where parsed spreadsheets are cached, so that unchanged files are not
+            parsed again. Nothing is cached if not specified
+
+        processes : int, optional
+            Number of processes parsing spreadsheets at once, defaults to the number
+            of cores. Set to 1 to parse them one after another
+
+        compact : bool, default=False
+            Whether low cardinality columns (party, state, office, district...)
+            are stored as categoricals, see records.categorize
+        """
+
+        self.cache_directory = cache_directory
+        self.processes = processes
+        self.compact = compact
 
         self.columns = ['lastname', 'firstname', 'middlename', 'suffix', 'nickname',
                         'party', 'state', 'state_id','office', 'district',
@@ -65,21 +93,25 @@ class RatingWorksheet:
         """Imports a spreadsheet file and sets this instance's pandas.DataFrame"""
 
         try:
-            dfs = []
-            messages = []
+            filepaths = list(filepaths)
+            cache_directories = [self.cache_directory] * len(filepaths)
+
+            if len(filepaths) > 1 and self.processes != 1:
+                with ProcessPoolExecutor(self.processes) as executor:
+                    results = list(executor.map(read_spreadsheet, filepaths, cache_directories))
+            else:
+                results = list(map(read_spreadsheet, filepaths, cache_directories))
 
-            for filepath in filepaths:
-                df, message = pandas_extension.read_spreadsheet(filepath, dtype=str)
-                dfs.append(df)
-                messages.append(message)
+            dfs = [df for df, _ in results]
+            messages = [message for _, message in results]
 
             concat_df = pandas.concat(dfs, ignore_index=True)
 
             if concat_df.empty:
                 return False, "\n".join(messages)
 
-            self.df = concat_df
-            self.df.fillna(value='', inplace=True)
+            concat_df.fillna(value='', inplace=True)
+            self.df = categorize(concat_df) if self.compact else concat_df
             return True, "\n".join(messages)
 
         except Exception as e:
@@ -106,21 +138,103 @@ class RatingWorksheet:
             If self.__df is empty, it will generate a dataframe with the specified number of rows
         """
 
-        df = pandas.DataFrame(columns=self.columns)
+        columns = [c for c in self.columns if c in self.__df.columns and self.__df[c].astype(bool).any()]
 
-        for column in self.columns:
-            if column in self.__df.columns:
-                if any(self.__df[column]):
-                    df[column] = self.__df[column]
+        if not columns:
+            self.__df = pandas.DataFrame(columns=self.columns)
+            return
 
-        if len(df) and number_of_rows > len(df):
-            df_2 = pandas.DataFrame([[''] * len(self.columns)] * (number_of_rows-len(self.__df)), columns=self.columns)
-            df = pandas.concat([df, df_2]).reset_index(drop=True)
+        # columns without any value are left out, and come back empty
+        df = pandas.DataFrame(index=self.__df.index, columns=self.columns, dtype=object)
 
-        elif len(df) and number_of_rows < len(df):
-            number_of_rows = len(df)
-        
-        else:
-            pass
+        for column in columns:
+            values = self.__df[column]
+
+            # compact worksheets are generated with str columns, as the others are
+            if isinstance(values.dtype, pandas.CategoricalDtype):
+                values = values.astype(values.cat.categories.dtype)
+
+            df[column] = values
+
+        # padded with rows of empty strings up to number_of_rows
+        if number_of_rows > len(df):
+            df = df.reset_index(drop=True).reindex(pandas.RangeIndex(number_of_rows), fill_value='')
 
         self.__df = df
+
+
+def read_spreadsheet(filepath, cache_directory=None):
+
+    """
+    Reads a spreadsheet with every column as str, from the cache if it is unchanged
+
+    A cached spreadsheet is used when the file has the same modified time, or
+    otherwise the same content, as when it was cached.
+
+    Parameters
+    ----------
+    filepath : str
+        Path of the spreadsheet
+
+    cache_directory : str, optional
+        Where parsed spreadsheets are cached
+
+    Returns
+    -------
+    (pandas.DataFrame, str)
+        Contents of the spreadsheet and the message from reading it
+    """
+
+    if not cache_directory:
+        return pandas_extension.read_spreadsheet(filepath, dtype=str)
+
+    filepath = os.path.abspath(filepath)
+    cache_path = os.path.join(cache_directory, hashlib.sha256(filepath.encode('utf-8')).hexdigest() + '.pickle')
+    modified = os.stat(filepath).st_mtime_ns
+    content_hash = None
+
+    try:
+        with open(cache_path, 'rb') as f:
+            cached_modified, cached_hash, df, message = pickle.load(f)
+
+        if cached_modified == modified:
+            return df, message
+
+        content_hash = _file_hash(filepath)
+        if cached_hash == content_hash:
+            _write_cache(cache_path, (modified, content_hash, df, message))
+            return df, message
+
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+        pass
+
+    df, message = pandas_extension.read_spreadsheet(filepath, dtype=str)
+
+    if df is not None:
+        _write_cache(cache_path, (modified, content_hash or _file_hash(filepath), df, message))
+
+    return df, message
+
+
+def _file_hash(filepath):
+
+    file_hash = hashlib.sha256()
+
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1024*1024), b''):
+            file_hash.update(block)
+
+    return file_hash.hexdigest()
+
+
+def _write_cache(cache_path, entry):
+
+    # written aside and renamed so that a reader never sees a partial file
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+    temporary_path = f'{cache_path}.{os.getpid()}.tmp'
+
+    with open(temporary_path, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(temporary_path, cache_path)
@@ -1,34 +1,52 @@
-import pandas
+# built-ins
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# internal packages
+from . import cache, export, query, remote
+from .instrument import Instrument
+from .records import ColumnarRecords, categorize
 
 # external packages
+import pandas
+
 from vs_library.cli import Node, NodeBundle, DecoyNode, textformat
 from vs_library.cli.objects import Command, Display, Prompt, Table
 from vs_library.vsdb import queries_cli
 from vs_library.database import database_cli
 from vs_library.tools import pandas_extension_cli
 
-from tqdm import tqdm
-
 class ImportRatingWorksheet(pandas_extension_cli.ImportSpreadsheets):
     
     """Imports the ratings worksheet file"""
     
-    def __init__(self, rating_worksheet, parent=None):
+    def __init__(self, rating_worksheet, instrument=None, parent=None):
 
         """
         Parameters
         ----------
         rating_worksheet : match.RatingWorksheet
             Controller of this NodeBundle
+
+        instrument : instrument.Instrument, optional
+            Records the time and memory of the import
         """
         
         name = 'import-rating-worksheet'
         self.rating_worksheet = rating_worksheet
+        self.instrument = instrument if instrument else Instrument()
 
         super().__init__(name, parent=parent)
 
     def _execute(self):
-        return super()._execute(self.rating_worksheet.read)
+
+        with self.instrument.stage('Import') as stage:
+            result = super()._execute(self.rating_worksheet.read)
+            if self.rating_worksheet.df is not None:
+                stage.count(rows=len(self.rating_worksheet.df))
+
+        return result
 
 
 class AnalyzeRatingWorksheet(NodeBundle):
@@ -103,39 +121,75 @@ class SelectQueryForms(NodeBundle):
 
     """Prompts user to select the appropriate query forms for candidate matching"""
 
-    def __init__(self, query_tool, parent):
+    def __init__(self, query_tool, rating_worksheet=None, parent=None):
         
         """
         Parameters
         ----------
         query_tool : vs_library.database.QueryTool
             Controller of this NodeBundle
+
+        rating_worksheet : match.RatingWorksheet, optional
+            If specified, user can restrict the candidates queried to the states
+            of the worksheet once a query form is filled
         """
 
         name = 'select-query'
         self.query_tool = query_tool
+        self.rating_worksheet = rating_worksheet
+
+        # candidate column to the values the query is restricted to, see query.restrict
+        self.filters = None
         
         # OBJECTS
-        self.__prompt = Prompt("Are these rating for incumbents or for candidates?")
+        self.__prompt_0 = Prompt("Are these rating for incumbents or for candidates?")
+        self.__prompt_1 = Prompt("{message}", command=Command(self._format_message))
         
         # NODES
-        self.__entry_node = Node(self.__prompt, name=f'{name}_choices', clear_screen=True, show_hideout=True)
+        self.__entry_node = Node(self.__prompt_0, name=f'{name}_choices', clear_screen=True, show_hideout=True)
         self.__exit_node = DecoyNode(name=f'{name}_last')
 
         self.__bundle_0 = queries_cli.IncumbentQueryForm(self.query_tool, parent=self.__entry_node)
         self.__bundle_1 = queries_cli.CandidateQueryForm(self.query_tool, parent=self.__entry_node)
-        
-        self.__bundle_0.adopt_node(self.__exit_node)
-        self.__bundle_1.adopt_node(self.__exit_node)
+
+        if rating_worksheet is not None:
+            self.__node_0 = Node(self.__prompt_1, name=f'{name}_pushdown', clear_screen=True, show_hideout=True)
+            self.__bundle_0.adopt_node(self.__node_0)
+            self.__bundle_1.adopt_node(self.__node_0)
+            self.__node_0.adopt(self.__exit_node)
+        else:
+            self.__bundle_0.adopt_node(self.__exit_node)
+            self.__bundle_1.adopt_node(self.__exit_node)
 
         # CONFIGURATIONS
-        self.__prompt.options = {
+        self.__prompt_0.options = {
             '1': Command(lambda: self.__entry_node.set_next(self.__bundle_0.entry_node), value='Incumbents'),
             '2': Command(lambda: self.__entry_node.set_next(self.__bundle_1.entry_node), value='Candidates')
             }
 
+        self.__prompt_1.exe_seq = 'before'
+        self.__prompt_1.options = {
+            '1': Command(lambda: self._restrict(True), value="Query only the candidates the worksheet can match"),
+            '2': Command(lambda: self._restrict(False), value="Query every candidate of the form")
+            }
+
         super().__init__(self.__entry_node, self.__exit_node, name=name, parent=parent)
 
+    def _format_message(self):
+
+        filters = query.worksheet_filters(self.rating_worksheet.df)
+        if filters:
+            scope = ', '.join(f"{c} ({len(v)})" for c, v in filters.items())
+            message = f"Candidates can be restricted to the worksheet's {scope}. Select the following:"
+        else:
+            message = "Some worksheet rows have no state. Select the following:"
+
+        self.__prompt_1.question.format_dict = {'message': message}
+
+    def _restrict(self, restrict):
+        self.filters = query.worksheet_filters(self.rating_worksheet.df) if restrict else None
+        self.__node_0.set_next(self.__exit_node)
+
 
 class DatabaseConnection(NodeBundle):
 
@@ -221,6 +275,93 @@ class DatabaseConnection(NodeBundle):
             self.__prompt_0.options['2'].value = "Use an Existing Connection"
 
 
+class CachedQueryExecution(NodeBundle):
+
+    """Lets user skip the database query when the candidates of the same query are cached"""
+
+    def __init__(self, query_tool, candidate_cache, query_form=None, stream=False, on_ready=None, parent=None):
+
+        """
+        Parameters
+        ----------
+        query_tool : vs_library.database.QueryTool
+            Controller that executes the query
+
+        candidate_cache : cache.CandidateCache
+            Where the candidates of previous queries are stored
+
+        query_form : NodeBundle, optional
+            Passed on to vs_library.database.database_cli.QueryExecution. When streamed,
+            the query is restricted to the filters of a SelectQueryForms
+
+        stream : bool, default=False
+            Whether the candidates are streamed by RatingMatch instead, in which case
+            the query is not executed here
+
+        on_ready : function, optional
+            Called once it is settled where streamed candidates come from, e.g.
+            RatingMatch.prefetch to start streaming them in the background
+        """
+
+        name = 'cached-query-execution'
+        self.query_tool = query_tool
+        self.candidate_cache = candidate_cache
+        self.query_form = query_form
+        self.stream = stream
+        self.on_ready = on_ready
+
+        # OBJECTS
+        self.__prompt_0 = Prompt("{message}", command=Command(self._check_for_cache))
+
+        # NODES
+        self.__entry_node = Node(self.__prompt_0, name=f'{name}_use-cached',
+                                 show_hideout=True, clear_screen=True)
+        self.__bundle_0 = database_cli.QueryExecution(query_tool, query_form=query_form, parent=self.__entry_node)
+        self.__exit_node = DecoyNode(name=f'{name}_last-node', parent=self.__entry_node)
+
+        self.__bundle_0.adopt_node(self.__exit_node)
+
+        # CONFIGURATIONS
+        self.__prompt_0.exe_seq = 'before'
+
+        super().__init__(self.__entry_node, self.__exit_node, name=name, parent=parent)
+
+    def _check_for_cache(self):
+        filters = getattr(self.query_form, 'filters', None) if self.stream else None
+        key = self.candidate_cache.key(*query.signature(self.query_tool, filters),
+                                       query.identity(query.connection(self.query_tool)))
+        saved_at = self.candidate_cache.saved_at(key)
+        query_database = Command(self._query_database, value="Query the database")
+
+        if saved_at is None:
+            self.__prompt_0.question.format_dict = {'message': "There are no cached candidates for this query."}
+            self.__prompt_0.options = {'1': query_database}
+        else:
+            saved_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(saved_at))
+            self.__prompt_0.question.format_dict = {'message': f"Candidates of this query were cached on {saved_at}. "
+                                                               "Select the following:"}
+            self.__prompt_0.options = {'1': Command(self._use_cached, value="Use cached candidates"),
+                                       '2': query_database}
+
+    def _use_cached(self):
+        self.candidate_cache.enabled = True
+        self.__entry_node.set_next(self.__exit_node)
+
+        if self.stream and self.on_ready:
+            self.on_ready()
+
+    def _query_database(self):
+        self.candidate_cache.enabled = False
+
+        if self.stream:
+            self.__entry_node.set_next(self.__exit_node)
+
+            if self.on_ready:
+                self.on_ready()
+        else:
+            self.__entry_node.set_next(self.__bundle_0.entry_node)
+
+
 class RatingMatch(NodeBundle):
 
     """Performs match on rating worksheet with query results"""
@@ -230,6 +371,10 @@ class RatingMatch(NodeBundle):
                  query_tool, 
                  record_matcher, 
                  query_forms=None, 
+                 candidate_cache=None,
+                 fetch_size=None,
+                 instrument=None,
+                 daemon=None,
                  parent=None):
 
         """
@@ -247,19 +392,64 @@ class RatingMatch(NodeBundle):
         query_forms : NodeBundle, optional
             A bundle to select query forms or a bundle before a query is executed.
             The purpose of having this bundle is so that user can change the query results
-            before matching
+            before matching. Streamed candidates are restricted to the filters of a
+            SelectQueryForms
+
+        candidate_cache : cache.CandidateCache, optional
+            Query results are stored to it, and read from it instead when the user
+            chose to use cached candidates
+
+        fetch_size : int, optional
+            If specified, candidates are streamed from the database through a
+            server-side cursor, this many rows at a time, instead of being taken
+            from query_tool
+
+        instrument : instrument.Instrument, optional
+            Records the time and memory of the stages of the match, which are
+            shown with the results when it is enabled
+
+        daemon : remote.MatchDaemon, optional
+            If specified, and the daemon is running, worksheets are matched by it
+            against the candidates it holds, instead of querying and matching here.
+            record_matcher must then be an engine.MatchEngine, whose settings are sent along
         """
         
         name = 'rating-match'
         self.rating_worksheet = rating_worksheet
         self.query_tool = query_tool
         self.record_matcher = record_matcher
+        self.query_forms = query_forms
+        self.candidate_cache = candidate_cache
+        self.fetch_size = fetch_size
+        self.instrument = instrument if instrument else Instrument()
+        self.daemon = daemon
+
+        # candidates streamed or read from the cache for a query, kept until the query changes
+        self.__streamed = (None, None)
+        self.__cached = (None, None)
+        self.__results = None
+
+        # query the daemon holds the candidates of, and the records standing in for them here
+        self.__remote = (None, None)
+
+        # worksheet handed to the matcher, it is only handed over again once replaced
+        self.__worksheet_df = None
+
+        # whether the last match was made by the daemon, see ChooseAlternative
+        self.matched_remotely = False
+
+        # candidates queried and prepared in the background, see prefetch
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.__prefetch = None
+        self.__cancelled = threading.Event()
         
         # OBJECTS
         self.__prompt_0 = Prompt("Things are set. What matching tool you would like to use?")
         self.__prompt_1 = Prompt(textformat.apply("Tabular Matcher Menu", emphases=['bold', 'underline']))
         self.__display_0 = Display("Matching in progress...", command=Command(self._execute))
+        self.__display_1 = Display("Finishing the export of the matched results...", command=Command(self._finish_export))
         self.__table_0 = Table([], header=False)
+        self.__table_1 = Table([], header=False)
 
         self._set_record_matcher()
         
@@ -275,10 +465,16 @@ class RatingMatch(NodeBundle):
                              clear_screen=True)
 
         self.__bundle_0 = pandas_extension_cli.TBSettings(record_matcher, parent=self.__node_2)
-        self.__bundle_1 = ExportMatchedDf(None, parent=self.__node_1)
-        self.__bundle_2 = database_cli.ExportQueryResults(self.query_tool, parent=self.__bundle_1)
+        self.__bundle_1 = ExportMatchedDf(None, instrument=self.instrument, parent=self.__node_1)
+        self.__bundle_2 = ExportCandidates(self.candidates_frame, parent=self.__bundle_1)
+
+        # the matched results are written while the query results are exported, and waited for here
+        self.__node_3 = Node(self.__display_1, name=f'{name}_finish-export', parent=self.__bundle_2.exit_node,
+                             store=False)
+        self.__node_4 = Node(self.__table_1, name=f'{name}_export-results', parent=self.__node_3,
+                             acknowledge=True)
 
-        self.__exit_node = DecoyNode(name=f'{name}_last-node', parent=self.__bundle_2.exit_node)
+        self.__exit_node = DecoyNode(name=f'{name}_last-node', parent=self.__node_4)
         
         self.__node_2.adopt(self.__node_0)
 
@@ -289,6 +485,9 @@ class RatingMatch(NodeBundle):
         self.__table_0.table_header = "Match Results"
         self.__table_0.description = "Above shows the results of the match"
 
+        self.__table_1.table_header = "Export Results"
+        self.__table_1.description = "Above shows whether the matched results were exported"
+
         self.__prompt_0.options = {
             '1': Command(lambda: self.__entry_node.set_next(self.__node_2), value="Tabular Matcher",
                          command=Command(self._set_record_matcher)),
@@ -300,6 +499,14 @@ class RatingMatch(NodeBundle):
             'M': Command(lambda: self.__node_2.set_next(self.__node_0), value="Commence Match")
         }
 
+        # allow user to match rows with other candidates kept for them, then to match again
+        if getattr(record_matcher, 'alternatives', None) is not None:
+            self.__bundle_3 = ChooseAlternative(record_matcher, remote_func=lambda: self.matched_remotely,
+                                                parent=self.__node_2)
+            self.__bundle_3.adopt_node(self.__node_2)
+            self.__prompt_1.options['A'] = Command(lambda: self.__node_2.set_next(self.__bundle_3.entry_node),
+                                                   value="Choose Alternative Candidates")
+
         # allow user to return to selecting query forms
         if query_forms:
             self.__node_2.adopt(query_forms.entry_node)
@@ -309,10 +516,21 @@ class RatingMatch(NodeBundle):
 
     def _execute(self):
     
+        # imported here, it is only needed once a match starts
+        from tqdm import tqdm
+
         if self.__prompt_0.responses == '1':
-            p_bar = tqdm(total=len(self.rating_worksheet.df))
-            records, match_info = self.record_matcher.match(update_func=lambda: p_bar.update(1))
-            df = pandas.DataFrame.from_dict(records, orient='index')
+            with self.instrument.stage('Match') as stage:
+                result = self._remote_match()
+                self.matched_remotely = result is not None
+
+                if result is None:
+                    p_bar = tqdm(total=len(self.rating_worksheet.df))
+                    result = self.record_matcher.match(update_func=lambda: p_bar.update(1))
+
+                records, match_info = result
+                df = pandas.DataFrame.from_dict(records, orient='index')
+                stage.count(rows=len(df))
 
         # elif self.__prompt_0.responses == '2':
         #     query_records = self.query_tool.results(as_format='records')
@@ -324,6 +542,36 @@ class RatingMatch(NodeBundle):
         self.__bundle_1.df = df
         self._populate_table(match_info)
 
+    def _finish_export(self):
+
+        result = self.__bundle_1.wait()
+        success, message = result if result else (True, "Matched results were not exported")
+
+        self.__table_1.clear()
+        self.__table_1.table.append(['Matched Results', message])
+
+        if not success:
+            self.__table_1.table.append(['', "Export them again from the match results"])
+
+    def _remote_match(self):
+
+        """Returns the records and match_info of a match by the daemon, None if it did not match"""
+
+        signature, candidates = self.__remote
+        if candidates is None or self.record_matcher.y_records is not candidates:
+            return None
+
+        statement, parameters, filters = signature
+        result = self.daemon.match(statement, parameters, remote.settings(self.record_matcher),
+                                   self.rating_worksheet.df, filters=filters)
+
+        # the daemon went away, candidates are queried here from now on
+        if result is None:
+            self.__remote = (signature, None)
+            self._set_record_matcher()
+
+        return result
+
     def _populate_table(self, match_info):
 
         self.__table_0.clear()
@@ -331,31 +579,342 @@ class RatingMatch(NodeBundle):
         for k, v in match_info.items():
             self.__table_0.table.append([k, str(v)])
 
+        if self.instrument.enabled:
+            self.__table_0.table.append([textformat.apply('Stages', emphases=['bold']), ''])
+            self.__table_0.table.extend([name, description] for name, description in self.instrument.summary())
+
+            if self.instrument.trace_path:
+                _, message = self.instrument.write()
+                self.__table_0.table.append(['Trace', message])
+
+    def candidates_frame(self):
+
+        """
+        Returns the candidates the worksheet was matched against, which query_tool
+        does not hold when they were streamed, read from the cache or held by the daemon
+
+        Returns
+        -------
+        pandas.DataFrame
+            Candidates, those held by the daemon are queried again for it
+        """
+
+        candidates = self.record_matcher.y_records
+        signature, remote_candidates = self.__remote
+
+        if remote_candidates is not None and candidates is remote_candidates:
+            statement, parameters, filters = signature
+            return query.fetch_frame(query.connection(self.query_tool), *query.restrict(statement, parameters, filters),
+                                     fetch_size=self.fetch_size if self.fetch_size else 10000)
+
+        if isinstance(candidates, ColumnarRecords):
+            return candidates.df
+
+        return pandas.DataFrame.from_records(candidates if candidates else [])
+
+    def prefetch(self):
+
+        """
+        Starts querying the candidates and preparing the matcher for them in the
+        background, while the user goes through the menus. The matcher is only
+        configured once they are ready. The query shares the connection of query_tool
+        and holds its lock while streaming, see query.lock.
+        """
+
+        if self.__prefetch is None or self.__prefetch.done():
+            self.__prefetch = self.__executor.submit(self._prefetch)
+
+    def close(self):
+
+        """
+        Cancels the candidates being prepared in the background, called on exit
+        so that it does not wait on a query still streaming. A streamed query
+        stops before its next batch.
+        """
+
+        self.__cancelled.set()
+        self.__executor.shutdown(wait=False, cancel_futures=True)
+
+    def _prefetch(self):
+
+        candidates = self._query_candidates()
+        if self.__cancelled.is_set():
+            return
+
+        if candidates is not self.record_matcher.y_records:
+            self.record_matcher.y_records = candidates
+
+        # candidates are normalized and indexed ahead of the match if the matcher can
+        if hasattr(self.record_matcher, 'warm'):
+            self.record_matcher.warm()
+
     def _set_record_matcher(self):
 
-        self.record_matcher.x_records = self.rating_worksheet.df.to_dict('index')
-        self.record_matcher.y_records = self.query_tool.results(as_format='records')
-        self.record_matcher.config.populate()
+        with self.instrument.stage('Prepare') as stage:
+            # waits on the candidates still being prepared, and raises what preparing them raised
+            if self.__prefetch is not None:
+                with self.instrument.stage('Wait'):
+                    prefetch, self.__prefetch = self.__prefetch, None
+                    prefetch.result()
+
+            worksheet_df = self.rating_worksheet.df
+
+            # the matcher keeps what it normalized from records until they are replaced
+            if worksheet_df is not self.__worksheet_df:
+                self.record_matcher.x_records = ColumnarRecords(worksheet_df)
+                self.__worksheet_df = worksheet_df
+
+            candidates = self._candidates()
+            if candidates is not self.record_matcher.y_records:
+                self.record_matcher.y_records = candidates
+
+            self.record_matcher.config.populate()
+            stage.count(rows=len(worksheet_df))
+
+    def _candidates(self):
+
+        with self.instrument.stage('Query') as stage:
+            candidates = self._query_candidates()
+            stage.count(rows=len(candidates))
+
+        return candidates
+
+    def _query_candidates(self):
+
+        # only streamed candidates are queried here, results of query_tool are as they were queried
+        filters = getattr(self.query_forms, 'filters', None) if self.fetch_size else None
+        statement, parameters = query.signature(self.query_tool, filters)
+        key = self.candidate_cache.key(statement, parameters, query.identity(query.connection(self.query_tool))) \
+            if self.candidate_cache and statement is not None else None
+
+        # the daemon keeps the candidates, only their columns are needed here. It is sent the
+        # filters apart from the query, to match against the unrestricted candidates if it holds them
+        if self.daemon is not None and statement is not None:
+            signature = query.signature(self.query_tool) + (filters,)
+
+            if self.__remote[0] != signature:
+                self.__remote = (signature, self.daemon.candidates(*signature))
+
+            if self.__remote[1] is not None:
+                return self.__remote[1]
+
+        if key and self.candidate_cache.enabled:
+            if self.__cached[0] != key:
+                df = self.candidate_cache.get(key)
+                self.__cached = (key, ColumnarRecords(categorize(df)) if df is not None else None)
+
+            if self.__cached[1] is not None:
+                return self.__cached[1]
+
+        if self.fetch_size:
+            if statement is None:
+                return []
+
+            if self.__streamed[0] != (statement, parameters):
+                df = query.fetch_frame(query.connection(self.query_tool), statement, parameters,
+                                       fetch_size=self.fetch_size, cancelled=self.__cancelled)
+                self.__streamed = ((statement, parameters), ColumnarRecords(categorize(df)))
+
+                if key and not df.empty:
+                    self.candidate_cache.put(key, df)
+
+            return self.__streamed[1]
+
+        records = self.query_tool.results(as_format='records')
+
+        if records != self.__results:
+            self.__results = records
+
+            if key and records:
+                self.candidate_cache.put(key, cache.records_frame(records))
+
+        return self.__results
+
+
+class ChooseAlternative(NodeBundle):
+
+    """
+    Matches a worksheet row with another of the candidates kept for it in the last match
+
+    Only local matches keep candidates here, those of a match made by the match
+    daemon are kept by the daemon and cannot be chosen from.
+    """
+
+    def __init__(self, match_engine, remote_func=None, parent=None):
+
+        """
+        Parameters
+        ----------
+        match_engine : engine.MatchEngine
+            Controller of this NodeBundle, keeping alternatives
+
+        remote_func : function, optional
+            Returns whether the last match was made by the match daemon
+        """
+
+        name = 'choose-alternative'
+        self.match_engine = match_engine
+        self.remote_func = remote_func
+
+        # candidates kept for every row of the last match, read once the bundle is entered
+        self.__alternatives_df = None
+
+        # OBJECTS
+        self.__prompt_0 = Prompt("Which worksheet row? Enter its index", verification=self.is_kept_row)
+        self.__table_0 = Table([], command=Command(self._populate_table))
+        self.__prompt_1 = Prompt("Match the row with which candidate?", command=Command(self._populate_prompt))
+
+        # NODES
+        self.__entry_node = Node(self.__prompt_0, name=f'{name}_row', show_hideout=True, clear_screen=True)
+        self.__node_0 = Node(self.__table_0, name=f'{name}_candidates', parent=self.__entry_node)
+        self.__node_1 = Node(self.__prompt_1, name=f'{name}_choice', parent=self.__node_0)
+        self.__exit_node = DecoyNode(name=f'{name}_last-node', parent=self.__node_1)
+
+        # CONFIGURATIONS
+        self.__table_0.table_header = "Kept Candidates"
+        self.__table_0.description = "Above shows the candidates kept for the row, best first"
+
+        self.__prompt_1.exe_seq = 'before'
+
+        super().__init__(self.__entry_node, self.__exit_node, name=name, parent=parent)
+
+    def is_kept_row(self, x):
+
+        """Provide a verification that candidates were kept for the row entered"""
+
+        if self.remote_func and self.remote_func():
+            return False, "The last match was made by the match daemon, which keeps its candidates. " \
+                          "Candidates can only be chosen from a match made here."
+
+        self.__alternatives_df = self.match_engine.alternatives_frame()
+        kept = self.__alternatives_df['index'].astype(str) == x.strip()
+
+        return kept.any(), "No candidates were kept for this row. Match the worksheet first."
+
+    def _row(self):
+        return self.__alternatives_df[self.__alternatives_df['index'].astype(str) == self.__prompt_0.responses.strip()]
+
+    def _populate_table(self):
+
+        row_df = self._row()
+
+        self.__table_0.table = [list(row_df.columns)] + row_df.astype(str).values.tolist()
+
+    def _populate_prompt(self):
+
+        row_df = self._row()
+        index = row_df['index'].iloc[0]
+        keep = self.match_engine.alternatives.keep
+
+        self.__prompt_1.options = {str(rank): Command(lambda r=rank: self.match_engine.choose(index, r),
+                                                      value=f"Rank {rank}, scored {score}")
+                                   for rank, score in zip(row_df['rank'], row_df['match_score']) if 0 <= rank < keep}
+        self.__prompt_1.options['B'] = Command(lambda: self.match_engine.choose(index, None),
+                                               value="Its best candidate again")
+
+
+class ExportCandidates(pandas_extension_cli.ExportSpreadsheet):
+
+    """
+    Candidates the worksheet was matched against can be saved as a spreadsheet,
+    a CSV or a parquet file to the user's local host, see export.write
+    """
+
+    def __init__(self, candidates_func, compression=None, parent=None):
+
+        """
+        Parameter
+        ---------
+        candidates_func : function
+            Returns the candidates as a pandas.DataFrame, e.g. RatingMatch.candidates_frame
+
+        compression : str, optional
+            Compression of a parquet file, see export.write
+        """
+
+        name = 'export-candidates'
+
+        self.candidates_func = candidates_func
+        self.compression = compression
+
+        super().__init__(name, parent)
+
+    def _execute(self):
+        return super()._execute(self._write)
+
+    def _write(self, filepath):
+        return export.write(self.candidates_func(), filepath, compression=self.compression)
 
 
 class ExportMatchedDf(pandas_extension_cli.ExportSpreadsheet):
 
-    """Matched results can be save as a spreadsheet to the user's local host"""
+    """
+    Matched results can be save as a spreadsheet, a CSV or a parquet file to the
+    user's local host, by the extension of the file, see export.write
+
+    The file is written in the background, so that the user can go on to export
+    the query results meanwhile. wait returns once it is written.
+    """
 
-    def __init__(self, df, parent=None):
+    def __init__(self, df, instrument=None, compression=None, parent=None):
 
         """
         Parameter
         ---------
         df : pandas.DataFrame
             This pandas.DataFrame is the result of the matched ratings worksheet
+
+        instrument : instrument.Instrument, optional
+            Records the time and memory of the export
+
+        compression : str, optional
+            Compression of a parquet file, see export.write
         """
 
         name = 'export-matched-df'
 
         self.df = df
+        self.instrument = instrument if instrument else Instrument()
+        self.compression = compression
+
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self.__writing = None
+
         super().__init__(name, parent)
 
 
     def _execute(self):
-        return super()._execute(df=self.df)
+        return super()._execute(self._write)
+
+    def _write(self, filepath):
+
+        # the DataFrame is handed over as it is now, the next match replaces rather than changes it
+        df = self.df
+        self.__writing = (len(df), self.__executor.submit(export.write, df, filepath, compression=self.compression))
+
+        return True, f"Writing {len(df):,} matched rows to {filepath} in the background..."
+
+    def wait(self):
+
+        """
+        Waits for the matched results being written
+
+        Returns
+        -------
+        (bool, str)
+            Whether the file was written, and a message saying so or what went
+            wrong. None if no file is being written
+        """
+
+        if self.__writing is None:
+            return None
+
+        rows, future = self.__writing
+        self.__writing = None
+
+        # stages are kept by the main thread, this one is how long the export held the user up
+        with self.instrument.stage('Export Matched') as stage:
+            result = future.result()
+            stage.count(rows=rows)
+
+        return result
@@ -0,0 +1,87 @@
+# built-ins
+import re
+import unicodedata
+
+
+SUFFIXES = ('jr', 'sr', 'ii', 'iii', 'iv', 'v')
+NAME_COLUMNS = ('lastname', 'firstname', 'middlename', 'nickname')
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+_SUFFIX = re.compile(r'[\s,]+(?:' + '|'.join(SUFFIXES) + r')\.?$')
+
+
+def clean(x):
+
+    """Turns a value into a stripped and lowercased string"""
+
+    return str(x).strip().lower()
+
+
+def fold_accents(x):
+
+    """Replaces accented characters with their unaccented form, 'José' becomes 'Jose'"""
+
+    return ''.join(c for c in unicodedata.normalize('NFKD', x) if not unicodedata.combining(c))
+
+
+def remove_punctuation(x):
+
+    """Removes punctuation and collapses whitespace, "O'Neil-Smith" becomes 'ONeilSmith'"""
+
+    return _WHITESPACE.sub(' ', _PUNCTUATION.sub('', x)).strip()
+
+
+def strip_suffix(x):
+
+    """Removes a generational suffix at the end of a name, 'smith jr.' becomes 'smith'"""
+
+    return _SUFFIX.sub('', x)
+
+
+class Normalizer:
+
+    """
+    Applies a sequence of normalization steps to a value
+
+    The first step is always `clean`, so every step receives a stripped and
+    lowercased string.
+    """
+
+    def __init__(self, *steps):
+
+        """
+        Parameters
+        ----------
+        *steps : function
+            Functions that take a string and return a string, applied in order after `clean`
+        """
+
+        self.steps = (clean,) + steps
+
+    def __call__(self, x):
+
+        for step in self.steps:
+            x = step(x)
+
+        return x
+
+    def column(self, values):
+
+        """Normalizes every value of a column, each distinct value is normalized only once"""
+
+        normalized = {}
+        return [normalized[v] if v in normalized else normalized.setdefault(v, self(v))
+                for v in values]
+
+
+def worksheet_normalizers():
+
+    """
+    Returns the default normalizer and the normalizers by column used to match
+    worksheets: accents are folded everywhere, names are also stripped of
+    punctuation and suffixes
+    """
+
+    names = Normalizer(fold_accents, remove_punctuation, strip_suffix)
+    return Normalizer(fold_accents), {column: names for column in NAME_COLUMNS}
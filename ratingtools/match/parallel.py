@@ -0,0 +1,195 @@
+# built-ins
+import heapq
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+
+# external packages
+import numpy
+
+# internal packages
+from . import scoring
+
+
+# fewer worksheet rows are scored in the calling process, starting the workers and
+# copying the candidates to them would take longer than the scoring itself
+MIN_ROWS = 10000
+
+
+class SharedArrays:
+
+    """Numpy arrays copied once into shared memory, to be attached by worker processes"""
+
+    def __init__(self, arrays):
+
+        """
+        Parameters
+        ----------
+        arrays : dict
+            numpy.ndarray by name, object arrays must be converted to a fixed width dtype
+        """
+
+        self.arrays = {}
+        self.specs = {}
+        self.__blocks = []
+
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            self.__blocks.append(block)
+
+            self.arrays[name] = numpy.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            self.arrays[name][:] = array
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+
+        """Releases and removes the shared memory blocks"""
+
+        self.arrays.clear()
+
+        for block in self.__blocks:
+            block.close()
+            block.unlink()
+
+        self.__blocks.clear()
+
+
+@contextmanager
+def attach(specs):
+
+    """
+    Attaches the arrays described by SharedArrays.specs without copying them,
+    the blocks are closed on exit so no reference to the arrays may outlive it
+    """
+
+    arrays = {}
+    blocks = []
+
+    try:
+        for name, (block_name, shape, dtype) in specs.items():
+            blocks.append(shared_memory.SharedMemory(name=block_name))
+            arrays[name] = numpy.ndarray(shape, dtype=dtype, buffer=blocks[-1].buf)
+
+        yield arrays
+
+    finally:
+        arrays.clear()
+
+        for block in blocks:
+            block.close()
+
+
+def best_candidates(groups, columns, x_columns, y_columns, number_of_rows,
+                    processes, chunk_size=2000000, cutoff=0, update_func=None, keep=0):
+
+    """
+    Same as scoring.best_candidates, with the worksheet rows sharded across processes
+
+    The candidate columns are placed in shared memory once and attached by every
+    worker, only the worksheet rows of a shard are sent to its worker. Each shard
+    counts the rows it has scored in a shared counter, those counters are summed
+    to report progress through update_func.
+
+    Parameters
+    ----------
+    processes : int
+        Number of worker processes
+
+    See scoring.best_candidates for the other parameters and the return value
+    """
+
+    best = numpy.full(number_of_rows, -1, dtype=numpy.int64)
+    best_scores = numpy.zeros(number_of_rows, dtype=numpy.float32)
+    ambiguous = numpy.zeros(number_of_rows, dtype=bool)
+    alternatives = numpy.full((number_of_rows, keep), -1, dtype=numpy.int64)
+    alternative_scores = numpy.full((number_of_rows, keep), -1, dtype=numpy.float32)
+    comparisons = 0
+
+    shards = _shard(groups, processes * 4)
+    candidates = SharedArrays({c: numpy.array(v, dtype=str) for c, v in y_columns.items()})
+    counters = SharedArrays({'rows': numpy.zeros(len(shards), dtype=numpy.int64)})
+
+    try:
+        with ProcessPoolExecutor(processes) as executor:
+            futures = {}
+
+            for i, shard in enumerate(shards):
+                positions = numpy.concatenate([x_positions for x_positions, _ in shard])
+                local_groups = []
+                offset = 0
+
+                for x_positions, y_positions in shard:
+                    local_groups.append((numpy.arange(offset, offset + len(x_positions)), y_positions))
+                    offset += len(x_positions)
+
+                future = executor.submit(_best_candidates, i, local_groups, columns,
+                                         {c: v[positions] for c, v in x_columns.items()},
+                                         candidates.specs, counters.specs, len(positions), chunk_size, cutoff, keep)
+                futures[future] = positions
+
+            pending = set(futures)
+            rows_done = 0
+
+            while pending:
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    positions = futures[future]
+                    shard_best, shard_scores, shard_ambiguous, shard_comparisons, *shard_alternatives = future.result()
+
+                    best[positions] = shard_best
+                    best_scores[positions] = shard_scores
+                    ambiguous[positions] = shard_ambiguous
+                    alternatives[positions], alternative_scores[positions] = shard_alternatives
+                    comparisons += shard_comparisons
+
+                if update_func:
+                    rows = int(counters.arrays['rows'].sum())
+                    for _ in range(rows - rows_done):
+                        update_func()
+                    rows_done = rows
+    finally:
+        candidates.close()
+        counters.close()
+
+    return best, best_scores, ambiguous, comparisons, alternatives, alternative_scores
+
+
+def _best_candidates(shard, groups, columns, x_columns, y_specs, counter_specs, number_of_rows,
+                     chunk_size, cutoff, keep):
+
+    """Runs in a worker process, scores the rows of one shard"""
+
+    with attach(y_specs) as y_columns, attach(counter_specs) as counters:
+
+        def update():
+            counters['rows'][shard] += 1
+
+        # one thread per process, the processes already occupy the cores
+        return scoring.best_candidates(groups, columns, x_columns, y_columns, number_of_rows,
+                                       chunk_size=chunk_size, workers=1, cutoff=cutoff, update_func=update, keep=keep)
+
+
+def _shard(groups, number_of_shards):
+
+    """Splits the groups into shards with about the same number of pairs to score"""
+
+    cost = lambda x_positions, y_positions: len(x_positions) * max(1, len(y_positions))
+    target = max(1, sum(cost(*g) for g in groups) // number_of_shards)
+
+    pieces = []
+    for x_positions, y_positions in groups:
+        step = max(1, target // max(1, len(y_positions)))
+        for start in range(0, len(x_positions), step):
+            pieces.append((x_positions[start:start+step], y_positions))
+
+    # largest pieces first, each to the least loaded shard
+    pieces.sort(key=lambda p: cost(*p), reverse=True)
+    shards = [(0, i, []) for i in range(min(number_of_shards, len(pieces)))]
+
+    for piece in pieces:
+        load, i, shard = heapq.heappop(shards)
+        shard.append(piece)
+        heapq.heappush(shards, (load + cost(*piece), i, shard))
+
+    return [shard for _, _, shard in sorted(shards, key=lambda s: s[1])]
@@ -0,0 +1,288 @@
+# built-ins
+import threading
+import uuid
+import weakref
+
+# internal packages
+from .normalize import clean
+
+# external packages
+import pandas
+import pyarrow
+
+
+# worksheet key columns the candidate query is restricted by. Offices and districts are
+# left out: blocking compares them normalized and falls back to the state alone when
+# they differ, e.g. "U.S. Senate" and "US Senate", which an exact predicate would not
+PUSHDOWN_KEYS = {'state_id': 'state_id'}
+
+
+class Cancelled(Exception):
+
+    """Raised by fetch_frame when it is cancelled between two batches"""
+
+
+def signature(query_tool, filters=None):
+
+    """
+    Returns the statement and parameters of the query held by a vs_library QueryTool
+
+    Parameters
+    ----------
+    query_tool : vs_library.database.QueryTool
+        Holds the query
+
+    filters : dict, optional
+        If specified, the query is restricted to them, see restrict
+    """
+
+    query = query_tool.query
+    if not query:
+        return None, None
+
+    return restrict(query.statement, query.parameters, filters) if filters else (query.statement, query.parameters)
+
+
+def worksheet_filters(df, keys=PUSHDOWN_KEYS):
+
+    """
+    Returns the distinct key values of a worksheet, to restrict the candidates
+    queried to those the worksheet can match
+
+    A key is left out when a row of the worksheet has no value for it, as
+    such a row may match candidates with any value.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Rating worksheet
+
+    keys : dict, default=PUSHDOWN_KEYS
+        Worksheet column to the candidate column holding the same key
+
+    Returns
+    -------
+    dict
+        Candidate column to the sorted distinct values of its worksheet column,
+        stripped and lowercased
+    """
+
+    filters = {}
+
+    if df is None or df.empty:
+        return filters
+
+    for x_column, y_column in keys.items():
+        if x_column not in df.columns:
+            continue
+
+        values = {clean(v) for v in pandas.unique(df[x_column].astype(str))}
+        if '' not in values:
+            filters[y_column] = sorted(values)
+
+    return filters
+
+
+def restrict(statement, parameters, filters):
+
+    """
+    Restricts a query to the rows whose columns hold one of the values of filters,
+    so that only those rows are sent by the database
+
+    The statement is wrapped as a subquery, which PostgreSQL plans together with
+    its predicates. Values are compared stripped and lowercased.
+
+    Parameters
+    ----------
+    statement : str
+        SELECT statement of the query
+
+    parameters : tuple or dict, optional
+        Parameters of the statement, a dict when its placeholders are named
+
+    filters : dict
+        Column of the results to the values it may hold, see worksheet_filters
+
+    Returns
+    -------
+    (str, tuple or dict)
+        Statement and parameters of the restricted query
+    """
+
+    if not filters:
+        return statement, parameters
+
+    columns = list(filters)
+    statement = statement.strip().rstrip(';')
+
+    if isinstance(parameters, dict):
+        placeholders = [f'%(pushdown_{c})s' for c in columns]
+        parameters = dict(parameters, **{f'pushdown_{c}': list(filters[c]) for c in columns})
+    else:
+        placeholders = ['%s'] * len(columns)
+        parameters = tuple(parameters or ()) + tuple(list(filters[c]) for c in columns)
+
+    predicates = ' AND '.join(f'lower(trim(pushdown."{c}"::text)) = ANY({p})' for c, p in zip(columns, placeholders))
+    return f'SELECT * FROM ({statement}) AS pushdown WHERE {predicates}', parameters
+
+
+# identity of every connection asked for it, see identity
+_identities = weakref.WeakKeyDictionary()
+
+# lock of every connection queried, see lock
+_locks = weakref.WeakKeyDictionary()
+_locks_lock = threading.Lock()
+
+
+def connection(query_tool):
+
+    """Returns the database connection of a vs_library QueryTool"""
+
+    return query_tool.connection_adapter.connection
+
+
+def lock(connection):
+
+    """
+    Returns the lock of a connection, held by identity and fetch_frame while they
+    use it. A pg8000 connection is not safe to share between threads, e.g. the
+    candidates streamed in the background by RatingMatch and the queries of the menus.
+    """
+
+    with _locks_lock:
+        if connection not in _locks:
+            _locks[connection] = threading.Lock()
+
+        return _locks[connection]
+
+
+def identity(connection):
+
+    """
+    Returns the database, server address and port a connection is to, so that
+    results of the same query on different databases are told apart. It is
+    asked of the server once per connection.
+    """
+
+    if connection in _identities:
+        return _identities[connection]
+
+    with lock(connection):
+        if connection in _identities:
+            return _identities[connection]
+
+        cursor = connection.cursor()
+
+        try:
+            cursor.execute('SELECT current_database(), inet_server_addr()::text, inet_server_port()')
+            _identities[connection] = '/'.join(str(v) for v in cursor.fetchone())
+            connection.commit()
+
+        except Exception:
+            connection.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+        return _identities[connection]
+
+
+def fetch_frame(connection, statement, parameters=None, fetch_size=10000, cancelled=None):
+
+    """
+    Fetches the results of a query batch by batch through a server-side cursor
+
+    Every batch is turned into arrow arrays right away, so the rows fetched are
+    never held as python objects all at once.
+
+    Parameters
+    ----------
+    connection : pg8000.Connection
+        Connection to the database
+
+    statement : str
+        SELECT statement of the query
+
+    parameters : tuple or dict, optional
+        Parameters of the statement
+
+    fetch_size : int, default=10000
+        Number of rows fetched per batch
+
+    cancelled : threading.Event, optional
+        Checked before every batch, once set the cursor is closed and Cancelled raised
+
+    Returns
+    -------
+    pandas.DataFrame
+        Results of the query, with columns backed by arrow arrays
+    """
+
+    # the connection is held until every batch is fetched, a query of another thread waits for it
+    with lock(connection):
+        cursor = connection.cursor()
+        name = f'ratingtools_{uuid.uuid4().hex}'
+
+        try:
+            cursor.execute(f'DECLARE {name} NO SCROLL CURSOR FOR {statement}', parameters)
+
+            columns = None
+            chunks = None
+
+            while True:
+                if cancelled is not None and cancelled.is_set():
+                    raise Cancelled(statement)
+
+                cursor.execute(f'FETCH FORWARD {int(fetch_size)} FROM {name}')
+                rows = cursor.fetchall()
+
+                if columns is None:
+                    columns = [d[0] for d in cursor.description]
+                    chunks = [[] for _ in columns]
+
+                if not rows:
+                    break
+
+                for chunk, values in zip(chunks, zip(*rows)):
+                    chunk.append(pyarrow.array(values))
+
+                del rows
+
+            cursor.execute(f'CLOSE {name}')
+            connection.commit()
+
+        # a failed statement aborts the transaction, the connection is shared by every later query.
+        # Rolling back also closes the cursor of a cancelled query
+        except Exception:
+            connection.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+    return pandas.DataFrame({column: pandas.arrays.ArrowExtensionArray(_combine(chunk))
+                             for column, chunk in zip(columns, chunks)})
+
+
+def _type(chunk):
+
+    """
+    Returns the type every batch of a column can be cast to, as batches are typed
+    by their own values, e.g. decimal128(2, 1) and decimal128(5, 2) become decimal128(5, 2)
+    """
+
+    schemas = [pyarrow.schema([('column', a.type)]) for a in chunk]
+    if not schemas:
+        return pyarrow.null()
+
+    return pyarrow.unify_schemas(schemas, promote_options='permissive').field('column').type
+
+
+def _combine(chunk):
+
+    """Combines the batches of a column into one arrow array of a single type"""
+
+    arrow_type = _type(chunk)
+    return pyarrow.chunked_array([a if a.type == arrow_type else a.cast(arrow_type) for a in chunk],
+                                 type=arrow_type)
@@ -0,0 +1,114 @@
+# external packages
+import pandas
+import pyarrow
+
+
+# columns with a handful of distinct values, in worksheets and query results alike
+CATEGORICAL_COLUMNS = ('party', 'state', 'state_id', 'office', 'district', 'usesigrating', 'ratingformat_id')
+
+
+def categorize(df, columns=CATEGORICAL_COLUMNS):
+
+    """
+    Returns df with its low cardinality columns stored as categoricals: every
+    distinct value is stored once and rows hold integer codes
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Worksheet or query results
+
+    columns : tuple, default=CATEGORICAL_COLUMNS
+        Columns stored as categoricals, if df has them
+    """
+
+    columns = [c for c in columns if c in df.columns and not isinstance(df[c].dtype, pandas.CategoricalDtype)]
+    return df.astype({c: 'category' for c in columns}) if columns else df
+
+
+class ColumnarRecords:
+
+    """
+    A read-only sequence of records backed by the columns of a pandas.DataFrame
+
+    It can stand in for a list of record dictionaries, a dictionary is only built
+    for a record when it is accessed. The match engine reads whole columns
+    through `column` instead.
+
+    It also stands in for a dictionary of records by index: `keys` are the index
+    of the DataFrame it was made from, and `values` the records in the same order.
+    """
+
+    def __init__(self, df):
+
+        """
+        Parameters
+        ----------
+        df : pandas.DataFrame or pyarrow.Table
+            Holds the records, one per row. A pyarrow.Table is wrapped without
+            copying its columns
+        """
+
+        if isinstance(df, pyarrow.Table):
+            df = df.to_pandas(types_mapper=pandas.ArrowDtype)
+
+        self.index = df.index
+        self.df = df.reset_index(drop=True)
+
+    def __len__(self):
+        return len(self.df)
+
+    def __getitem__(self, i):
+        return {c: _value(v) for c, v in self.df.iloc[i].items()}
+
+    def __iter__(self):
+        return self.rows()
+
+    def __bool__(self):
+        return not self.df.empty
+
+    @property
+    def columns(self):
+        return list(self.df.columns)
+
+    def keys(self):
+        return list(self.index)
+
+    def values(self):
+        return self
+
+    def items(self):
+        return zip(self.keys(), self.rows())
+
+    def rows(self):
+
+        """Yields every record as a dictionary, reading each column only once"""
+
+        columns = self.columns
+        for values in zip(*(self.df[c].tolist() for c in columns)):
+            yield {c: _value(v) for c, v in zip(columns, values)}
+
+    def categories(self, name):
+
+        """Returns the integer codes and the categories of a categorical column, None for other columns"""
+
+        if name not in self.df.columns or not isinstance(self.df[name].dtype, pandas.CategoricalDtype):
+            return None
+
+        values = self.df[name].array
+        return values.codes, [_value(v) for v in values.categories.tolist()]
+
+    def column(self, name):
+
+        """Returns the values of a column, missing values and missing columns as empty strings"""
+
+        if name not in self.df.columns:
+            return [''] * len(self.df)
+
+        return ['' if _value(v) is None else v for v in self.df[name].tolist()]
+
+
+def _value(v):
+
+    # missing values of arrow backed and categorical columns
+    return None if v is pandas.NA or (isinstance(v, float) and v != v) else v
@@ -0,0 +1,185 @@
+# built-ins
+import json
+import os
+import urllib.error
+import urllib.request
+
+# internal packages
+from .records import ColumnarRecords
+
+# external packages
+import pandas
+
+
+# address the match daemon listens on unless told otherwise, see daemon.py
+DEFAULT_URL = 'http://127.0.0.1:8765'
+
+# environment variable holding the token shared by the daemon and its clients
+TOKEN_ENV = 'RATINGTOOLS_DAEMON_TOKEN'
+
+
+def settings(match_engine):
+
+    """
+    Returns the settings of a MatchEngine, in the form of the "match" settings of
+    a batch job, so that the match daemon can match with the same settings
+    """
+
+    config = match_engine.config
+
+    return {'columns_to_match': dict(config.columns_to_match),
+            'columns_to_get': list(config.columns_to_get),
+            'scorers': {c: config.scorers_by_column[c] for c in config.columns_to_match},
+            'thresholds': {c: config.thresholds_by_column[c] for c in config.columns_to_match},
+            'required_threshold': config.required_threshold,
+            'weights': dict(match_engine.weights),
+            'top_k': match_engine.top_k,
+            'blocking': dict(match_engine.blocking.keys) if match_engine.blocking else None,
+            'keep': match_engine.alternatives.keep if match_engine.alternatives is not None else None,
+            'min_score': match_engine.alternatives.min_score if match_engine.alternatives is not None else None}
+
+
+def dump_frame(df):
+
+    """Returns a pandas.DataFrame as a JSON serializable dict"""
+
+    return {'index': df.index.tolist(), 'columns': df.columns.tolist(),
+            'data': df.astype(object).where(df.notna(), None).values.tolist()}
+
+
+def load_frame(payload):
+
+    """Returns the pandas.DataFrame of a dict made by dump_frame"""
+
+    return pandas.DataFrame(payload['data'], index=payload['index'], columns=payload['columns'], dtype=object)
+
+
+def dumps(document):
+
+    """Returns a document as JSON bytes, numpy scalars as python scalars"""
+
+    return json.dumps(document, default=lambda o: o.item() if hasattr(o, 'item') else str(o)).encode('utf-8')
+
+
+class MatchDaemon:
+
+    """
+    Client of the match daemon, a local service that keeps candidates and their
+    indexes resident between sessions, see daemon.py
+
+    Every call returns None when the daemon cannot be reached or fails, so that
+    the caller can match locally instead.
+    """
+
+    def __init__(self, url=DEFAULT_URL, timeout=600, token=None):
+
+        """
+        Parameters
+        ----------
+        url : str, default=DEFAULT_URL
+            Address of the daemon
+
+        timeout : int, default=600
+            Seconds a match may take before the daemon is given up on
+
+        token : str, optional
+            Token the daemon was started with, defaults to the environment variable TOKEN_ENV
+        """
+
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.token = token if token else os.environ.get(TOKEN_ENV, '')
+
+    def status(self):
+
+        """Returns the candidates and engines the daemon holds, None if it is not running"""
+
+        return self._request('GET', '/status', timeout=0.5)
+
+    def available(self):
+        return self.status() is not None
+
+    def candidates(self, statement, parameters=None, filters=None):
+
+        """
+        Has the daemon load the candidates of a query, if it does not hold them already
+
+        Parameters
+        ----------
+        statement : str
+            SELECT statement of the candidate query
+
+        parameters : tuple or dict, optional
+            Parameters of the statement
+
+        filters : dict, optional
+            Values the query is restricted to, see query.restrict. The daemon
+            matches against the candidates of the unrestricted query instead when it holds them
+
+        Returns
+        -------
+        ColumnarRecords
+            No records, only the columns of the candidates, for the matcher to be
+            configured with. None if the daemon could not load them
+        """
+
+        response = self._request('POST', '/candidates', {'statement': statement, 'parameters': parameters,
+                                                         'filters': filters})
+        if response is None:
+            return None
+
+        return ColumnarRecords(pandas.DataFrame(columns=response['columns']))
+
+    def match(self, statement, parameters, match_settings, df, filters=None):
+
+        """
+        Matches a worksheet against the candidates of a query on the daemon
+
+        Parameters
+        ----------
+        statement : str
+            SELECT statement of the candidate query
+
+        parameters : tuple or dict, optional
+            Parameters of the statement
+
+        match_settings : dict
+            Settings of the match, see settings
+
+        df : pandas.DataFrame
+            Worksheet matched
+
+        filters : dict, optional
+            Values the query is restricted to, see candidates
+
+        Returns
+        -------
+        (dict, dict)
+            Matched records by the index of df and a summary of the match, as
+            returned by MatchEngine.match. None if the match failed
+        """
+
+        response = self._request('POST', '/match', {'query': {'statement': statement, 'parameters': parameters,
+                                                              'filters': filters},
+                                                    'match': match_settings, 'worksheet': dump_frame(df)})
+        if response is None:
+            return None
+
+        matched_df = load_frame(response['matched'])
+        records = {i: {c: v for c, v in zip(matched_df.columns, row)}
+                   for i, row in zip(matched_df.index, matched_df.itertuples(index=False))}
+
+        return records, response['match_info']
+
+    def _request(self, method, path, document=None, timeout=None):
+
+        request = urllib.request.Request(self.url + path, method=method,
+                                         data=dumps(document) if document is not None else None,
+                                         headers={'Content-Type': 'application/json',
+                                                  'Authorization': f'Bearer {self.token}'})
+
+        try:
+            with urllib.request.urlopen(request, timeout=timeout if timeout else self.timeout) as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, OSError, ValueError):
+            return None
@@ -0,0 +1,256 @@
+# external packages
+import numpy
+from rapidfuzz import fuzz, process
+
+
+# relative cost of the scorers, cheaper columns are scored first
+COSTS = {fuzz.ratio: 1,
+         fuzz.token_sort_ratio: 2,
+         fuzz.token_set_ratio: 2,
+         fuzz.partial_ratio: 3,
+         fuzz.partial_token_sort_ratio: 4,
+         fuzz.partial_token_set_ratio: 4,
+         fuzz.WRatio: 5}
+
+# when fewer pairs than this share are left, they are scored one by one instead of as a matrix
+SPARSE_SHARE = 0.25
+
+# allowance for float32 rounding when comparing bounds to scores
+TOLERANCE = 0.01
+
+
+def upper_bound(scorer, queries, choices):
+
+    """
+    Returns the highest score a scorer can give each pair of strings judging by
+    their lengths alone, None if the scorer has no such bound
+    """
+
+    if scorer is not fuzz.ratio and scorer is not fuzz.WRatio:
+        return None
+
+    x_lengths = numpy.fromiter(map(len, queries), dtype=numpy.float32, count=len(queries))
+    y_lengths = numpy.fromiter(map(len, choices), dtype=numpy.float32, count=len(choices))
+    shorter = numpy.minimum(x_lengths[:, None], y_lengths[None, :])
+    longer = numpy.maximum(x_lengths[:, None], y_lengths[None, :])
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        if scorer is fuzz.ratio:
+            return numpy.where(longer > 0, 200 * shorter / (shorter + longer), 100)
+
+        # WRatio scales partial scores down to 90 from a length ratio of 1.5 and to 60 past 8,
+        # where the plain ratio cannot exceed those either
+        length_ratio = longer / shorter
+        bound = numpy.where(length_ratio < 1.5, 100, numpy.where(length_ratio <= 8, 90, 60))
+        return numpy.where(shorter > 0, bound, 0).astype(numpy.float32)
+
+
+def score(columns, x_columns, y_columns, x_positions, y_positions, workers=-1, cutoff=0, prune_rows=1):
+
+    """
+    Returns the combined scores of worksheet rows against candidates
+
+    Columns are scored from the cheapest scorer to the most expensive one. Before
+    each column, pairs that can no longer reach the cutoff, pass a column
+    threshold, or beat the best pair of their row are dropped, using upper
+    bounds on the scores still to come. Expensive scorers then only run on the
+    pairs left. Every pair scoring at least the cutoff, and among the prune_rows
+    best of its row, gets the same score as if all pairs were scored.
+
+    Parameters
+    ----------
+    columns : list of tuple
+        (x_column, y_column, scorer, threshold, weight) of every column to match
+
+    x_columns : dict
+        Normalized worksheet columns as numpy arrays
+
+    y_columns : dict
+        Normalized candidate columns as numpy arrays
+
+    x_positions : numpy.ndarray
+        Positions of the worksheet rows to score
+
+    y_positions : numpy.ndarray
+        Positions of the candidates to score them against
+
+    workers : int, default=-1
+        Number of threads used by cdist
+
+    cutoff : int, default=0
+        Combined score below which a pair is of no interest
+
+    prune_rows : int, default=1
+        Pairs that cannot make it into the prune_rows best pairs of their row
+        are dropped, only those are then scored exactly. 0 drops none
+
+    Returns
+    -------
+    numpy.ndarray
+        Scores of shape (len(x_positions), len(y_positions)), pairs failing a column
+        threshold, dropped, or without any comparable column score -1
+    """
+
+    shape = (len(x_positions), len(y_positions))
+    total = numpy.zeros(shape, dtype=numpy.float32)
+    alive = numpy.ones(shape, dtype=bool)
+
+    # empty worksheet values do not count towards the combined score
+    presents = [x_columns[c[0]][x_positions].astype(bool) for c in columns]
+    weights = [present * numpy.float32(c[4]) for present, c in zip(presents, columns)]
+    weight_sum = sum(weights, numpy.zeros(len(x_positions), dtype=numpy.float32))
+
+    # weight of the columns not scored yet
+    remaining = weight_sum.copy()
+    row_best = None
+
+    order = sorted(range(len(columns)), key=lambda i: COSTS.get(columns[i][2], max(COSTS.values())))
+
+    for step, i in enumerate(order):
+        x_column, y_column, scorer, threshold, _ = columns[i]
+        present, column_weights = presents[i], weights[i]
+
+        if not present.any():
+            continue
+
+        queries = x_columns[x_column][x_positions]
+        choices = y_columns[y_column][y_positions]
+        bound = upper_bound(scorer, queries, choices)
+
+        if bound is not None and threshold:
+            alive &= (bound >= threshold) | ~present[:, None]
+
+        # highest combined score (times weight_sum) a pair can still reach
+        reach = total + (remaining - column_weights)[:, None] * 100
+        reach += column_weights[:, None] * (100 if bound is None else bound)
+
+        if cutoff:
+            alive &= reach >= (cutoff - TOLERANCE) * weight_sum[:, None]
+        if row_best is not None:
+            alive &= reach >= row_best[:, None] - TOLERANCE * weight_sum[:, None]
+
+        scoring = alive & present[:, None]
+
+        if scoring.sum() < SPARSE_SHARE * scoring.size:
+            rows, candidates = numpy.nonzero(scoring)
+            scores = numpy.zeros(shape, dtype=numpy.float32)
+            scores[rows, candidates] = process.cpdist(queries[rows], choices[candidates], scorer=scorer,
+                                                      score_cutoff=threshold, dtype=numpy.float32,
+                                                      workers=workers)
+        else:
+            scores = process.cdist(queries, choices, scorer=scorer, score_cutoff=threshold,
+                                   dtype=numpy.float32, workers=workers)
+
+        total += scores * column_weights[:, None]
+        remaining -= column_weights
+
+        if threshold:
+            alive &= (scores >= threshold) | ~present[:, None]
+
+        # a pair's total so far is what it will at least end with, once no threshold can still drop it
+        if prune_rows and not any(columns[j][3] for j in order[step+1:]):
+            row_best = nth_best(numpy.where(alive, total, -numpy.inf), prune_rows)
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        total /= weight_sum[:, None]
+
+    total[~alive | (weight_sum == 0)[:, None]] = -1
+    return total
+
+
+def nth_best(scores, n):
+
+    """Returns the n-th highest score of every row of a score matrix, -inf where a row has fewer"""
+
+    if scores.shape[1] < n:
+        return numpy.full(len(scores), -numpy.inf, dtype=scores.dtype)
+
+    return -numpy.partition(-scores, n - 1, axis=1)[:, n - 1]
+
+
+def top(scores, y_positions, keep):
+
+    """
+    Returns the positions and scores of the keep highest scoring candidates of
+    every row of a score matrix, best first, -1 where a row has fewer candidates
+    """
+
+    k = min(keep, scores.shape[1])
+    order = numpy.argsort(-scores, axis=1, kind='stable')[:, :k]
+    top_scores = numpy.take_along_axis(scores, order, axis=1)
+
+    positions = numpy.full((len(scores), keep), -1, dtype=numpy.int64)
+    top_scores_kept = numpy.full((len(scores), keep), -1, dtype=numpy.float32)
+
+    positions[:, :k] = numpy.where(top_scores >= 0, y_positions[order], -1)
+    top_scores_kept[:, :k] = top_scores
+
+    return positions, top_scores_kept
+
+
+def best_candidates(groups, columns, x_columns, y_columns, number_of_rows,
+                    chunk_size=2000000, workers=-1, cutoff=0, update_func=None, keep=0):
+
+    """
+    Finds the highest scoring candidate of every worksheet row
+
+    Parameters
+    ----------
+    groups : list of (numpy.ndarray, numpy.ndarray)
+        Positions of worksheet rows and the positions of candidates they are scored against
+
+    columns, x_columns, y_columns, workers, cutoff
+        See `score`
+
+    number_of_rows : int
+        Number of worksheet rows
+
+    chunk_size : int, default=2000000
+        Maximum number of pairs scored at once
+
+    update_func : function, optional
+        Called once for every worksheet row scored
+
+    keep : int, default=0
+        Number of best candidates kept per row. They are scored exactly, those
+        that cannot make it among them are dropped as with the best candidate
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray, int, numpy.ndarray, numpy.ndarray)
+        Position of the best candidate (-1 if none), its score, whether other
+        candidates tie with it, the number of pairs compared, and the positions
+        and scores of the keep best candidates of every row, see top
+    """
+
+    best = numpy.full(number_of_rows, -1, dtype=numpy.int64)
+    best_scores = numpy.zeros(number_of_rows, dtype=numpy.float32)
+    ambiguous = numpy.zeros(number_of_rows, dtype=bool)
+    alternatives = numpy.full((number_of_rows, keep), -1, dtype=numpy.int64)
+    alternative_scores = numpy.full((number_of_rows, keep), -1, dtype=numpy.float32)
+    comparisons = 0
+
+    for x_positions, y_positions in groups:
+        step = max(1, chunk_size // len(y_positions)) if len(y_positions) else max(1, len(x_positions))
+
+        for start in range(0, len(x_positions), step):
+            positions = x_positions[start:start+step]
+
+            if len(y_positions):
+                scores = score(columns, x_columns, y_columns, positions, y_positions, workers, cutoff,
+                               prune_rows=max(1, keep))
+                best[positions] = y_positions[scores.argmax(axis=1)]
+                best_scores[positions] = scores.max(axis=1)
+                ambiguous[positions] = (scores == best_scores[positions, None]).sum(axis=1) > 1
+                comparisons += scores.size
+
+                # pairs below the cutoff are left when not dropped, they are not kept
+                if keep:
+                    alternatives[positions], alternative_scores[positions] = top(
+                        numpy.where(scores >= cutoff, scores, -1), y_positions, keep)
+
+            if update_func:
+                for _ in range(len(positions)):
+                    update_func()
+
+    return best, best_scores, ambiguous, comparisons, alternatives, alternative_scores
@@ -0,0 +1,146 @@
+# built-ins
+import os
+
+# internal packages
+from .engine import dedup_ratio
+from .records import ColumnarRecords
+
+# external packages
+import pandas
+
+
+def read_chunks(filepath, chunksize=5000):
+
+    """
+    Reads a csv or excel worksheet in chunks of rows, every column as str
+
+    Parameters
+    ----------
+    filepath : str
+        Path of the worksheet
+
+    chunksize : int, default=5000
+        Number of rows per chunk
+
+    Yields
+    ------
+    pandas.DataFrame
+        The rows of a chunk, with missing values as empty strings
+    """
+
+    if os.path.splitext(filepath)[1].lower() == '.csv':
+        with pandas.read_csv(filepath, dtype=str, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield chunk.fillna('')
+        return
+
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(c) for c in next(rows, [])]
+        chunk = []
+
+        for row in rows:
+            chunk.append(['' if v is None else str(v) for v in row])
+
+            if len(chunk) == chunksize:
+                yield pandas.DataFrame(chunk, columns=header)
+                chunk = []
+
+        if chunk:
+            yield pandas.DataFrame(chunk, columns=header)
+
+    finally:
+        workbook.close()
+
+
+def read_header(filepath):
+
+    """Returns the column names of a csv or excel worksheet without reading its rows"""
+
+    if os.path.splitext(filepath)[1].lower() == '.csv':
+        return list(pandas.read_csv(filepath, dtype=str, nrows=0).columns)
+
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(filepath, read_only=True)
+
+    try:
+        return [str(c) for c in next(workbook.active.iter_rows(values_only=True), [])]
+    finally:
+        workbook.close()
+
+
+def match_chunks(match_engine, filepaths, output_path, chunksize=5000, update_func=None):
+
+    """
+    Matches worksheets chunk by chunk and appends the results to a csv file
+
+    Only one chunk of worksheet rows and its results are in memory at a time.
+    The candidates are set on match_engine beforehand and stay normalized,
+    blocked and indexed across chunks, as does its configuration. Worksheets
+    without any row still give a file, holding only the header.
+
+    Parameters
+    ----------
+    match_engine : engine.MatchEngine
+        Holds the candidates and the configuration of the match
+
+    filepaths : list of str
+        Worksheets to match, rows are numbered across them as if concatenated
+
+    output_path : str
+        csv file the matched rows are written to, replaced if it exists
+
+    chunksize : int, default=5000
+        Number of worksheet rows matched at once
+
+    update_func : function, optional
+        Called once for every worksheet row matched
+
+    Returns
+    -------
+    dict
+        match_info of all chunks combined
+    """
+
+    columns = []
+    for filepath in filepaths:
+        columns.extend(c for c in read_header(filepath) if c not in columns)
+
+    # every chunk is written with the same columns, whether or not any of its rows matched
+    columns_to_get = list(match_engine.config.columns_to_get)
+    output_columns = list(dict.fromkeys(columns + columns_to_get + ['match_score', 'match_status']))
+    pandas.DataFrame(columns=output_columns).to_csv(output_path, index=False)
+
+    match_info = {}
+    offset = 0
+
+    for filepath in filepaths:
+        for chunk in read_chunks(filepath, chunksize):
+            if not len(chunk):
+                continue
+
+            chunk = chunk.reindex(columns=columns, fill_value='')
+            chunk.index = pandas.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+
+            match_engine.x_records = ColumnarRecords(chunk)
+            records, chunk_info = match_engine.match(update_func=update_func)
+            df = pandas.DataFrame.from_dict(records, orient='index')
+            df.reindex(columns=output_columns).to_csv(output_path, mode='a', header=False, index=False)
+
+            # every chunk is matched against the same candidates, everything else adds up
+            for k, v in chunk_info.items():
+                if k == 'Number of Candidates':
+                    match_info[k] = v
+                elif k != 'Dedup Ratio':
+                    match_info[k] = match_info.get(k, 0) + v
+
+    if 'Distinct Rows' in match_info:
+        match_info['Dedup Ratio'] = dedup_ratio(match_info['Number of Rows'], match_info['Distinct Rows'])
+
+    return match_info
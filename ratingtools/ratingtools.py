@@ -1,71 +1,195 @@
 #!/usr/bin/env python3
 
 # built-ins
+import argparse
 import os
+import sys
 
-# internal packages
+# internal packages, subsystems are imported once chosen, so that the menus come up quickly
 import ratingtools_cli
-from match import match, match_cli
-from harvest import harvest, harvest_cli
 
 # external packages
-from vs_library import database, cli
-from vs_library.database import database_cli
-from vs_library.tools import pandas_extension
+from vs_library import cli
 
-from record_matcher import matcher
-from rapidfuzz import fuzz
 
+def main(argv=None):
 
-def main():
+    parser = argparse.ArgumentParser(description="Ratings-Candidate matching tool for Vote Smart SIGs")
+    parser.add_argument('--profile', action='store_true',
+                        help="Record the time and memory of every stage and show them with the match results")
+    parser.add_argument('--trace', metavar='FILE', default=None,
+                        help="Also write the stages to FILE as JSON, viewable in chrome://tracing; implies --profile")
+    parser.add_argument('--daemon', metavar='URL', default='http://127.0.0.1:8765',
+                        help="Address of the match daemon, matches are made by it whenever it is running. "
+                             "Its token is read from RATINGTOOLS_DAEMON_TOKEN")
+    parser.add_argument('--no-daemon', action='store_true', help="Always query and match in this process")
+    parser.add_argument('--top-k', metavar='K', type=int, default=None,
+                        help="Score every worksheet row against its K most similar candidates only, "
+                             "faster on large queries but approximate")
+    subparsers = parser.add_subparsers(dest='command')
+
+    batch_parser = subparsers.add_parser('batch', help="Run the jobs of a batch file without the menus")
+    batch_parser.add_argument('batch_file', help="JSON file describing the jobs, see batch.load_jobs")
+    batch_parser.add_argument('--concurrency', type=int, default=None,
+                              help="Number of jobs run at once, defaults to the number of cores")
+
+    serve_parser = subparsers.add_parser('serve', help="Run the match daemon, which keeps candidates and their "
+                                                       "indexes in memory for the sessions matching against them")
+    serve_parser.add_argument('config_file', help="JSON file with the connection and the queries to preload, "
+                                                  "see daemon.load_config. Clients must hold the token it names")
+    serve_parser.add_argument('--host', default='127.0.0.1', help="Address listened on")
+    serve_parser.add_argument('--port', type=int, default=8765, help="Port listened on")
+    serve_parser.add_argument('--processes', type=int, default=None,
+                              help="Number of processes large matches are sharded across, defaults to the number of cores")
+
+    benchmark_parser = subparsers.add_parser('benchmark', help="Benchmark import, matching, harvest and export "
+                                                               "on synthetic worksheets and candidates")
+    benchmark_parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000],
+                                  help="Numbers of candidates to benchmark at, worksheets are a tenth of them")
+    benchmark_parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic data")
+    benchmark_parser.add_argument('--processes', type=int, default=1, help="Number of processes matching")
+    benchmark_parser.add_argument('--top-k', metavar='K', type=int, default=None,
+                                  help="Also benchmark matching with the candidate index, scoring K candidates per row")
+    benchmark_parser.add_argument('--output', metavar='FILE', default=None, help="Write the results to FILE as JSON")
+    benchmark_parser.add_argument('--baseline', metavar='FILE', default=None,
+                                  help="Results of an earlier run, exits with 1 if this run regressed from them")
+    benchmark_parser.add_argument('--startup', action='store_true',
+                                  help="Only benchmark how long the menus take to import, exits with 1 over --budget")
+    benchmark_parser.add_argument('--budget', type=float, default=None,
+                                  help="Seconds the menus may take to import, see benchmark.startup.IMPORT_BUDGET")
+
+    args = parser.parse_args(argv)
+
+    profile = args.profile or bool(args.trace)
+
+    if args.command == 'batch':
+        import batch
+        return batch.run(args.batch_file, args.concurrency, profile=profile, trace_path=args.trace)
+
+    if args.command == 'serve':
+        import daemon
+        return daemon.serve(args.config_file, host=args.host, port=args.port, processes=args.processes)
+
+    if args.command == 'benchmark':
+        import benchmark
+
+        if args.startup:
+            return benchmark.startup.main(budget=args.budget, output=args.output)
+
+        return benchmark.scenarios.main(args.scales, seed=args.seed, processes=args.processes, top_k=args.top_k,
+                                        output=args.output, baseline=args.baseline)
+
+    from match import instrument
+
+    interactive(instrument.Instrument(enabled=profile, trace_path=args.trace),
+                daemon_url=None if args.no_daemon else args.daemon, top_k=args.top_k)
+    return 0
+
+
+def interactive(session_instrument=None, daemon_url=None, top_k=None):
+
+    # called on exit, however the session ends, so that nothing left running in the background holds it up
+    on_exit = []
+
+    intro_bundle = ratingtools_cli.IntroToRatingTools(lambda: match_bundle(session_instrument, daemon_url, top_k,
+                                                                           on_exit),
+                                                      lambda: harvest_bundle(session_instrument))
+
+    cli_engine = cli.Engine(intro_bundle.entry_node)
+
+    try:
+        cli_engine.run(loop=True)
+    finally:
+        for close in on_exit:
+            close()
+
+
+def match_bundle(session_instrument=None, daemon_url=None, top_k=None, on_exit=None):
+
+    """
+    Loads the matching and database subsystems, and returns the first bundle of ratings match
+
+    When daemon_url is given, worksheets are matched by the match daemon there whenever it is running.
+    With top_k, every row is only scored against its top_k most similar candidates, see engine.MatchEngine.
+    Functions releasing what the bundle runs in the background are added to on_exit.
+    """
+
+    from match import match, match_cli, engine, normalize, blocking, cache, journal, remote, alternatives
+    from vs_library import database
+    from record_matcher import matcher
 
     # SOURCE
-    rating_harvest = harvest.RatingHarvest()
-    rating_worksheet_match = match.RatingWorksheet()
-    rating_worksheet_harvest = match.RatingWorksheet()
+    rating_worksheet_match = match.RatingWorksheet(cache_directory=os.path.join(os.path.dirname(__file__), 'worksheets'),
+                                                   compact=True)
     connection_manager = database.ConnectionManager(os.path.dirname(__file__))
     connection_adapter = database.PostgreSQL(None)
     query_tool = database.QueryTool(connection_adapter)
-    pandas_matcher = pandas_extension.PandasMatcher()
+    candidate_cache = cache.CandidateCache(os.path.join(os.path.dirname(__file__), 'candidates'))
     record_matcher = matcher.RecordMatcher()
 
-    clean = lambda x: str(x).strip().lower()
-
-    record_matcher.config.scorers_by_column.SCORERS.update(
-                                        {'Base': lambda x,y: fuzz.ratio(clean(x), clean(y)),
-                                      'Partial': lambda x,y: fuzz.partial_ratio(clean(x), clean(y)),
-                                    'Token Set': lambda x,y: fuzz.token_set_ratio(clean(x), clean(y)),
-                            'Partial Token Set': lambda x,y: fuzz.partial_token_set_ratio(clean(x), clean(y)),
-                                   'Token Sort': lambda x,y: fuzz.token_sort_ratio(clean(x), clean(y)),
-                           'Partial Token Sort': lambda x,y: fuzz.partial_token_sort_ratio(clean(x), clean(y)),
-                                     'Weighted': lambda x,y: fuzz.WRatio(clean(x), clean(y)),
-                                        })
+    # values are normalized once by the match engine, scorers receive them cleaned
+    record_matcher.config.scorers_by_column.SCORERS.update(engine.SCORERS)
     record_matcher.config.scorers_by_column.default = 'Weighted'
-
+    normalizer, normalizers_by_column = normalize.worksheet_normalizers()
+    match_engine = engine.MatchEngine(record_matcher, normalizer=normalizer,
+                                      normalizers_by_column=normalizers_by_column,
+                                      blocking=blocking.Blocking(blocking.WORKSHEET_KEYS),
+                                      processes=os.cpu_count(),
+                                      journal=journal.MatchJournal(
+                                          os.path.join(os.path.dirname(__file__), 'checkpoints', 'journal.tsv')),
+                                      top_k=top_k,
+                                      index_directory=os.path.join(os.path.dirname(__file__), 'indexes'),
+                                      instrument=session_instrument,
+                                      alternatives=alternatives.Alternatives(
+                                          keep=5, path=os.path.join(os.path.dirname(__file__), 'checkpoints',
+                                                                    'alternatives.npz')))
 
     # INTERFACE / CONTROLLER
-    import_rating_worksheet_match = match_cli.ImportRatingWorksheet(rating_worksheet_match)
+    import_rating_worksheet_match = match_cli.ImportRatingWorksheet(rating_worksheet_match, instrument=session_instrument)
     analyze_rating_worksheet = match_cli.AnalyzeRatingWorksheet(rating_worksheet_match, parent=import_rating_worksheet_match)
     database_connection = match_cli.DatabaseConnection(connection_manager, connection_adapter, parent=analyze_rating_worksheet)
-    query_forms = match_cli.SelectQueryForms(query_tool, parent=database_connection)
-    execute_query = database_cli.QueryExecution(query_tool, query_form=query_forms, parent=query_forms)
-    rating_match = match_cli.RatingMatch(rating_worksheet_match, query_tool, record_matcher, query_forms=query_forms, parent=execute_query)
+    query_forms = match_cli.SelectQueryForms(query_tool, rating_worksheet=rating_worksheet_match,
+                                             parent=database_connection)
+    execute_query = match_cli.CachedQueryExecution(query_tool, candidate_cache, query_form=query_forms,
+                                                   stream=True, parent=query_forms)
+    rating_match = match_cli.RatingMatch(rating_worksheet_match, query_tool, match_engine, query_forms=query_forms,
+                                         candidate_cache=candidate_cache, fetch_size=10000,
+                                         instrument=session_instrument,
+                                         daemon=remote.MatchDaemon(daemon_url) if daemon_url else None,
+                                         parent=execute_query)
 
-    import_rating_worksheet_harvest = match_cli.ImportRatingWorksheet(rating_worksheet_harvest)
-    generate_harvest = harvest_cli.GenerateHarvest(rating_harvest, rating_worksheet_harvest, parent=import_rating_worksheet_harvest)
+    # CONFIGURATIONS
+    execute_query.on_ready = rating_match.prefetch
+    if on_exit is not None:
+        on_exit.append(rating_match.close)
+    import_rating_worksheet_match.entry_node.clear_screen = True
+    analyze_rating_worksheet.entry_node.clear_screen = True
+    execute_query.entry_node.clear_screen = True
+
+    return import_rating_worksheet_match
+
+
+def harvest_bundle(session_instrument=None):
 
-    intro_bundle = ratingtools_cli.IntroToRatingTools(import_rating_worksheet_match, import_rating_worksheet_harvest)
+    """Loads the harvest subsystem, and returns the first bundle of generating a harvest file"""
+
+    from match import match, match_cli
+    from harvest import harvest, harvest_cli
+
+    # SOURCE
+    rating_harvest = harvest.RatingHarvest()
+    rating_worksheet_harvest = match.RatingWorksheet(cache_directory=os.path.join(os.path.dirname(__file__), 'worksheets'))
+
+    # INTERFACE / CONTROLLER
+    import_rating_worksheet_harvest = match_cli.ImportRatingWorksheet(rating_worksheet_harvest, instrument=session_instrument)
+    generate_harvest = harvest_cli.GenerateHarvest(rating_harvest, rating_worksheet_harvest, parent=import_rating_worksheet_harvest)
 
     # CONFIGURATIONS
-    import_rating_worksheet_match.entry_node.clear_screen = True
     import_rating_worksheet_harvest.entry_node.clear_screen = True
-    analyze_rating_worksheet.entry_node.clear_screen = True
     generate_harvest.entry_node.clear_screen = True
-    execute_query.entry_node.clear_screen = True
 
-    engine = cli.Engine(intro_bundle.entry_node)
-    engine.run(loop=True)
+    return import_rating_worksheet_harvest
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
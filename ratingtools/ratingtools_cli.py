@@ -13,11 +13,14 @@ class IntroToRatingTools(NodeBundle):
         """
         Parameters
         ----------
-        rm_bundle : NodeBundle
+        rm_bundle : NodeBundle or function
             First bundle that leads to ratings match
 
-        rh_bundle : NodeBundle
+        rh_bundle : NodeBundle or function
             First bundle that leads to generating harvest file
+
+        A function is called the first time its feature is chosen and returns
+        the bundle, so that a feature is only loaded once it is used.
         """
 
         name = 'intro-to-rating-tools'
@@ -36,20 +39,29 @@ class IntroToRatingTools(NodeBundle):
                              show_hideout=True, clear_screen=True)
         self.__exit_node = DecoyNode(name=f'{name}_last-node', parent=self.__node_0)
 
-        self.__bundle_0 = rm_bundle
-        self.__bundle_1 = rh_bundle
+        self.__bundles = [None, None]
 
-        self.__node_0.adopt(self.__bundle_0.entry_node)
-        self.__node_0.adopt(self.__bundle_1.entry_node)
+        for i, bundle in enumerate((rm_bundle, rh_bundle)):
+            if isinstance(bundle, NodeBundle):
+                self._adopt_bundle(i, bundle)
+            else:
+                self.__bundles[i] = bundle
 
         # CONFIGURATIONS
-        self.__bundle_0.entry_node.clear_screen = True
-        self.__bundle_1.entry_node.clear_screen = True
-
         self.__prompt_0.options = {
-            '1': Command(lambda: self.__node_0.set_next(self.__bundle_0.entry_node), value="Match Ratings"),
-            '2': Command(lambda: self.__node_0.set_next(self.__bundle_1.entry_node), 
-                                     value="Generate Harvest File from existing worksheet")
+            '1': Command(lambda: self._choose(0), value="Match Ratings"),
+            '2': Command(lambda: self._choose(1), value="Generate Harvest File from existing worksheet")
             }
 
         super().__init__(self.__entry_node, self.__exit_node, name=name, parent=parent)
+
+    def _adopt_bundle(self, i, bundle):
+        self.__bundles[i] = bundle
+        self.__node_0.adopt(bundle.entry_node)
+        bundle.entry_node.clear_screen = True
+
+    def _choose(self, i):
+        if not isinstance(self.__bundles[i], NodeBundle):
+            self._adopt_bundle(i, self.__bundles[i]())
+
+        self.__node_0.set_next(self.__bundles[i].entry_node)
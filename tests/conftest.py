@@ -0,0 +1,7 @@
+# built-ins
+import os
+import sys
+
+
+# the subpackages are imported as the scripts in ratingtools/ import them, e.g. `from match import scoring`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ratingtools'))
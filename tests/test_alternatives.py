@@ -0,0 +1,64 @@
+# built-ins
+import os
+
+# internal packages
+from match import alternatives, engine
+from match.records import ColumnarRecords
+
+# external packages
+import pandas
+import pytest
+
+
+CANDIDATES = pandas.DataFrame({'candidate_id': ['1', '2', '3'],
+                               'lastname': ['smith', 'smyth', 'smithe'],
+                               'firstname': ['john', 'john', 'jon']})
+
+WORKSHEET = pandas.DataFrame({'lastname': ['smith'], 'firstname': ['john']})
+
+
+def match_engine(path, candidates=CANDIDATES):
+
+    config = engine.MatchConfig({'lastname': 'lastname', 'firstname': 'firstname'}, ['candidate_id'])
+    match_engine = engine.MatchEngine(engine.Matcher(config),
+                                      alternatives=alternatives.Alternatives(keep=3, min_score=0, path=path))
+    match_engine.y_records = ColumnarRecords(candidates)
+    match_engine.x_records = ColumnarRecords(WORKSHEET)
+
+    return match_engine
+
+
+def test_choice_survives_a_new_session(tmp_path):
+
+    path = str(tmp_path / 'alternatives.npz')
+    first = match_engine(path)
+    records, _ = first.match()
+    assert records[0]['candidate_id'] == '1'
+
+    first.choose(0, 2)
+
+    # nothing is scored again in the second session, the choice is read back
+    second = match_engine(path)
+    records, match_info = second.match()
+
+    assert match_info['Rows Rescored'] == 0
+    assert records[0]['candidate_id'] == second.alternatives_frame()['candidate_id'][2]
+
+
+def test_choose_rejects_ranks_out_of_range(tmp_path):
+
+    kept = match_engine(str(tmp_path / 'alternatives.npz'))
+    kept.match()
+
+    for rank in (-1, 3, 7):
+        with pytest.raises(ValueError):
+            kept.choose(0, rank)
+
+
+def test_every_version_has_a_sidecar_of_its_own(tmp_path):
+
+    path = str(tmp_path / 'alternatives.npz')
+    match_engine(path).match()
+    match_engine(path, CANDIDATES.iloc[:2]).match()
+
+    assert len([f for f in os.listdir(tmp_path) if f.startswith('alternatives-')]) == 2
@@ -0,0 +1,89 @@
+# built-ins
+import json
+
+# internal packages
+from match import instrument
+from match.records import ColumnarRecords
+
+# external packages
+import pandas
+import pytest
+
+# batch reads worksheets and writes harvests through vs_library
+pytest.importorskip('vs_library')
+import batch
+
+
+CANDIDATES = pandas.DataFrame({'candidate_id': ['1', '2', '3'],
+                               'lastname': ['smith', 'doe', 'jones'],
+                               'firstname': ['john', 'jane', 'mary'],
+                               'state_id': ['NY', 'CA', 'TX']})
+
+SETTINGS = {'columns_to_match': {'lastname': 'lastname', 'firstname': 'firstname'},
+            'columns_to_get': ['candidate_id'], 'blocking': {'state_id': 'state_id'}}
+
+
+class Source:
+
+    """Stands in for batch.CandidateSource, every query gives the same candidates"""
+
+    def __init__(self):
+        self.queries = []
+
+    def get(self, statement, parameters=None):
+
+        self.queries.append((statement, parameters))
+        return ColumnarRecords(CANDIDATES)
+
+
+def write_worksheet(path):
+
+    pandas.DataFrame({'lastname': ['zzz', 'qqq', 'xxx', 'smith', 'doe', 'jones'],
+                      'firstname': ['a', 'b', 'c', 'john', 'jane', 'mary'],
+                      'state_id': ['NY', 'CA', 'TX', 'NY', 'CA', 'TX']}).to_csv(path, index=False)
+
+    return str(path)
+
+
+def test_stream_job_writes_every_chunk(tmp_path):
+
+    job = {'worksheets': [write_worksheet(tmp_path / 'worksheet.csv')],
+           'query': {'statement': 'SELECT * FROM candidates'}, 'match': SETTINGS,
+           'output': {'matched': str(tmp_path / 'matched.csv')}, 'stream': {'chunksize': 3}}
+
+    result = batch.run_job(job, instrument.Instrument(), Source())
+    output = pandas.read_csv(tmp_path / 'matched.csv', dtype=str, keep_default_na=False)
+
+    assert result['success'], result.get('message')
+    assert result['match_info']['Matched'] == 3
+    assert output['candidate_id'].tolist() == ['', '', '', '1', '2', '3']
+
+
+def test_stream_job_rejects_outputs_it_cannot_write(tmp_path):
+
+    job = {'worksheets': [write_worksheet(tmp_path / 'worksheet.csv')],
+           'query': {'statement': 'SELECT * FROM candidates'}, 'match': SETTINGS, 'stream': True,
+           'output': {'matched': str(tmp_path / 'matched.parquet')}}
+
+    result = batch.run_job(job, instrument.Instrument(), Source())
+
+    assert not result['success'] and 'CSV' in result['message']
+
+
+@pytest.mark.parametrize('concurrency, number_of_jobs, expected', [(None, 1, 8), (4, 8, 2), (8, 8, 1), (16, 2, 4)])
+def test_jobs_split_the_cores(tmp_path, monkeypatch, concurrency, number_of_jobs, expected):
+
+    class Connection:
+        def close(self):
+            pass
+
+    shares = []
+    monkeypatch.setattr(batch.os, 'cpu_count', lambda: 8)
+    monkeypatch.setattr(batch, 'connect', lambda settings: Connection())
+    monkeypatch.setattr(batch, 'run_job', lambda job, job_instrument, source, workers=-1:
+                        shares.append(workers) or {'success': True})
+
+    (tmp_path / 'batch.json').write_text(json.dumps({'connection': {}, 'jobs': [{}] * number_of_jobs}))
+
+    assert batch.run(str(tmp_path / 'batch.json'), concurrency=concurrency) == 0
+    assert shares == [expected] * number_of_jobs
@@ -0,0 +1,34 @@
+# external packages
+import pytest
+
+# the benchmark reads worksheets and writes harvests through vs_library
+pytest.importorskip('vs_library')
+from benchmark import scenarios
+
+
+def stages(measurements):
+    return [m['scenario'] for m in measurements]
+
+
+def test_index_is_an_opt_in_scenario(tmp_path):
+
+    measurements, scale_accuracy = scenarios.run_scale(1000, str(tmp_path))
+
+    assert 'match' in stages(measurements) and 'match index' not in stages(measurements)
+    assert set(scale_accuracy) == {'scale', 'precision', 'recall'}
+
+    measurements, scale_accuracy = scenarios.run_scale(1000, str(tmp_path), top_k=20)
+
+    assert 'match index' in stages(measurements)
+    assert {'index_precision', 'index_recall'} <= set(scale_accuracy)
+
+
+def test_index_accuracy_is_compared_when_both_runs_have_it():
+
+    baseline = {'measurements': [], 'accuracy': [{'scale': 1000, 'precision': 0.9, 'recall': 0.9,
+                                                  'index_precision': 0.9, 'index_recall': 0.9}]}
+    exhaustive = {'measurements': [], 'accuracy': [{'scale': 1000, 'precision': 0.9, 'recall': 0.9}]}
+    indexed = {'measurements': [], 'accuracy': [dict(baseline['accuracy'][0], index_recall=0.5)]}
+
+    assert scenarios.compare(exhaustive, baseline) == []
+    assert scenarios.compare(indexed, baseline) == ['index_recall at 1,000: 0.9000 to 0.5000']
@@ -0,0 +1,75 @@
+# built-ins
+import random
+
+# internal packages
+from match import blocking
+
+# external packages
+import numpy
+import pytest
+
+
+KEYS = {'state_id': 'state_id', 'office': 'office', 'district': 'district'}
+
+
+def naive(keys, levels, x_columns, y_columns, number_of_rows, number_of_candidates):
+
+    """Assigns every worksheet row on its own to the candidates of the first level holding its keys"""
+
+    assigned = {}
+
+    for position in range(number_of_rows):
+        for level in levels:
+            if not level:
+                candidates = tuple(range(number_of_candidates))
+            elif any(x_columns[c][position] == '' for c in level):
+                continue
+            else:
+                candidates = tuple(i for i in range(number_of_candidates)
+                                   if all(y_columns[keys[c]][i] == x_columns[c][position] for c in level))
+
+            if candidates:
+                assigned[position] = candidates
+                break
+        else:
+            assigned[position] = ()
+
+    return assigned
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_groups_match_naive(seed):
+
+    rng = random.Random(seed)
+    values = ['', 'a', 'b', 'c', 'd']
+    number_of_rows, number_of_candidates = rng.randint(0, 30), rng.randint(0, 30)
+
+    x_columns = {c: numpy.array([rng.choice(values) for _ in range(number_of_rows)], dtype=object) for c in KEYS}
+    y_columns = {c: numpy.array([rng.choice(values[:rng.randint(1, 5)]) for _ in range(number_of_candidates)],
+                                dtype=object) for c in KEYS.values()}
+    levels = None if seed % 2 else [('state_id', 'office', 'district'), ('district', 'state_id'), ('office',), ()]
+
+    keys = blocking.Blocking(KEYS, levels)
+    groups = keys.groups(x_columns, keys.index(y_columns, number_of_candidates), number_of_rows)
+
+    assigned = {}
+    for x_positions, y_positions in groups:
+        for position in x_positions:
+            assert position not in assigned
+            assigned[int(position)] = tuple(int(p) for p in y_positions)
+
+    assert assigned == naive(KEYS, keys.levels, x_columns, y_columns, number_of_rows, number_of_candidates)
+
+
+def test_index_is_reused_across_worksheets():
+
+    y_columns = {'state_id': numpy.array(['ny', 'ca', 'ny', ''], dtype=object)}
+    keys = blocking.Blocking({'state_id': 'state_id'})
+    block_index = keys.index(y_columns, 4)
+
+    for worksheet in (['ny', 'tx'], ['ca', '', 'ca']):
+        x_columns = {'state_id': numpy.array(worksheet, dtype=object)}
+        groups = keys.groups(x_columns, block_index, len(worksheet))
+        assigned = {int(p): [int(c) for c in y_positions] for x_positions, y_positions in groups for p in x_positions}
+
+        assert assigned == {i: {'ny': [0, 2], 'ca': [1]}.get(v, [0, 1, 2, 3]) for i, v in enumerate(worksheet)}
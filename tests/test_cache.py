@@ -0,0 +1,26 @@
+# internal packages
+from match import cache
+
+
+def test_cached_records_keep_integers_with_missing_values(tmp_path):
+
+    candidate_cache = cache.CandidateCache(str(tmp_path))
+    records = [{'candidate_id': 123, 'office_id': None, 'lastname': 'Smith'},
+               {'candidate_id': 456, 'office_id': 7, 'lastname': None}]
+
+    key = candidate_cache.key('SELECT * FROM candidates', None, 'votesmart/10.0.0.1/5432')
+    candidate_cache.put(key, cache.records_frame(records))
+    df = candidate_cache.get(key)
+
+    assert df['candidate_id'].tolist() == [123, 456]
+    assert df['office_id'].tolist()[1] == 7
+    assert df['lastname'].tolist()[0] == 'Smith'
+
+
+def test_keys_tell_databases_apart():
+
+    statement = 'SELECT * FROM candidates'
+
+    assert cache.CandidateCache.key(statement, None, 'votesmart/10.0.0.1/5432') \
+        != cache.CandidateCache.key(statement, None, 'votesmart/10.0.0.2/5432')
+    assert cache.CandidateCache.key(statement) == cache.CandidateCache.key(statement, None, None)
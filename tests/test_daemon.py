@@ -0,0 +1,107 @@
+# built-ins
+import threading
+from http.server import ThreadingHTTPServer
+
+# internal packages
+from match import remote
+from match.records import ColumnarRecords
+
+# external packages
+import pandas
+import pytest
+
+# the daemon builds its engines as batch does, which reads worksheets through vs_library
+pytest.importorskip('vs_library')
+import batch
+import daemon
+
+
+CANDIDATES = pandas.DataFrame({'candidate_id': ['1', '2', '3'],
+                               'lastname': ['smith', 'doe', 'jones'],
+                               'firstname': ['john', 'jane', 'mary'],
+                               'state_id': ['NY', 'CA', 'TX']})
+
+WORKSHEET = pandas.DataFrame({'lastname': ['Smith', 'Jones', 'Zzz'], 'firstname': ['John', 'Mary', 'Q'],
+                              'state_id': ['NY', 'TX', 'CA']})
+
+SETTINGS = {'columns_to_match': {'lastname': 'lastname', 'firstname': 'firstname'},
+            'columns_to_get': ['candidate_id'], 'blocking': {'state_id': 'state_id'}}
+
+
+class Source:
+
+    """Stands in for batch.CandidateSource, keeping the candidates of every query it runs"""
+
+    def __init__(self):
+        self.queries = []
+        self.candidates = {}
+
+    def get(self, statement, parameters=None):
+
+        if statement not in self.candidates:
+            self.queries.append(statement)
+            self.candidates[statement] = ColumnarRecords(CANDIDATES)
+
+        return self.candidates[statement]
+
+    def drop(self, statement, parameters=None):
+        self.candidates.pop(statement, None)
+
+
+@pytest.fixture
+def server():
+
+    source = Source()
+    http_server = ThreadingHTTPServer(('127.0.0.1', 0), daemon.RequestHandler)
+    http_server.service = daemon.MatchService(source)
+    http_server.token = 'secret'
+
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+
+    yield http_server, source
+
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def client(http_server, token='secret'):
+    return remote.MatchDaemon(f'http://127.0.0.1:{http_server.server_address[1]}', timeout=30, token=token)
+
+
+def test_remote_matches_equal_local_matches(server):
+
+    http_server, source = server
+
+    match_engine = batch.build_engine(SETTINGS)
+    match_engine.y_records = ColumnarRecords(CANDIDATES)
+    match_engine.x_records = ColumnarRecords(WORKSHEET)
+    expected, _ = match_engine.match()
+
+    for _ in range(2):
+        records, match_info = client(http_server).match('SELECT *', None, SETTINGS, WORKSHEET)
+        assert {i: r.get('candidate_id') for i, r in records.items()} == \
+               {i: r.get('candidate_id') for i, r in expected.items()}
+
+    # the candidates and the engine were kept between the matches
+    assert source.queries == ['SELECT *']
+    assert http_server.service.status()['engines'] == 1
+
+
+def test_pushdown_matches_against_preloaded_candidates(server):
+
+    http_server, source = server
+    http_server.service.preload('SELECT *')
+
+    for state in ('NY', 'TX'):
+        assert client(http_server).match('SELECT *', None, SETTINGS, WORKSHEET, filters={'state_id': [state]})
+
+    assert source.queries == ['SELECT *']
+
+
+def test_requests_need_the_token(server):
+
+    http_server, _ = server
+
+    assert client(http_server, token='wrong').status() is None
+    assert client(http_server).status()['matches'] == 0
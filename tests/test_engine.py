@@ -0,0 +1,183 @@
+# built-ins
+import random
+
+# internal packages
+from match import blocking, engine, journal, normalize, parallel, scoring
+from match.records import ColumnarRecords, categorize
+
+# external packages
+import numpy
+import pandas
+import pytest
+from rapidfuzz import fuzz, process
+
+
+LASTNAMES = ['smith', 'smyth', 'johnson', 'jonson', 'brown', 'browne', 'garcia', 'garza', "o'neil", 'oneal']
+FIRSTNAMES = ['john', 'jon', 'mary', 'marie', 'robert', 'roberta', 'james', 'jim', '']
+STATES = ['NY', 'CA', 'TX', 'FL']
+
+COLUMNS_TO_MATCH = {'lastname': 'lastname', 'firstname': 'firstname'}
+WEIGHTS = {'lastname': 2}
+
+
+def candidates(rng, n):
+
+    return pandas.DataFrame({'candidate_id': [str(i) for i in range(n)],
+                             'lastname': [rng.choice(LASTNAMES) for _ in range(n)],
+                             'firstname': [rng.choice(FIRSTNAMES) for _ in range(n)],
+                             'state_id': [rng.choice(STATES) for _ in range(n)]})
+
+
+def worksheet(rng, n):
+
+    return pandas.DataFrame({'lastname': [rng.choice(LASTNAMES).upper() + rng.choice(['', ' ', 'e']) for _ in range(n)],
+                             'firstname': [rng.choice(FIRSTNAMES).title() for _ in range(n)],
+                             'state_id': [rng.choice(STATES + ['']) for _ in range(n)]})
+
+
+def match_engine(y_df, x_df, required_threshold=60, **kwargs):
+
+    config = engine.MatchConfig(COLUMNS_TO_MATCH, ['candidate_id'], required_threshold=required_threshold)
+    match_engine = engine.MatchEngine(engine.Matcher(config), weights=WEIGHTS, **kwargs)
+    match_engine.y_records = ColumnarRecords(y_df)
+    match_engine.x_records = ColumnarRecords(x_df)
+
+    return match_engine
+
+
+def brute_force(y_df, x_df):
+
+    """Scores every worksheet row against every candidate, one column at a time, with no pruning"""
+
+    total = numpy.zeros((len(x_df), len(y_df)))
+    weight_sum = numpy.zeros(len(x_df))
+
+    for x_column, y_column in COLUMNS_TO_MATCH.items():
+        queries = numpy.array([normalize.clean(v) for v in x_df[x_column]], dtype=object)
+        choices = numpy.array([normalize.clean(v) for v in y_df[y_column]], dtype=object)
+        present = queries.astype(bool)
+        weight = WEIGHTS.get(x_column, 1)
+
+        total += process.cdist(queries, choices, scorer=fuzz.WRatio) * (present * weight)[:, None]
+        weight_sum += present * weight
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        return total / weight_sum[:, None]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_equal_brute_force(seed):
+
+    rng = random.Random(seed)
+    y_df, x_df = candidates(rng, 40), worksheet(rng, 60)
+
+    records, match_info = match_engine(y_df, x_df).match()
+    expected = brute_force(y_df, x_df)
+
+    for i, record in records.items():
+        best = expected[i].max()
+
+        if best >= 60:
+            assert record['match_status'] in ('Matched', 'Ambiguous')
+            assert record['match_score'] == pytest.approx(best, abs=scoring.TOLERANCE + 0.005)
+            assert expected[i][int(record['candidate_id'])] == pytest.approx(best, abs=scoring.TOLERANCE)
+        else:
+            assert record['match_status'] == 'Unmatched'
+
+    assert match_info['Number of Rows'] == 60
+
+
+def test_columnar_and_categorical_records_match_alike():
+
+    rng = random.Random(1)
+    y_df, x_df = candidates(rng, 40), worksheet(rng, 60)
+    blocked = {'blocking': blocking.Blocking({'state_id': 'state_id'})}
+
+    dicts = match_engine(y_df, x_df, **blocked)
+    dicts.y_records = y_df.to_dict('records')
+    dicts.x_records = x_df.to_dict('index')
+
+    expected, _ = dicts.match()
+    columnar, _ = match_engine(y_df, x_df, **blocked).match()
+    categorical, _ = match_engine(categorize(y_df), categorize(x_df), **blocked).match()
+
+    assert columnar == expected
+    assert categorical == expected
+
+
+def test_sharded_matches_equal_serial_matches(monkeypatch):
+
+    rng = random.Random(2)
+    y_df, x_df = candidates(rng, 40), worksheet(rng, 60)
+    monkeypatch.setattr(parallel, 'MIN_ROWS', 0)
+
+    serial, serial_info = match_engine(y_df, x_df).match()
+    sharded, sharded_info = match_engine(y_df, x_df, processes=2).match()
+
+    assert sharded == serial
+    assert sharded_info['Comparisons'] == serial_info['Comparisons']
+
+
+def test_duplicates_are_scored_once_and_fanned_out():
+
+    rng = random.Random(3)
+    y_df, x_df = candidates(rng, 40), worksheet(rng, 20)
+    doubled = pandas.concat([x_df, x_df], ignore_index=True)
+
+    _, single_info = match_engine(y_df, x_df).match()
+    records, match_info = match_engine(y_df, doubled, journal=journal.MatchJournal()).match()
+
+    assert match_info['Distinct Rows'] == single_info['Distinct Rows']
+    assert match_info['Rows Rescored'] == match_info['Distinct Rows']
+    assert match_info['Comparisons'] == single_info['Comparisons']
+    assert all(records[i] == records[i + len(x_df)] for i in range(len(x_df)))
+
+
+def test_only_changed_rows_are_scored_again():
+
+    rng = random.Random(4)
+    y_df, x_df = candidates(rng, 40), worksheet(rng, 20).drop_duplicates(ignore_index=True)
+    repeat = match_engine(y_df, x_df, journal=journal.MatchJournal())
+
+    first, _ = repeat.match()
+    _, match_info = repeat.match()
+    assert match_info['Rows Rescored'] == 0
+
+    changed = x_df.copy()
+    changed.loc[0, 'lastname'] = 'zzzz'
+    repeat.x_records = ColumnarRecords(changed)
+    records, match_info = repeat.match()
+
+    assert match_info['Rows Rescored'] == 1
+    assert all(records[i] == first[i] for i in range(1, len(x_df)))
+
+
+def test_checkpoint_resumes_without_scoring_again(tmp_path):
+
+    rng = random.Random(5)
+    y_df, x_df = candidates(rng, 40), worksheet(rng, 30)
+    path = str(tmp_path / 'journal.tsv')
+
+    first, _ = match_engine(y_df, x_df, journal=journal.MatchJournal(path)).match()
+
+    # a new session on the same checkpoint, duplicates included, scores nothing
+    doubled = pandas.concat([x_df, x_df], ignore_index=True)
+    records, match_info = match_engine(y_df, doubled, journal=journal.MatchJournal(path)).match()
+
+    assert match_info['Rows Rescored'] == 0
+    assert all(records[i] == first[i] for i in range(len(x_df)))
+
+
+def test_top_k_finds_exact_names(tmp_path):
+
+    rng = random.Random(6)
+    y_df = candidates(rng, 200)
+    x_df = y_df.sample(30, random_state=6)[['lastname', 'firstname', 'state_id']].reset_index(drop=True)
+    expected, _ = match_engine(y_df, x_df).match()
+
+    for _ in range(2):
+        records, _ = match_engine(y_df, x_df, top_k=20, index_directory=str(tmp_path)).match()
+        assert [r['match_score'] for r in records.values()] == [r['match_score'] for r in expected.values()]
+
+    # the index built by the first match was saved and opened by the second
+    assert len(list(tmp_path.iterdir())) == 1
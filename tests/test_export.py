@@ -0,0 +1,51 @@
+# built-ins
+import gzip
+
+# external packages
+import pandas
+import pyarrow.parquet
+import pytest
+
+# files of other formats are written through vs_library
+pytest.importorskip('vs_library')
+from match import export
+
+
+DF = pandas.DataFrame({'candidate_id': ['1', None, '3'], 'match_score': [91.5, 0.0, 80.25],
+                       'party': pandas.Categorical(['D', 'R', 'D'])})
+
+
+@pytest.mark.parametrize('filepath, expected', [('a.csv', ('csv', None)), ('a.CSV.GZ', ('csv', 'gzip')),
+                                                ('a.parquet', ('parquet', None)), ('a.xlsx', ('xlsx', None)),
+                                                ('a.txt', (None, None))])
+def test_format_is_that_of_the_extension(filepath, expected):
+    assert export.format_of(filepath) == expected
+
+
+@pytest.mark.parametrize('name', ['matched.csv', 'matched.csv.gz', 'matched.parquet', 'matched.xlsx'])
+def test_written_files_read_back(tmp_path, name):
+
+    path = str(tmp_path / name)
+    success, message = export.write(DF, path, chunk_rows=2)
+    assert success, message
+
+    if name.endswith('.parquet'):
+        df = pyarrow.parquet.read_table(path).to_pandas()
+    elif name.endswith('.xlsx'):
+        df = pandas.read_excel(path, dtype={'candidate_id': str})
+    else:
+        df = pandas.read_csv(path, dtype={'candidate_id': str})
+
+    assert df['candidate_id'].isna().tolist() == [False, True, False]
+    assert df['candidate_id'].dropna().tolist() == ['1', '3']
+    assert df['match_score'].tolist() == [91.5, 0.0, 80.25]
+    assert df['party'].astype(str).tolist() == ['D', 'R', 'D']
+
+
+def test_csv_is_compressed_by_its_extension_only(tmp_path):
+
+    export.write(DF, str(tmp_path / 'plain.csv'), compression='gzip')
+    export.write(DF, str(tmp_path / 'packed.csv.gz'))
+
+    assert 'candidate_id' in open(tmp_path / 'plain.csv').readline()
+    assert 'candidate_id' in gzip.open(tmp_path / 'packed.csv.gz', 'rt').readline()
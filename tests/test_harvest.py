@@ -0,0 +1,60 @@
+# external packages
+import pandas
+import pytest
+
+# harvests are read and written through vs_library
+pytest.importorskip('vs_library')
+from harvest import harvest
+
+
+SESSIONS = [{'span': '2022', 'sig_id': '12', 'usesigrating': 't', 'ratingsession': 'a', 'ratingformat_id': '1'},
+            {'span': '2024', 'sig_id': '12', 'ratingsession': 'b'}]
+
+
+def rating_harvest():
+
+    rating_harvest = harvest.RatingHarvest()
+    rating_harvest.df = pandas.DataFrame({'candidate_id': ['1', '2', ''], 'sig_rating': ['90', '', '10'],
+                                          'our_rating': ['', '', '']})
+    return rating_harvest
+
+
+def test_generate_broadcasts_the_session():
+
+    generated = rating_harvest()
+    for attribute, value in SESSIONS[0].items():
+        setattr(generated, attribute, value)
+
+    generated.generate()
+
+    assert list(generated.df.columns) == generated.columns
+    assert generated.df['candidate_id'].tolist() == ['1', '2', '']
+    assert generated.df['span'].tolist() == ['2022'] * 3
+    assert generated.df['our_rating'].isna().all()
+
+
+def test_generate_many_equals_one_generate_per_session():
+
+    expected = []
+
+    for session in SESSIONS:
+        generated = rating_harvest()
+        for attribute in generated.columns[3:]:
+            setattr(generated, attribute, session.get(attribute, ''))
+
+        generated.generate()
+        expected.append(generated.df)
+
+    many = rating_harvest()
+    many.generate_many(SESSIONS)
+
+    expected = pandas.concat(expected, ignore_index=True)
+    assert many.df.astype(object).equals(expected.astype(object))
+
+
+def test_empty_harvest_has_number_of_rows():
+
+    generated = harvest.RatingHarvest()
+    generated.generate_many(SESSIONS, number_of_rows=4)
+
+    assert len(generated.df) == 8
@@ -0,0 +1,47 @@
+# built-ins
+import os
+import time
+
+# internal packages
+from match.index import CandidateIndex
+
+# external packages
+import numpy
+
+
+Y_COLUMNS = {'lastname': numpy.array(['smith', 'smyth', 'jones', 'johnson', 'garcia', 'smith'], dtype=object),
+             'firstname': numpy.array(['john', 'jon', 'mary', 'mary', 'maria', 'jane'], dtype=object)}
+
+
+def test_lookup_finds_similar_names_first():
+
+    candidate_index = CandidateIndex.build('v1', Y_COLUMNS)
+
+    assert 0 in candidate_index.lookup({'lastname': 'smith', 'firstname': 'john'}, 2)
+    assert set(candidate_index.lookup({'lastname': 'smith', 'firstname': 'john'}, 3)) >= {0, 5}
+    assert candidate_index.lookup({'lastname': 'qqq', 'firstname': ''}, 3).tolist() == []
+
+
+def test_lookup_keeps_masked_candidates_only():
+
+    mask = numpy.array([False, True, True, True, True, True])
+    candidates = CandidateIndex.build('v1', Y_COLUMNS).lookup({'lastname': 'smith'}, 1, mask)
+
+    assert candidates.tolist() == [5]
+
+
+def test_saved_index_opens_and_is_evicted_once_unused(tmp_path):
+
+    CandidateIndex.build('v1', Y_COLUMNS).save(str(tmp_path))
+    opened = CandidateIndex.open(str(tmp_path), 'v1')
+
+    assert opened.lookup({'lastname': 'jones'}, 1).tolist() == [2]
+    assert CandidateIndex.open(str(tmp_path), 'v2') is None
+
+    CandidateIndex.evict(str(tmp_path))
+    assert os.path.isdir(tmp_path / 'v1')
+
+    old = time.time() - 8*24*60*60
+    os.utime(tmp_path / 'v1' / 'index.json', (old, old))
+    CandidateIndex.evict(str(tmp_path))
+    assert not os.path.exists(tmp_path / 'v1')
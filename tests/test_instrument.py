@@ -0,0 +1,74 @@
+# built-ins
+import json
+import threading
+
+# internal packages
+from match import instrument
+
+
+def test_stages_nest_and_count():
+
+    session = instrument.Instrument(enabled=True)
+
+    with session.stage('Match') as stage:
+        with session.stage('Score') as child:
+            child.count(pairs=10)
+            child.count(pairs=5)
+        stage.count(rows=3)
+
+    (name, description), (child_name, child_description) = session.summary()
+
+    assert (name, child_name) == ('Match', '  Score')
+    assert '3 rows' in description and '15 pairs' in child_description
+    assert session.stages[0].peak_rss > 0
+
+
+def test_disabled_instrument_records_nothing():
+
+    session = instrument.Instrument()
+
+    with session.stage('Match') as stage:
+        stage.count(rows=1)
+
+    assert session.stages == [] and session.summary() == []
+
+
+def test_shared_stages_time_their_own_thread():
+
+    session = instrument.Instrument(enabled=True, shared=True)
+    busy = threading.Event()
+
+    def spin():
+        while not busy.is_set():
+            pass
+
+    neighbour = threading.Thread(target=spin)
+    neighbour.start()
+
+    try:
+        with session.stage('Wait') as stage:
+            busy.wait(0.3)
+    finally:
+        busy.set()
+        neighbour.join()
+
+    # the neighbour's spinning is not the stage's
+    assert stage.cpu < 0.1 and stage.peak_rss is None
+    assert 'peak RSS' not in session.summary()[0][1]
+
+
+def test_trace_holds_every_instrument(tmp_path):
+
+    sessions = [instrument.Instrument(enabled=True, name=f'job {i}') for i in range(2)]
+    for session in sessions:
+        with session.stage('Match'):
+            pass
+
+    success, _ = instrument.write_trace(str(tmp_path / 'trace.json'), sessions)
+    with open(tmp_path / 'trace.json') as f:
+        document = json.load(f)
+
+    assert success
+    assert set(document['stages']) == {'job 0', 'job 1'}
+    assert 'peak_rss' in document['process']
+    assert sum(e['ph'] == 'X' for e in document['traceEvents']) == 2
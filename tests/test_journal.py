@@ -0,0 +1,44 @@
+# built-ins
+import os
+
+# internal packages
+from match import journal
+
+
+def test_sessions_of_other_versions_keep_their_own_checkpoints(tmp_path):
+
+    path = str(tmp_path / 'journal.tsv')
+    session_a, session_b = journal.MatchJournal(path), journal.MatchJournal(path)
+
+    session_a.reset('a')
+    session_b.reset('b')
+    session_a.record('row', 1, 90.0, False)
+    session_b.record('row', 2, 85.0, False)
+    session_a.flush()
+    session_b.flush()
+
+    resumed_a, resumed_b = journal.MatchJournal(path), journal.MatchJournal(path)
+    resumed_a.reset('a')
+    resumed_b.reset('b')
+
+    assert resumed_a.get('row') == (1, 90.0, False)
+    assert resumed_b.get('row') == (2, 85.0, False)
+    assert sorted(os.listdir(tmp_path)) == ['journal-a.tsv', 'journal-b.tsv']
+
+
+def test_a_torn_last_line_is_skipped(tmp_path):
+
+    path = str(tmp_path / 'journal.tsv')
+    session = journal.MatchJournal(path)
+    session.reset('a')
+    session.record('row', 1, 90.0, True)
+    session.flush()
+
+    with open(session.checkpoint_path(), 'a') as f:
+        f.write('other\t3\t7')
+
+    resumed = journal.MatchJournal(path)
+    resumed.reset('a')
+
+    assert resumed.get('row') == (1, 90.0, True)
+    assert 'other' not in resumed
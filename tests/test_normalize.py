@@ -0,0 +1,25 @@
+# internal packages
+from match import normalize
+
+
+def test_worksheet_names_are_folded_and_stripped():
+
+    default, by_column = normalize.worksheet_normalizers()
+
+    assert by_column['lastname']("  O'Neil-Smith Jr. ") == 'oneilsmith'
+    assert by_column['firstname']('José') == 'jose'
+    assert default(' U.S. Senate ') == 'u.s. senate'
+
+
+def test_column_normalizes_every_distinct_value_once():
+
+    calls = []
+
+    def step(x):
+        calls.append(x)
+        return x
+
+    values = normalize.Normalizer(step).column(['Smith', 'Doe', 'Smith', 'Smith', 'Doe'])
+
+    assert values == ['smith', 'doe', 'smith', 'smith', 'doe']
+    assert calls == ['smith', 'doe']
@@ -0,0 +1,15 @@
+# internal packages
+import harvest
+import match
+
+# external packages
+import pytest
+
+
+@pytest.mark.parametrize('package', [match, harvest])
+def test_unknown_names_are_missing(package):
+
+    # an unknown name must not import the modules needing vs_library
+    assert not hasattr(package, 'nothing')
+    assert not hasattr(package, 'RatingNothing')
+
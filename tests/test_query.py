@@ -0,0 +1,154 @@
+# built-ins
+import threading
+from decimal import Decimal
+
+# internal packages
+from match import query
+
+# external packages
+import pandas
+import pytest
+
+
+def test_worksheet_filters_push_down_states_only():
+
+    df = pandas.DataFrame({'state_id': ['TX', ' ny', 'TX'], 'office': ['U.S. Senate', 'House', 'House'],
+                           'district': ['01', '2', '']})
+
+    assert query.worksheet_filters(df) == {'state_id': ['ny', 'tx']}
+
+
+def test_worksheet_filters_leave_out_keys_some_rows_lack():
+
+    df = pandas.DataFrame({'state_id': ['TX', '']})
+    assert query.worksheet_filters(df) == {}
+
+
+def test_restrict_appends_named_and_positional_parameters():
+
+    statement, parameters = query.restrict('SELECT * FROM c WHERE a = %s;', (1,), {'state_id': ['tx']})
+    assert statement.endswith('WHERE lower(trim(pushdown."state_id"::text)) = ANY(%s)')
+    assert parameters == (1, ['tx'])
+
+    _, parameters = query.restrict('SELECT * FROM c WHERE a = %(a)s', {'a': 1}, {'state_id': ['tx']})
+    assert parameters == {'a': 1, 'pushdown_state_id': ['tx']}
+
+
+class Cursor:
+
+    """Stands in for a pg8000 cursor, fetching rows in the batches given"""
+
+    def __init__(self, batches, fail_on=None):
+
+        self.batches = list(batches)
+        self.fail_on = fail_on
+        self.description = [('amount',)]
+        self.rows = []
+
+    def execute(self, statement, parameters=None):
+
+        if self.fail_on and statement.startswith(self.fail_on):
+            raise RuntimeError('statement failed')
+
+        self.rows = self.batches.pop(0) if statement.startswith('FETCH') and self.batches else []
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class Connection:
+
+    def __init__(self, cursor):
+
+        self.__cursor = cursor
+        self.committed = self.rolled_back = False
+
+    def cursor(self):
+        return self.__cursor
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def test_fetch_frame_unifies_the_types_of_batches():
+
+    batches = [[(Decimal('1.5'),)], [(None,)], [(Decimal('123.25'),)]]
+    df = query.fetch_frame(Connection(Cursor(batches)), 'SELECT amount FROM c', fetch_size=1)
+
+    assert df['amount'].tolist()[0] == Decimal('1.5')
+    assert df['amount'].tolist()[2] == Decimal('123.25')
+
+
+def test_fetch_frame_rolls_back_a_failed_query():
+
+    connection = Connection(Cursor([], fail_on='DECLARE'))
+
+    with pytest.raises(RuntimeError):
+        query.fetch_frame(connection, 'SELECT amount FROM c')
+
+    assert connection.rolled_back and not connection.committed
+
+
+def test_fetch_frame_stops_once_cancelled():
+
+    cancelled = threading.Event()
+    cursor = Cursor([[(Decimal('1'),)], [(Decimal('2'),)], [(Decimal('3'),)]])
+    connection = Connection(cursor)
+
+    fetch = cursor.fetchall
+    cursor.fetchall = lambda: (cancelled.set(), fetch())[1]
+
+    with pytest.raises(query.Cancelled):
+        query.fetch_frame(connection, 'SELECT amount FROM c', fetch_size=1, cancelled=cancelled)
+
+    assert len(cursor.batches) == 2
+    assert connection.rolled_back and not connection.committed
+
+
+def test_queries_of_two_threads_do_not_interleave():
+
+    class SharedCursor(Cursor):
+
+        """Fails if a statement is executed while the query of another thread is open"""
+
+        def __init__(self):
+            super().__init__([])
+            self.open = None
+
+        def execute(self, statement, parameters=None):
+
+            thread = threading.current_thread()
+            assert self.open in (None, thread), 'the connection is used by two threads at once'
+
+            if statement.startswith('DECLARE'):
+                self.open = thread
+                self.batches = [[(Decimal('1'),)], [(Decimal('2'),)]]
+            elif statement.startswith('CLOSE'):
+                self.open = None
+
+            super().execute(statement, parameters)
+            threading.Event().wait(0.001)
+
+    connection = Connection(SharedCursor())
+    errors = []
+
+    def fetch():
+        try:
+            for _ in range(10):
+                assert len(query.fetch_frame(connection, 'SELECT amount FROM c', fetch_size=1)) == 2
+        except AssertionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
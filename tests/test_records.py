@@ -0,0 +1,38 @@
+# internal packages
+from match.records import ColumnarRecords, categorize
+
+# external packages
+import pandas
+import pyarrow
+
+
+def test_records_read_like_dictionaries_by_index():
+
+    df = pandas.DataFrame({'lastname': ['smith', None], 'state': ['NY', 'CA']}, index=[5, 9])
+    records = ColumnarRecords(df)
+
+    assert records.keys() == [5, 9]
+    assert list(records.values()) == [{'lastname': 'smith', 'state': 'NY'}, {'lastname': None, 'state': 'CA'}]
+    assert records[1] == {'lastname': None, 'state': 'CA'}
+    assert records.column('lastname') == ['smith', '']
+    assert records.column('missing') == ['', '']
+
+
+def test_arrow_tables_are_wrapped():
+
+    records = ColumnarRecords(pyarrow.table({'candidate_id': [1, None, 3]}))
+
+    assert records.column('candidate_id') == [1, '', 3]
+
+
+def test_categorize_keeps_the_values():
+
+    df = pandas.DataFrame({'party': ['D', 'R', 'D', None], 'lastname': ['a', 'b', 'c', 'd']})
+    compact = categorize(df)
+
+    assert isinstance(compact['party'].dtype, pandas.CategoricalDtype)
+    assert compact['lastname'].dtype == df['lastname'].dtype
+
+    codes, categories = ColumnarRecords(compact).categories('party')
+    assert [categories[c] if c >= 0 else None for c in codes] == ['D', 'R', 'D', None]
+    assert list(ColumnarRecords(compact).rows()) == list(ColumnarRecords(df).rows())
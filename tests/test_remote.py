@@ -0,0 +1,37 @@
+# built-ins
+import json
+
+# internal packages
+from match import engine, remote
+
+# external packages
+import pandas
+
+
+def test_frames_round_trip_through_json():
+
+    df = pandas.DataFrame({'lastname': ['smith', None], 'score': [1.5, None]}, index=[3, 7])
+    payload = remote.load_frame(json.loads(remote.dumps(remote.dump_frame(df))))
+
+    assert payload.index.tolist() == [3, 7]
+    assert payload.where(payload.notna(), None).values.tolist() == [['smith', 1.5], [None, None]]
+
+
+def test_settings_are_those_of_a_batch_job():
+
+    config = engine.MatchConfig({'lastname': 'lastname'}, ['candidate_id'], thresholds_by_column={'lastname': 60})
+    match_engine = engine.MatchEngine(engine.Matcher(config), weights={'lastname': 2}, top_k=20)
+
+    assert remote.settings(match_engine) == {
+        'columns_to_match': {'lastname': 'lastname'}, 'columns_to_get': ['candidate_id'],
+        'scorers': {'lastname': 'Weighted'}, 'thresholds': {'lastname': 60}, 'required_threshold': 80,
+        'weights': {'lastname': 2}, 'top_k': 20, 'blocking': None, 'keep': None, 'min_score': None}
+
+
+def test_unreachable_daemon_gives_none():
+
+    daemon = remote.MatchDaemon('http://127.0.0.1:9', timeout=1, token='t')
+
+    assert not daemon.available()
+    assert daemon.candidates('SELECT 1') is None
+    assert daemon.match('SELECT 1', None, {}, pandas.DataFrame({'a': [1]})) is None
@@ -0,0 +1,116 @@
+# built-ins
+import random
+import string
+
+# internal packages
+from match import scoring
+
+# external packages
+import numpy
+import pytest
+from rapidfuzz import fuzz, process
+
+
+def random_names(rng, n):
+
+    """Returns n names of 0 to 12 letters, many sharing letters so that they score above 0"""
+
+    return numpy.array([''.join(rng.choice('abcde' + string.ascii_lowercase[:rng.randint(5, 26)])
+                                for _ in range(rng.choice([0, 1, 1, 2, 3, 5, 8, 8, 9, 12])))
+                        for _ in range(n)], dtype=object)
+
+
+def exhaustive(columns, x_columns, y_columns, x_positions, y_positions):
+
+    """Scores every pair of every column, as score does without pruning anything"""
+
+    shape = (len(x_positions), len(y_positions))
+    total = numpy.zeros(shape, dtype=numpy.float64)
+    alive = numpy.ones(shape, dtype=bool)
+    weight_sum = numpy.zeros(len(x_positions))
+
+    for x_column, y_column, scorer, threshold, weight in columns:
+        queries = x_columns[x_column][x_positions]
+        present = queries.astype(bool)
+        scores = process.cdist(queries, y_columns[y_column][y_positions], scorer=scorer, dtype=numpy.float32)
+
+        if threshold:
+            alive &= (scores >= threshold) | ~present[:, None]
+
+        total += scores * (present * weight)[:, None]
+        weight_sum += present * weight
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        total /= weight_sum[:, None]
+
+    total[~alive | (weight_sum == 0)[:, None]] = -1
+    return total
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_pruned_scores_match_exhaustive_scores(seed):
+
+    rng = random.Random(seed)
+    x_columns = {'last': random_names(rng, 40), 'first': random_names(rng, 40)}
+    y_columns = {'last': random_names(rng, 60), 'first': random_names(rng, 60)}
+    x_positions, y_positions = numpy.arange(40), numpy.arange(60)
+
+    scorer = rng.choice([fuzz.WRatio, fuzz.ratio])
+    columns = [('last', 'last', fuzz.WRatio, rng.choice([0, 50]), 2),
+               ('first', 'first', scorer, rng.choice([0, 40]), 1)]
+    cutoff = rng.choice([0, 50, 60, 70])
+
+    expected = exhaustive(columns, x_columns, y_columns, x_positions, y_positions)
+    kept = expected >= cutoff
+
+    scores = scoring.score(columns, x_columns, y_columns, x_positions, y_positions, cutoff=cutoff, prune_rows=False)
+    numpy.testing.assert_allclose(scores[kept], expected[kept], atol=scoring.TOLERANCE)
+
+    # with rows pruned, only the best candidate of every row is exact
+    scores = scoring.score(columns, x_columns, y_columns, x_positions, y_positions, cutoff=cutoff)
+    best = expected.max(axis=1)
+    numpy.testing.assert_allclose(scores.max(axis=1)[best >= cutoff], best[best >= cutoff], atol=scoring.TOLERANCE)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_kept_candidates_match_exhaustive_scores(seed):
+
+    rng = random.Random(seed)
+    x_columns = {'last': random_names(rng, 30), 'first': random_names(rng, 30)}
+    y_columns = {'last': random_names(rng, 50), 'first': random_names(rng, 50)}
+    x_positions, y_positions = numpy.arange(30), numpy.arange(50)
+
+    columns = [('last', 'last', fuzz.WRatio, 0, 2), ('first', 'first', fuzz.ratio, 0, 1)]
+    cutoff, keep = rng.choice([0, 30, 50]), rng.choice([1, 3, 5])
+
+    expected = exhaustive(columns, x_columns, y_columns, x_positions, y_positions)
+    expected[expected < cutoff] = -1
+
+    scores = scoring.score(columns, x_columns, y_columns, x_positions, y_positions, cutoff=cutoff, prune_rows=keep)
+    scores[scores < cutoff] = -1
+    _, expected_top = scoring.top(expected, y_positions, keep)
+    _, top = scoring.top(scores, y_positions, keep)
+
+    numpy.testing.assert_allclose(top, expected_top, atol=scoring.TOLERANCE)
+
+
+def test_wratio_bound_holds_at_a_length_ratio_of_8():
+
+    queries, choices = numpy.array(['a'], dtype=object), numpy.array(['abcdefgh'], dtype=object)
+    exact = process.cdist(queries, choices, scorer=fuzz.WRatio)[0, 0]
+
+    assert exact > 60
+    assert scoring.upper_bound(fuzz.WRatio, queries, choices)[0, 0] >= exact
+
+
+def test_groups_without_rows_or_candidates():
+
+    x_columns = {'last': numpy.array(['smith', 'doe'], dtype=object)}
+    y_columns = {'last': numpy.array(['smith'], dtype=object)}
+    columns = [('last', 'last', fuzz.WRatio, 0, 1)]
+    empty = numpy.array([], dtype=numpy.int64)
+    groups = [(empty, empty), (empty, numpy.arange(1)), (numpy.arange(2), empty)]
+
+    best, best_scores, ambiguous, comparisons, *_ = scoring.best_candidates(groups, columns, x_columns, y_columns, 2)
+
+    assert best.tolist() == [-1, -1] and comparisons == 0
@@ -0,0 +1,46 @@
+# internal packages
+from match import blocking, engine, stream
+from match.records import ColumnarRecords
+
+# external packages
+import pandas
+
+
+CANDIDATES = pandas.DataFrame({'candidate_id': ['1', '2', '3'],
+                               'lastname': ['smith', 'doe', 'jones'],
+                               'firstname': ['john', 'jane', 'mary'],
+                               'state_id': ['NY', 'CA', 'TX']})
+
+
+def match_engine():
+
+    config = engine.MatchConfig({'lastname': 'lastname', 'firstname': 'firstname'}, ['candidate_id'])
+    match_engine = engine.MatchEngine(engine.Matcher(config), blocking=blocking.Blocking({'state_id': 'state_id'}))
+    match_engine.y_records = ColumnarRecords(CANDIDATES)
+
+    return match_engine
+
+
+def test_unmatched_first_chunk_keeps_the_columns_to_get(tmp_path):
+
+    worksheet = pandas.DataFrame({'lastname': ['zzz', 'qqq', 'xxx', 'smith', 'doe', 'jones'],
+                                  'firstname': ['a', 'b', 'c', 'john', 'jane', 'mary'],
+                                  'state_id': ['NY', 'CA', 'TX', 'NY', 'CA', 'TX']})
+    worksheet.to_csv(tmp_path / 'worksheet.csv', index=False)
+
+    match_info = stream.match_chunks(match_engine(), [str(tmp_path / 'worksheet.csv')], str(tmp_path / 'out.csv'),
+                                     chunksize=3)
+    output = pandas.read_csv(tmp_path / 'out.csv', dtype=str, keep_default_na=False)
+
+    assert list(output.columns) == ['lastname', 'firstname', 'state_id', 'candidate_id', 'match_score', 'match_status']
+    assert output['candidate_id'].tolist() == ['', '', '', '1', '2', '3']
+    assert match_info['Number of Rows'] == 6 and match_info['Matched'] == 3
+
+
+def test_empty_worksheet_gives_a_header(tmp_path):
+
+    pandas.DataFrame(columns=['lastname', 'firstname', 'state_id']).to_csv(tmp_path / 'worksheet.csv', index=False)
+
+    stream.match_chunks(match_engine(), [str(tmp_path / 'worksheet.csv')], str(tmp_path / 'out.csv'))
+
+    assert open(tmp_path / 'out.csv').read().split() == ['lastname,firstname,state_id,candidate_id,match_score,match_status']
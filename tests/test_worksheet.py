@@ -0,0 +1,74 @@
+# external packages
+import pandas
+import pytest
+
+# worksheets are read through vs_library
+pytest.importorskip('vs_library')
+from match import match
+
+
+def write_worksheets(tmp_path):
+
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'worksheet_{i}.csv'
+        pandas.DataFrame({'lastname': [f'smith{i}', f'doe{i}'], 'party': ['D', None],
+                          'state_id': ['NY', 'CA'], 'notes': ['x', 'y']}).to_csv(path, index=False)
+        paths.append(str(path))
+
+    return paths
+
+
+def test_parallel_and_cached_reads_equal_a_serial_read(tmp_path):
+
+    paths = write_worksheets(tmp_path)
+    serial = match.RatingWorksheet(processes=1)
+    assert serial.read(paths)[0]
+
+    for _ in range(2):
+        parallel = match.RatingWorksheet(cache_directory=str(tmp_path / 'cache'), processes=2)
+        assert parallel.read(paths)[0]
+        pandas.testing.assert_frame_equal(parallel.df, serial.df)
+
+    assert len(list((tmp_path / 'cache').iterdir())) == len(paths)
+
+
+def test_compact_worksheets_hold_the_same_values(tmp_path):
+
+    paths = write_worksheets(tmp_path)
+    plain, compact = match.RatingWorksheet(processes=1), match.RatingWorksheet(processes=1, compact=True)
+    plain.read(paths)
+    compact.read(paths)
+
+    assert isinstance(compact.df['party'].dtype, pandas.CategoricalDtype)
+    assert compact.df.astype(object).equals(plain.df.astype(object))
+    assert compact.not_required_columns == ['notes']
+
+
+def test_generate_pads_with_empty_rows(tmp_path):
+
+    worksheet = match.RatingWorksheet(processes=1)
+    worksheet.read(write_worksheets(tmp_path))
+    worksheet.generate(number_of_rows=10)
+
+    assert list(worksheet.df.columns) == worksheet.columns
+    assert len(worksheet.df) == 10
+    assert worksheet.df['lastname'].tolist()[:2] == ['smith0', 'doe0']
+    assert worksheet.df['lastname'].tolist()[6:] == [''] * 4
+
+
+def test_compact_worksheets_generate_as_plain_ones(tmp_path):
+
+    paths = write_worksheets(tmp_path)
+    plain, compact = match.RatingWorksheet(processes=1), match.RatingWorksheet(processes=1, compact=True)
+    plain.read(paths)
+    compact.read(paths)
+
+    plain.generate(number_of_rows=10)
+    compact.generate(number_of_rows=10)
+
+    assert not any(isinstance(dtype, pandas.CategoricalDtype) for dtype in compact.df.dtypes)
+    pandas.testing.assert_frame_equal(compact.df, plain.df)
+
+    # as before worksheets were compact: the values read, then rows of empty strings
+    assert compact.df['party'].tolist() == ['D', '', 'D', '', 'D', ''] + [''] * 4